@@ -0,0 +1,110 @@
+# backend/app/core/cache.py
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+class CacheResult(NamedTuple):
+    value: Any
+    age_seconds: float
+    status: str # "HIT", "STALE", atau "MISS"
+
+class _Entry:
+    __slots__ = ("value", "computed_at", "generation", "key_version")
+
+    def __init__(self, value: Any, computed_at: float, generation: int, key_version: int):
+        self.value = value
+        self.computed_at = computed_at
+        self.generation = generation # self._generation saat perhitungan DIMULAI
+        self.key_version = key_version # self._key_versions[key] saat perhitungan DIMULAI
+
+class SWRCache:
+    """
+    Cache in-process dengan TTL pendek, invalidasi eksplisit, dan stale-while-revalidate.
+    - Entri segar (umur < ttl_seconds dan belum diinvalidasi) langsung dikembalikan (HIT).
+    - Entri basi (kadaluarsa atau diinvalidasi) tetapi umurnya < ttl_seconds + max_stale_seconds:
+      tepat satu thread menghitung ulang, thread lain tetap menerima nilai lama (STALE).
+    - Tanpa entri yang bisa dipakai: satu thread menghitung, thread lain menunggu hasilnya (single-flight, MISS).
+    Catatan: invalidasi hanya berlaku di worker yang menjalankan perubahan; di worker lain data
+    paling lama basi selama ttl_seconds.
+    """
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._computing: Dict[Hashable, threading.Event] = {}
+        self._generation = 0 # Naik pada invalidate() semua entri
+        self._key_versions: Dict[Hashable, int] = {} # Naik pada invalidate(key)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> CacheResult:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                entry = self._entries.get(key)
+                age = now - entry.computed_at if entry else None
+                if entry and self._is_current(key, entry) and age < self.ttl_seconds:
+                    self.hits += 1
+                    return CacheResult(entry.value, age, "HIT")
+
+                usable_stale = entry is not None and age < self.ttl_seconds + self.max_stale_seconds
+                in_flight = self._computing.get(key)
+                if in_flight is None:
+                    in_flight = threading.Event()
+                    self._computing[key] = in_flight
+                    generation, key_version = self._generation, self._key_versions.get(key, 0)
+                    break # Thread ini yang menghitung ulang
+                if usable_stale:
+                    self.stale_hits += 1
+                    return CacheResult(entry.value, age, "STALE")
+
+            in_flight.wait() # Tidak ada nilai lama yang layak: tunggu hasil thread yang sedang menghitung
+
+        try:
+            value = compute()
+        except Exception:
+            with self._lock:
+                self._computing.pop(key, None)
+            in_flight.set()
+            raise
+
+        with self._lock:
+            # Versi yang dicatat adalah versi saat perhitungan dimulai: jika ada invalidasi selama perhitungan,
+            # entri ini langsung basi dan request berikutnya menghitung ulang
+            self._entries[key] = _Entry(value, time.monotonic(), generation, key_version)
+            self._computing.pop(key, None)
+            self.misses += 1
+        in_flight.set()
+
+        return CacheResult(value, 0.0, "MISS")
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Menandai entri basi (semua entri jika key None); nilai lama masih boleh disajikan selama dihitung ulang."""
+        with self._lock:
+            if key is None:
+                self._generation += 1
+            else:
+                self._key_versions[key] = self._key_versions.get(key, 0) + 1
+
+    def _is_current(self, key: Hashable, entry: _Entry) -> bool:
+        """True jika tidak ada invalidasi sejak perhitungan entri dimulai (dipanggil dengan _lock dipegang)."""
+        return entry.generation == self._generation and entry.key_version == self._key_versions.get(key, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "max_stale_seconds": self.max_stale_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,142 @@
+# backend/app/core/catalog_version.py
+# Versi katalog (produk & kategori) untuk ETag / If-None-Match pada endpoint list dan detail.
+import hashlib
+import logging
+import random
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.db import models_db
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+# Dua versi terpisah: perubahan data katalog (produk & kategori) dan perubahan stok saja. Stok berubah di
+# setiap penjualan, jadi hanya ETag endpoint produk (yang memuat current_stock) yang ikut berubah karenanya.
+_SESSION_SCOPES = {
+    "catalog_changed": "catalog",
+    "catalog_stock_changed": "stock",
+}
+# Jumlah shard baris versi stok (lihat models_db.CatalogVersion); boleh diubah kapan saja
+STOCK_VERSION_SHARDS = 16
+
+def mark_catalog_changed(db: Session) -> None:
+    """Menandai sesi telah mengubah data katalog; versi dinaikkan di transaksi yang sama saat di-commit."""
+    db.info["catalog_changed"] = True
+
+def mark_stock_changed(db: Session) -> None:
+    """Menandai sesi telah mengubah stok produk (versi stok saja, ETag kategori tidak berubah)."""
+    db.info["catalog_stock_changed"] = True
+
+def ensure_catalog_version_table() -> None:
+    """Membuat tabel catalog_versions jika belum ada (idempoten; dipanggil saat startup)."""
+    models_db.CatalogVersion.__table__.create(bind=engine, checkfirst=True)
+
+def _increment_version_statement(dialect_name: str):
+    """INSERT (scope, shard, 1) ... ON CONFLICT DO UPDATE SET version = version + 1."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Versi katalog belum didukung untuk dialek '{dialect_name}'.")
+
+    versions = models_db.CatalogVersion.__table__
+    stmt = dialect_insert(versions)
+    return stmt.on_conflict_do_update(
+        index_elements=[versions.c.scope, versions.c.shard],
+        set_={"version": versions.c.version + 1}
+    )
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions_before_commit(session: Session) -> None:
+    """
+    Menaikkan versi lewat UPDATE baris catalog_versions di transaksi sesi itu sendiri, tepat sebelum COMMIT.
+    Baris tersebut transaksional: sesi lain baru melihat versi baru setelah commit, bersamaan dengan datanya
+    (dan di sesi async statement ikut berjalan lewat driver async, tidak memblokir event loop).
+    Gagal menaikkan versi (misal tabel belum ada) tidak boleh menggagalkan commit data.
+    """
+    scopes = [scope for key, scope in _SESSION_SCOPES.items() if session.info.pop(key, False)]
+    if not scopes:
+        return
+
+    session.flush()
+    stmt = _increment_version_statement(session.get_bind().dialect.name)
+    for scope in scopes:
+        shard = random.randrange(STOCK_VERSION_SHARDS) if scope == "stock" else 0
+        try:
+            with session.begin_nested(): # Savepoint: kegagalan di sini tidak membatalkan transaksi data
+                session.execute(stmt, {"scope": scope, "shard": shard, "version": 1})
+        except DBAPIError as e:
+            logger.warning(f"Gagal menaikkan versi katalog ({scope}): {e}")
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_change(session: Session) -> None:
+    for key in _SESSION_SCOPES:
+        session.info.pop(key, None)
+
+def get_catalog_version(db: Session, include_stock: bool = False) -> Optional[str]:
+    """
+    Versi katalog saat ini (ditambah versi stok jika include_stock). None jika tabel versi belum ada;
+    transaksi baca yang gagal di-rollback agar query endpoint berikutnya tetap berjalan.
+    """
+    versions = models_db.CatalogVersion
+    try:
+        totals = dict(db.execute(
+            select(versions.scope, func.sum(versions.version)).group_by(versions.scope)
+        ).all())
+    except DBAPIError as e:
+        db.rollback()
+        logger.warning(f"Versi katalog tidak tersedia, ETag dilewati: {e}")
+        return None
+
+    version = str(int(totals.get("catalog") or 0))
+    if include_stock:
+        version += f".{int(totals.get('stock') or 0)}"
+    return version
+
+def catalog_etag(db: Session, resource_key: str, include_stock: bool = False) -> Optional[str]:
+    """
+    Strong ETag untuk representasi `resource_key` (path + query string) pada versi katalog saat ini,
+    atau None jika versi tidak tersedia. Versi dibaca SEBELUM query data: jika ada perubahan di antaranya,
+    ETag berikutnya pasti berbeda.
+    """
+    version = get_catalog_version(db, include_stock=include_stock)
+    if version is None:
+        return None
+    digest = hashlib.sha1(resource_key.encode("utf-8")).hexdigest()[:16]
+    return f'"catalog-v{version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Perbandingan If-None-Match (RFC 9110: perbandingan lemah, mendukung daftar dan '*')."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def check_not_modified(
+        request: Request, response: Response, db: Session, include_stock: bool = False
+    ) -> Optional[Response]:
+    """
+    Dipanggil di awal endpoint katalog (sebelum query data): memasang ETag di `response`, dan
+    mengembalikan respons 304 jika If-None-Match client cocok (endpoint langsung mengembalikannya).
+    include_stock=True untuk representasi yang memuat current_stock (endpoint produk).
+    """
+    etag = catalog_etag(db, f"{request.url.path}?{request.url.query}", include_stock=include_stock)
+    if etag is None: # Tanpa versi tidak ada ETag; respons biasa
+        return None
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache" # Boleh disimpan client, tetapi wajib revalidasi
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
+
+    return None
@@ -0,0 +1,438 @@
+# backend/app/core/product_index.py
+# Indeks produk in-process (nama & SKU) untuk autocomplete dan pencocokan fuzzy tanpa round trip ke database.
+import bisect
+import logging
+import re
+import sys
+import threading
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app.db import models_db
+from app.schemas import product_schemas
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_SESSION_PENDING_STOCK_KEY = "product_index_pending_stock"
+_SESSION_PENDING_REMOVALS_KEY = "product_index_pending_removals"
+
+def normalize_text(value: Optional[str]) -> str:
+    """Huruf kecil, karakter selain huruf/angka menjadi spasi, spasi berlebih dibuang."""
+    return _NON_ALNUM.sub(" ", (value or "").casefold()).strip()
+
+def _word_grams(word: str, prefix_only: bool) -> Set[str]:
+    """
+    Trigram sebuah kata. Kata di indeks diberi padding "  kata " sehingga trigram awal ("  k", " ko")
+    menandai awal kata; kata query diberi padding depan saja (pencocokan awalan) atau tanpa padding (infix).
+    """
+    padded = f"  {word}" if prefix_only else word
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _document_grams(words: Iterable[str]) -> Set[str]:
+    grams: Set[str] = set()
+    for word in words:
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _similarity(query_grams: Set[str], target_grams: Set[str]) -> float:
+    """Kemiripan trigram seperti pg_trgm similarity(): irisan / gabungan."""
+    if not query_grams or not target_grams:
+        return 0.0
+    shared = len(query_grams & target_grams)
+    return shared / (len(query_grams) + len(target_grams) - shared)
+
+class ProductMatch(NamedTuple):
+    product: product_schemas.Product
+    score: float # 0..1
+    matched_on: str # "name", "compact_name", atau "sku"
+
+class ProductResolution(NamedTuple):
+    status: str # "matched", "ambiguous", atau "not_found"
+    product: Optional[product_schemas.Product] # Terisi hanya jika status "matched"
+    candidates: List[ProductMatch]
+
+class _IndexedProduct:
+    __slots__ = ("record", "name", "sku", "words", "compact_name", "name_grams", "compact_grams", "sku_grams", "grams")
+
+    def __init__(self, record: product_schemas.Product):
+        self.record = record
+        self.name = normalize_text(record.name)
+        self.sku = normalize_text(record.sku)
+        self.words = self.name.split() + self.sku.split()
+        # Alias nama tanpa spasi, agar "kopisusu" cocok dengan "Kopi Susu" (dan sebaliknya)
+        self.compact_name = self.name.replace(" ", "")
+        self.name_grams = _document_grams(self.name.split())
+        self.compact_grams = _document_grams([self.compact_name]) if self.compact_name else set()
+        self.sku_grams = _document_grams([self.sku.replace(" ", "")]) if self.sku else set()
+        self.grams = _document_grams(self.words) | self.compact_grams | self.sku_grams
+
+    def match_score(self, query_word_grams: Set[str], query_compact_grams: Set[str]) -> Tuple[float, str]:
+        """Skor terbaik query terhadap nama (per kata), nama tanpa spasi, dan SKU."""
+        return max(
+            (_similarity(query_word_grams, self.name_grams), "name"),
+            (_similarity(query_compact_grams, self.compact_grams), "compact_name"),
+            (_similarity(query_compact_grams, self.sku_grams), "sku"),
+        )
+
+class ProductIndex:
+    """
+    Indeks n-gram terbalik (trigram -> array slot produk terurut) atas nama dan SKU produk.
+    - Dibangun saat startup (build), diperbarui oleh hook crud_product (upsert/remove), perubahan stok
+      yang di-commit (stage_stock_changes + event after_commit), dan sinkronisasi berkala berdasarkan
+      products.updated_at untuk perubahan dari worker lain.
+    - suggest() / match() / resolve() tidak menyentuh database; sebelum indeks siap, pemanggil memakai query DB biasa.
+    Catatan: produk yang dihapus permanen oleh worker lain baru hilang setelah rebuild (restart).
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: List[Optional[_IndexedProduct]] = [] # Slot -> produk (None = slot kosong)
+        self._slot_by_id: Dict[int, int] = {}
+        self._slot_by_sku: Dict[str, int] = {} # SKU persis (seperti tersimpan di DB) -> slot, untuk scan barcode
+        self._postings: Dict[str, array] = {}
+        self.ready = False
+        self.built_at: Optional[datetime] = None
+        self.last_sync_at: Optional[datetime] = None
+        self._sync_thread: Optional[threading.Thread] = None
+        self._stop_sync = threading.Event()
+
+    # --- Pembangunan & pembaruan ---
+
+    def build(self, db: Session) -> None:
+        """Membangun ulang seluruh indeks dari tabel products, lalu menukarnya secara atomik."""
+        started_at = datetime.now(timezone.utc)
+        entries: List[Optional[_IndexedProduct]] = []
+        slot_by_id: Dict[int, int] = {}
+        slot_by_sku: Dict[str, int] = {}
+        postings: Dict[str, List[int]] = {}
+        for db_product in db.query(models_db.Product).yield_per(1000):
+            entry = _IndexedProduct(product_schemas.Product.model_validate(db_product))
+            slot = len(entries)
+            entries.append(entry)
+            slot_by_id[entry.record.product_id] = slot
+            if entry.record.sku:
+                slot_by_sku[entry.record.sku] = slot
+            for gram in entry.grams:
+                postings.setdefault(gram, []).append(slot) # Slot bertambah, jadi posting list sudah terurut
+
+        with self._lock:
+            self._entries = entries
+            self._slot_by_id = slot_by_id
+            self._slot_by_sku = slot_by_sku
+            self._postings = {gram: array("I", slots) for gram, slots in postings.items()}
+            self.ready = True
+            self.built_at = started_at
+            self.last_sync_at = started_at
+        logger.info(f"Indeks produk dibangun: {len(slot_by_id)} produk, {len(postings)} trigram.")
+
+    def upsert(self, product: Any) -> None:
+        """Menambah / memperbarui satu produk (objek ORM atau skema Product)."""
+        record = product if isinstance(product, product_schemas.Product) else product_schemas.Product.model_validate(product)
+        entry = _IndexedProduct(record)
+        with self._lock:
+            if not self.ready:
+                return
+            slot = self._slot_by_id.get(record.product_id)
+            if slot is None:
+                slot = len(self._entries)
+                self._entries.append(entry)
+                self._slot_by_id[record.product_id] = slot
+                old_grams: Set[str] = set()
+            else:
+                old_grams = self._entries[slot].grams
+                self._unmap_sku(slot)
+                self._entries[slot] = entry
+            if record.sku:
+                self._slot_by_sku[record.sku] = slot
+            for gram in old_grams - entry.grams:
+                self._remove_posting(gram, slot)
+            for gram in entry.grams - old_grams:
+                self._add_posting(gram, slot)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            slot = self._slot_by_id.pop(product_id, None)
+            if slot is None:
+                return
+            for gram in self._entries[slot].grams:
+                self._remove_posting(gram, slot)
+            self._unmap_sku(slot)
+            self._entries[slot] = None
+
+    def _unmap_sku(self, slot: int) -> None:
+        old_sku = self._entries[slot].record.sku
+        if old_sku and self._slot_by_sku.get(old_sku) == slot:
+            del self._slot_by_sku[old_sku]
+
+    def update_stock(self, stock_by_product_id: Dict[int, int]) -> None:
+        """Memperbarui current_stock beberapa produk (dipanggil setelah commit)."""
+        with self._lock:
+            for product_id, current_stock in stock_by_product_id.items():
+                slot = self._slot_by_id.get(product_id)
+                if slot is not None:
+                    entry = self._entries[slot]
+                    entry.record = entry.record.model_copy(update={"current_stock": current_stock})
+
+    def stage_stock_changes(self, db: Session, stock_by_product_id: Dict[int, int]) -> None:
+        """Mencatat stok baru di sesi; diterapkan ke indeks hanya jika transaksi di-commit."""
+        db.info.setdefault(_SESSION_PENDING_STOCK_KEY, {}).update(stock_by_product_id)
+
+    def stage_removal(self, db: Session, product_id: int) -> None:
+        """Mencatat produk yang dihapus di sesi; dikeluarkan dari indeks hanya jika transaksi di-commit."""
+        db.info.setdefault(_SESSION_PENDING_REMOVALS_KEY, set()).add(product_id)
+
+    def _add_posting(self, gram: str, slot: int) -> None:
+        slots = self._postings.get(gram)
+        if slots is None:
+            self._postings[gram] = array("I", [slot])
+        else:
+            bisect.insort(slots, slot)
+
+    def _remove_posting(self, gram: str, slot: int) -> None:
+        slots = self._postings.get(gram)
+        if slots is None:
+            return
+        position = bisect.bisect_left(slots, slot)
+        if position < len(slots) and slots[position] == slot:
+            del slots[position]
+        if not slots:
+            del self._postings[gram]
+
+    # --- Sinkronisasi berkala ---
+
+    def sync_changes(self, db: Session) -> int:
+        """
+        Memuat ulang produk yang berubah sejak sinkronisasi terakhir (termasuk dari worker lain), lalu membuang
+        produk yang sudah dihapus permanen (tidak terlihat lewat updated_at): jika COUNT(*) tabel berbeda dari
+        jumlah produk di indeks, himpunan ID dibandingkan dan ID yang tidak ada lagi di tabel dikeluarkan.
+        Return: jumlah produk yang diperbarui atau dikeluarkan.
+        """
+        if not self.ready:
+            return 0
+        started_at = datetime.now(timezone.utc)
+        since = self.last_sync_at - timedelta(seconds=5) # Toleransi selisih jam aplikasi vs database
+        changed = db.query(models_db.Product).filter(models_db.Product.updated_at >= since).all()
+        for db_product in changed:
+            self.upsert(db_product)
+
+        removed = 0
+        table_count = db.query(func.count(models_db.Product.product_id)).scalar() or 0
+        with self._lock:
+            # Diambil SEBELUM membaca ID tabel: produk yang masuk indeks setelahnya tidak pernah dianggap terhapus
+            indexed_ids = set(self._slot_by_id)
+        if len(indexed_ids) != table_count: # Produk baru sudah masuk lewat upsert; selisih berarti ada yang dihapus
+            existing_ids = {product_id for (product_id,) in db.query(models_db.Product.product_id)}
+            deleted_ids = indexed_ids - existing_ids
+            for product_id in deleted_ids:
+                self.remove(product_id)
+            removed = len(deleted_ids)
+
+        self.last_sync_at = started_at
+        return len(changed) + removed
+
+    def start_background_sync(self, session_factory: Callable[[], Session], interval_seconds: float) -> None:
+        if self._sync_thread is not None or interval_seconds <= 0:
+            return
+
+        def run():
+            while not self._stop_sync.wait(interval_seconds):
+                db = session_factory()
+                try:
+                    self.sync_changes(db)
+                except Exception as e:
+                    logger.warning(f"Sinkronisasi indeks produk gagal: {e}")
+                finally:
+                    db.close()
+
+        self._stop_sync.clear()
+        self._sync_thread = threading.Thread(target=run, name="product-index-sync", daemon=True)
+        self._sync_thread.start()
+
+    def stop_background_sync(self) -> None:
+        self._stop_sync.set()
+        self._sync_thread = None
+
+    # --- Query ---
+
+    def _candidate_slots(self, grams: Set[str]) -> List[int]:
+        """Irisan posting list semua trigram query, dimulai dari yang terpendek."""
+        posting_lists = [self._postings.get(gram) for gram in grams]
+        if not posting_lists or any(slots is None for slots in posting_lists):
+            return []
+        posting_lists.sort(key=len)
+        candidates = set(posting_lists[0])
+        for slots in posting_lists[1:]:
+            candidates.intersection_update(slots)
+            if not candidates:
+                break
+        return list(candidates)
+
+    def _rank_key(self, entry: _IndexedProduct, query: str, query_words: List[str]) -> Tuple:
+        if entry.sku and entry.sku == query:
+            tier = 0
+        elif entry.name.startswith(query):
+            tier = 1
+        elif query in entry.name:
+            tier = 2
+        else:
+            tier = 3
+        position = entry.name.find(query_words[0])
+        return (tier, position if position >= 0 else sys.maxsize, len(entry.name), entry.name, entry.record.product_id)
+
+    def suggest(self, query: str, limit: int = 10, only_active: bool = True) -> List[product_schemas.Product]:
+        """
+        Saran produk untuk `query`: setiap kata query harus menjadi awalan kata di nama/SKU;
+        jika hasil kurang dari limit, dilengkapi kecocokan di tengah kata (infix).
+        Diurutkan seperti pencarian DB: SKU persis, awalan nama, posisi, nama terpendek.
+        """
+        normalized = normalize_text(query)
+        query_words = normalized.split()
+        if not query_words:
+            return []
+
+        with self._lock:
+            matches: Dict[int, _IndexedProduct] = {}
+            prefix_grams = set().union(*(_word_grams(word, prefix_only=True) for word in query_words))
+            for slot in self._candidate_slots(prefix_grams):
+                entry = self._entries[slot]
+                if entry and all(any(word.startswith(q) for word in entry.words) for q in query_words):
+                    matches[slot] = entry
+
+            infix_words = [word for word in query_words if len(word) >= 3]
+            if len(matches) < limit and len(infix_words) == len(query_words):
+                infix_grams = set().union(*(_word_grams(word, prefix_only=False) for word in infix_words))
+                for slot in self._candidate_slots(infix_grams):
+                    entry = self._entries[slot]
+                    if slot not in matches and entry and all(q in entry.name or q in entry.sku for q in query_words):
+                        matches[slot] = entry
+
+            ranked = sorted(
+                (entry for entry in matches.values() if entry.record.is_active or not only_active),
+                key=lambda entry: self._rank_key(entry, normalized, query_words)
+            )
+            return [entry.record for entry in ranked[:limit]]
+
+    def match(self, query: str, limit: int = 5, only_active: bool = True) -> List[ProductMatch]:
+        """
+        Kandidat produk untuk teks bebas (misal pesan bot), toleran terhadap salah ketik dan spasi:
+        kandidat diambil dari posting list trigram query, lalu diberi skor kemiripan trigram terhadap
+        nama, nama tanpa spasi, dan SKU. Nama/SKU yang sama persis (setelah normalisasi) mendapat skor 1.
+        """
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+        compact = normalized.replace(" ", "")
+        query_word_grams = _document_grams(normalized.split())
+        query_compact_grams = _document_grams([compact])
+
+        with self._lock:
+            hits: Counter = Counter()
+            for gram in query_word_grams | query_compact_grams:
+                hits.update(self._postings.get(gram, ()))
+
+            matches: List[ProductMatch] = []
+            # Hanya kandidat dengan trigram bersama terbanyak yang dihitung skornya
+            for slot, _ in hits.most_common(max(limit * 10, 50)):
+                entry = self._entries[slot]
+                if entry is None or (only_active and not entry.record.is_active):
+                    continue
+                if compact in (entry.compact_name, entry.sku.replace(" ", "")):
+                    score, matched_on = 1.0, ("compact_name" if compact == entry.compact_name else "sku")
+                else:
+                    score, matched_on = entry.match_score(query_word_grams, query_compact_grams)
+                matches.append(ProductMatch(entry.record, round(score, 4), matched_on))
+
+        matches.sort(key=lambda match: (-match.score, len(match.product.name), match.product.name))
+        return matches[:limit]
+
+    def resolve(
+            self,
+            query: str,
+            min_score: float,
+            confident_score: float,
+            margin: float,
+            limit: int = 5,
+            only_active: bool = True
+        ) -> ProductResolution:
+        """
+        Menentukan satu produk untuk query, atau daftar pilihan jika tidak yakin:
+        - "matched": skor teratas >= confident_score dan unggul >= margin dari kandidat kedua;
+        - "ambiguous": ada kandidat dengan skor >= min_score tetapi syarat di atas tidak terpenuhi;
+        - "not_found": tidak ada kandidat dengan skor >= min_score.
+        """
+        candidates = [match for match in self.match(query, limit=limit, only_active=only_active) if match.score >= min_score]
+        if not candidates:
+            return ProductResolution("not_found", None, [])
+
+        best = candidates[0]
+        runner_up_score = candidates[1].score if len(candidates) > 1 else 0.0
+        if best.score >= confident_score and best.score - runner_up_score >= margin:
+            return ProductResolution("matched", best.product, candidates)
+        return ProductResolution("ambiguous", None, candidates)
+
+    def get(self, product_id: int) -> Optional[product_schemas.Product]:
+        with self._lock:
+            slot = self._slot_by_id.get(product_id)
+            return self._entries[slot].record if slot is not None else None
+
+    def get_by_sku(self, sku: str) -> Optional[product_schemas.Product]:
+        with self._lock:
+            slot = self._slot_by_sku.get(sku)
+            return self._entries[slot].record if slot is not None else None
+
+    def get_many_by_sku(self, skus: Iterable[str]) -> Dict[str, product_schemas.Product]:
+        """SKU -> produk untuk SKU yang ada di indeks (SKU yang tidak ada dilewati)."""
+        with self._lock:
+            return {
+                sku: self._entries[self._slot_by_sku[sku]].record
+                for sku in skus if sku in self._slot_by_sku
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Ukuran indeks dan perkiraan memori (byte) struktur indeks di worker ini."""
+        with self._lock:
+            postings_bytes = sys.getsizeof(self._postings) + sum(
+                sys.getsizeof(gram) + sys.getsizeof(slots) for gram, slots in self._postings.items()
+            )
+            entries_bytes = sys.getsizeof(self._entries) + sys.getsizeof(self._slot_by_id) + sys.getsizeof(self._slot_by_sku) + sum(
+                sys.getsizeof(entry) + sys.getsizeof(entry.name) + sys.getsizeof(entry.sku)
+                + sys.getsizeof(entry.compact_name) + sys.getsizeof(entry.words) + sys.getsizeof(entry.grams)
+                + sys.getsizeof(entry.name_grams) + sys.getsizeof(entry.compact_grams) + sys.getsizeof(entry.sku_grams)
+                + sys.getsizeof(entry.record) + sum(sys.getsizeof(v) for v in entry.record.__dict__.values())
+                for entry in self._entries if entry is not None
+            )
+            return {
+                "ready": self.ready,
+                "products": len(self._slot_by_id),
+                "skus": len(self._slot_by_sku),
+                "grams": len(self._postings),
+                "postings": sum(len(slots) for slots in self._postings.values()),
+                "approx_memory_bytes": {
+                    "postings": postings_bytes,
+                    "entries": entries_bytes,
+                    "total": postings_bytes + entries_bytes,
+                },
+                "built_at": self.built_at,
+                "last_sync_at": self.last_sync_at,
+            }
+
+product_index = ProductIndex()
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_stock_changes(session: Session) -> None:
+    pending = session.info.pop(_SESSION_PENDING_STOCK_KEY, None)
+    if pending:
+        product_index.update_stock(pending)
+    for product_id in session.info.pop(_SESSION_PENDING_REMOVALS_KEY, ()):
+        product_index.remove(product_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_stock_changes(session: Session) -> None:
+    session.info.pop(_SESSION_PENDING_STOCK_KEY, None)
+    session.info.pop(_SESSION_PENDING_REMOVALS_KEY, None)
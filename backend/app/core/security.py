@@ -1,22 +1,39 @@
 # backend/app/core/security.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Optional, Any
+from typing import Optional, Any, Tuple, Dict, Set
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.schemas import token_schemas, user_schemas # Impor skema yang dibutuhkan
-from app.db.database import get_db # Impor get_db yang sebenarnya
+from app.db.database import AsyncSessionLocal # Sesi async agar dependency ini tidak memblokir event loop
 
 # Impor crud_user akan dilakukan di dalam fungsi untuk menghindari circular import awal
 # atau bisa diletakkan di atas jika tidak menyebabkan masalah.
 
 # Konfigurasi untuk hashing password
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min_rounds = max_rounds = cost yang dikonfigurasi, sehingga hash dengan cost lain ditandai perlu di-rehash.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Pool thread terbatas untuk bcrypt (~200 ms per operasi) agar tidak memblokir event loop.
+# Jumlah operasi bersamaan dibatasi PASSWORD_HASH_WORKERS; permintaan lain mengantre di pool.
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
 
 # Skema OAuth2 untuk mendapatkan token dari header Authorization
 # tokenUrl akan menunjuk ke endpoint login Anda.
@@ -33,6 +50,27 @@ def get_password_hash(password: str) -> str:
     """Menghasilkan hash dari password."""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Versi awaitable dari verify_password; bcrypt dijalankan di pool thread hashing."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_hash_executor, pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Memverifikasi password di pool thread hashing.
+    Return: (valid, hash_baru). hash_baru terisi jika hash lama memakai cost bcrypt yang berbeda
+    dari BCRYPT_ROUNDS dan perlu disimpan ulang; None jika tidak perlu.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+async def get_password_hash_async(password: str) -> str:
+    """Versi awaitable dari get_password_hash; bcrypt dijalankan di pool thread hashing."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_hash_executor, pwd_context.hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Membuat access token JWT.
@@ -52,17 +90,99 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
     return encoded_jwt
 
+class PrincipalCache:
+    """
+    Cache in-process untuk hasil get_current_user, dikunci per (user_id, token).
+    - Setiap entri berlaku maksimal ttl_seconds dan tidak melewati waktu kadaluarsa token.
+    - Ukuran dibatasi max_size; entri yang paling lama tidak dipakai dibuang lebih dulu (LRU).
+    - invalidate_user() dipanggil oleh crud_user saat data user berubah/dihapus.
+    Catatan: invalidasi hanya berlaku di worker yang menjalankan perubahan; di worker lain data
+    paling lama basi selama ttl_seconds.
+    """
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[Any, str], Tuple[float, user_schemas.User]]" = OrderedDict()
+        self._keys_by_user_id: Dict[int, Set[Tuple[Any, str]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token_user_key: Any, token: str) -> Optional[user_schemas.User]:
+        key = (token_user_key, token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token_user_key: Any, token: str, user: user_schemas.User, token_expires_at: Optional[float] = None) -> None:
+        if self.ttl_seconds <= 0 or self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, time.monotonic() + (token_expires_at - time.time()))
+        key = (token_user_key, token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, user)
+            self._keys_by_user_id.setdefault(user.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._keys_by_user_id.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user_id.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+    def _remove(self, key: Tuple[Any, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._keys_by_user_id.get(entry[1].user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_user_id[entry[1].user_id]
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS, max_size=settings.PRINCIPAL_CACHE_MAX_SIZE
+)
+
 async def get_current_user(
-        db: Session = Depends(get_db), # Menggunakan get_db langsung
         token: str = Depends(oauth2_scheme)
     ) -> user_schemas.User: # Tipe hint yang lebih spesifik
     """
     Dependency untuk mendapatkan user saat ini berdasarkan token JWT.
     Mendekode token, mengekstrak username (subject), dan mengambil user dari database.
+    Hasilnya disimpan di principal_cache sehingga request berikutnya dengan token yang sama tidak query ulang.
+    Sesi async dibuka hanya selama query user (bukan sepanjang request), sehingga endpoint sinkron
+    tidak memegang koneksi pool async di samping koneksi sesi sinkronnya.
     """
-    # Impor crud_user di sini untuk menghindari circular import
-    # jika security.py diimpor oleh crud_user atau sebaliknya secara tidak langsung.
-    from app.crud import crud_user
+    # Impor crud_user_async di sini untuk menghindari circular import
+    # jika security.py diimpor oleh crud_user_async atau sebaliknya secara tidak langsung.
+    from app.crud import crud_user_async
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -81,12 +201,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user_in_db = crud_user.get_user_by_username(db=db, username=token_data.username)
-    if user_in_db is None:
-        raise credentials_exception
+    # Token sudah diverifikasi (tanda tangan & exp) di atas; cache hanya menggantikan query user
+    token_user_key = payload.get("user_id", username)
+    cached_user = principal_cache.get(token_user_key, token)
+    if cached_user is not None:
+        return cached_user
+
+    async with AsyncSessionLocal() as db:
+        user_in_db = await crud_user_async.get_user_by_username(db=db, username=token_data.username)
+        if user_in_db is None:
+            raise credentials_exception
         # Mengembalikan data user sesuai skema User (tanpa password_hash)
+        current_user = user_schemas.User.model_validate(user_in_db)
+    principal_cache.set(token_user_key, token, current_user, token_expires_at=payload.get("exp"))
 
-    return user_schemas.User.model_validate(user_in_db)
+    return current_user
 
 async def get_current_active_user(
         current_user: user_schemas.User = Depends(get_current_user)
@@ -4,6 +4,7 @@ from typing import Optional, List, Dict, Any
 
 from app.db import models_db
 from app.schemas import category_schemas
+from app.core.catalog_version import mark_catalog_changed # Versi katalog untuk ETag (kategori ikut di respons produk)
 
 def get_category(db: Session, category_id: int) -> Optional[models_db.Category]:
     """Mengambil satu kategori berdasarkan ID."""
@@ -30,6 +31,7 @@ def create_category(db: Session, category: category_schemas.CategoryCreate) -> m
         description=category.description
     )
     db.add(db_category)
+    mark_catalog_changed(db)
     db.commit()
     db.refresh(db_category)
 
@@ -49,6 +51,7 @@ def update_category(
         setattr(db_category, field, value)
 
     db.add(db_category)
+    mark_catalog_changed(db)
     db.commit()
     db.refresh(db_category)
 
@@ -61,6 +64,7 @@ def delete_category(db: Session, category_id: int) -> Optional[models_db.Categor
         # Pertimbangkan apa yang terjadi pada produk jika kategori dihapus.
         # Model Product memiliki ondelete="SET NULL" untuk category_id.
         db.delete(db_category)
+        mark_catalog_changed(db)
         db.commit()
 
     return db_category
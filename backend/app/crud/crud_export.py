@@ -0,0 +1,127 @@
+# backend/app/crud/crud_export.py
+# Ekspor order & item order (CSV / NDJSON) secara streaming lewat server-side cursor.
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from app.db import models_db
+from app.db.database import engine
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_BATCH_SIZE = 1000 # Jumlah baris per fetch dari server-side cursor (dan per chunk respons)
+
+def build_orders_export_query(start_date: date, end_date: date, status: Optional[str] = None):
+    """SELECT Core kolom order (tanpa ORM/relasi) untuk rentang tanggal inklusif, urut (created_at, order_id)."""
+    orders = models_db.Order.__table__
+    stmt = (
+        select(
+            orders.c.order_id,
+            orders.c.order_number,
+            orders.c.created_at,
+            orders.c.order_status,
+            orders.c.payment_method,
+            orders.c.source,
+            orders.c.user_id,
+            orders.c.total_amount,
+            orders.c.notes,
+        )
+        .where(orders.c.created_at >= start_date)
+        .where(orders.c.created_at < end_date + timedelta(days=1))
+        .order_by(orders.c.created_at, orders.c.order_id)
+    )
+    if status:
+        stmt = stmt.where(orders.c.order_status == status)
+
+    return stmt
+
+def build_order_items_export_query(start_date: date, end_date: date, status: Optional[str] = None):
+    """SELECT Core item order beserta nomor order dan nama/SKU produk, urut (created_at, order_id, order_item_id)."""
+    orders = models_db.Order.__table__
+    items = models_db.OrderItem.__table__
+    products = models_db.Product.__table__
+    stmt = (
+        select(
+            items.c.order_item_id,
+            items.c.order_id,
+            orders.c.order_number,
+            orders.c.created_at,
+            orders.c.order_status,
+            items.c.product_id,
+            products.c.sku.label("product_sku"),
+            products.c.name.label("product_name"),
+            items.c.quantity,
+            items.c.price_at_transaction,
+            items.c.cost_at_transaction,
+            items.c.subtotal,
+        )
+        .select_from(orders)
+        .join(items, items.c.order_id == orders.c.order_id)
+        .join(products, products.c.product_id == items.c.product_id)
+        .where(orders.c.created_at >= start_date)
+        .where(orders.c.created_at < end_date + timedelta(days=1))
+        .order_by(orders.c.created_at, orders.c.order_id, items.c.order_item_id)
+    )
+    if status:
+        stmt = stmt.where(orders.c.order_status == status)
+
+    return stmt
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa diserialisasi ke JSON")
+
+def _serialize_rows(rows, columns: List[str], export_format: str, include_header: bool) -> str:
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        if include_header:
+            writer.writerow(columns)
+        writer.writerows(
+            [value.isoformat() if isinstance(value, datetime) else value for value in row]
+            for row in rows
+        )
+    else:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False))
+            buffer.write("\n")
+
+    return buffer.getvalue()
+
+def stream_export(stmt, export_format: str, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Generator chunk bytes hasil ekspor. Memakai koneksi sendiri (bukan sesi request, yang sudah
+    ditutup saat respons mulai di-stream) dengan stream_results + yield_per, sehingga memori tetap
+    datar berapapun rentang tanggalnya. Jika gzip=True, output dikompresi secara streaming.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format ekspor '{export_format}' tidak didukung.")
+
+    compressor = zlib.compressobj(wbits=31) if gzip else None # wbits=31 -> format gzip
+
+    def emit(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    columns = [column.key for column in stmt.selected_columns]
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+        include_header = True
+        for partition in result.partitions():
+            chunk = emit(_serialize_rows(partition, columns, export_format, include_header))
+            include_header = False
+            if chunk:
+                yield chunk
+        if include_header and export_format == "csv": # Tidak ada baris: tetap kirim header CSV
+            yield emit(_serialize_rows([], columns, export_format, include_header=True))
+
+    if compressor:
+        yield compressor.flush()
@@ -1,22 +1,105 @@
 # backend/app/crud/crud_order.py
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload, selectinload
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime, timezone
+from collections import deque
+import threading
 import shortuuid # pip install shortuuid
 
+from app.core.config import settings
 from app.db import models_db
 from app.schemas import order_schemas
-from .crud_product import get_product
-from .crud_stock import record_sale_stock_deduction # Untuk mencatat pengurangan stok
+from app.utils.pagination import paginate_query
+from .crud_product import get_products_by_ids
+from .crud_stock import record_sale_stock_deductions, record_sales_stock_deductions # Untuk mengurangi stok & mencatat log penjualan
+from .crud_sales_rollup import apply_orders_to_rollup, snapshot_order_items # Rollup daily_product_sales dipelihara dalam transaksi yang sama
+from .crud_report import invalidate_dashboard_cache
+from .crud_report_jobs import invalidate_report_jobs_for_dates # Hasil laporan periode tutup yang ordernya berubah
 
-def generate_order_number() -> str:
-    """Menghasilkan nomor order unik."""
+ORDER_NUMBER_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ORDER_NUMBER_SUFFIX_LENGTH = 6
+_ORDER_NUMBER_SPACE = len(ORDER_NUMBER_ALPHABET) ** ORDER_NUMBER_SUFFIX_LENGTH
+# Pengali & offset untuk mengacak urutan sequence; pengali relatif prima terhadap 36^6 (ganjil, bukan kelipatan 3)
+# sehingga pemetaan n -> suffix adalah bijeksi dan tidak pernah bertabrakan.
+_ORDER_NUMBER_MULTIPLIER = 1_654_615_999
+_ORDER_NUMBER_OFFSET = 604_661_760
+
+def format_order_number(sequence_value: int, order_date: Optional[datetime] = None) -> str:
+    """Membentuk nomor order INV-YYYYMMDD-XXXXXX dari nilai sequence (unik selama < 36^6 order)."""
+    date_prefix = (order_date or datetime.now()).strftime("%Y%m%d")
+    n = (sequence_value * _ORDER_NUMBER_MULTIPLIER + _ORDER_NUMBER_OFFSET) % _ORDER_NUMBER_SPACE
+    suffix = []
+    for _ in range(ORDER_NUMBER_SUFFIX_LENGTH):
+        n, digit = divmod(n, len(ORDER_NUMBER_ALPHABET))
+        suffix.append(ORDER_NUMBER_ALPHABET[digit])
+
+    return f"INV-{date_prefix}-{''.join(reversed(suffix))}"
+
+class OrderNumberAllocator:
+    """
+    Mengalokasikan nomor order dari sequence database `order_number_seq` tanpa cek keberadaan.
+    Setiap worker mengambil satu blok nilai sekaligus (satu query nextval ... generate_series)
+    lalu memakainya dari memori; sequence menjamin blok antar worker tidak pernah tumpang tindih.
+    Nilai yang tidak terpakai (misal worker restart atau transaksi rollback) hanya menjadi celah.
+    """
+    def __init__(self, block_size: int):
+        self.block_size = max(1, block_size)
+        self._values = deque()
+        self._lock = threading.Lock()
+
+    def allocate(self, db: Session, count: int = 1) -> List[int]:
+        # Lock hanya dipegang untuk operasi memori, tidak selama query ke database
+        # (allocate juga bisa berjalan di event loop lewat AsyncSession.run_sync).
+        with self._lock:
+            if len(self._values) >= count:
+                return [self._values.popleft() for _ in range(count)]
+
+        fetched = db.execute(
+            select(models_db.order_number_seq.next_value())
+            .select_from(func.generate_series(1, max(self.block_size, count)))
+        ).scalars().all()
+
+        with self._lock:
+            self._values.extend(fetched)
+            return [self._values.popleft() for _ in range(count)]
+
+order_number_allocator = OrderNumberAllocator(block_size=settings.ORDER_NUMBER_BLOCK_SIZE)
+
+def generate_order_number(order_date: Optional[datetime] = None) -> str:
+    """Menghasilkan nomor order acak (dipakai jika database tidak mendukung sequence, misal SQLite)."""
     # Format: INV-YYYYMMDD-XXXXXX (X adalah random alphanumeric)
-    date_prefix = datetime.now().strftime("%Y%m%d")
+    date_prefix = (order_date or datetime.now()).strftime("%Y%m%d")
     random_suffix = shortuuid.ShortUUID().random(length=6).upper()
 
     return f"INV-{date_prefix}-{random_suffix}"
 
+def allocate_order_numbers(db: Session, order_dates: List[Optional[datetime]]) -> List[str]:
+    """
+    Mengalokasikan satu nomor order unik untuk setiap tanggal order.
+    Di PostgreSQL nomor berasal dari sequence (tanpa SELECT cek keberadaan);
+    di database lain digunakan nomor acak yang dicek dengan satu query IN per putaran.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        sequence_values = order_number_allocator.allocate(db, count=len(order_dates))
+        return [format_order_number(value, order_date) for value, order_date in zip(sequence_values, order_dates)]
+
+    order_numbers = [generate_order_number(order_date) for order_date in order_dates]
+    while True:
+        taken = {
+            row.order_number for row in
+            db.query(models_db.Order.order_number).filter(models_db.Order.order_number.in_(order_numbers))
+        }
+        duplicates = len(order_numbers) != len(set(order_numbers))
+        if not taken and not duplicates:
+            return order_numbers
+        seen = set()
+        for i, order_number in enumerate(order_numbers):
+            if order_number in taken or order_number in seen:
+                order_numbers[i] = generate_order_number(order_dates[i])
+            seen.add(order_numbers[i])
+
 def get_order(db: Session, order_id: int, load_items: bool = True, load_user: bool = False) -> Optional[models_db.Order]:
     query = db.query(models_db.Order)
     if load_items:
@@ -44,9 +127,14 @@ def get_orders(
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         status: Optional[str] = None,
-        load_items: bool = False
+        load_items: bool = False,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None
     ) -> Dict[str, Any]:
-    """Mengambil daftar order dengan filter, paginasi, dan total count."""
+    """
+    Mengambil daftar order dengan filter, paginasi, dan total count.
+    Jika cursor diisi, paginasi memakai keyset (created_at, order_id) dan skip diabaikan.
+    """
     query = db.query(models_db.Order)
 
     if load_items:
@@ -63,55 +151,90 @@ def get_orders(
     if status:
         query = query.filter(models_db.Order.order_status == status)
 
-    total = query.count()
-    
-    orders_data = query.order_by(models_db.Order.created_at.desc()).offset(skip).limit(limit).all()
-
-    return {"total": total, "data": orders_data}
+    return paginate_query(
+        query,
+        order_columns=[models_db.Order.created_at, models_db.Order.order_id],
+        descending=True,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total
+    )
 
-def create_order(
-        db: Session, order_in: order_schemas.OrderCreate, current_user_id: Optional[int] = None
-    ) -> models_db.Order:
+def _price_order_items(
+        order_in: order_schemas.OrderCreate,
+        products_by_id: Dict[int, models_db.Product],
+        available_stock: Dict[int, int]
+    ) -> Tuple[List[Dict[str, Any]], Any]:
     """
-    Membuat order baru, termasuk item order, memperbarui stok produk, 
-    dan mencatat log inventaris dengan status kondisional.
+    Memvalidasi item order di memori (produk ada, aktif, stok cukup) dan menghitung harga.
+    available_stock adalah sisa stok per produk yang masih bisa dijual; hanya dikurangi jika seluruh order valid.
+    Return: (list dict item order, total_amount). Melempar ValueError jika order tidak valid.
     """
     total_amount = 0
-    db_order_items = []
+    order_items = []
 
-    # 1. Validasi item dan hitung total
+    requested_qty: Dict[int, int] = {} # Total kuantitas per produk (produk bisa muncul di beberapa baris)
     for item_in in order_in.items:
-        db_product = get_product(db, product_id=item_in.product_id)
+        db_product = products_by_id.get(item_in.product_id)
         if not db_product:
             raise ValueError(f"Produk dengan ID {item_in.product_id} tidak ditemukan.")
         if not db_product.is_active:
             raise ValueError(f"Produk '{db_product.name}' tidak aktif dan tidak dapat dipesan.")
-        if db_product.current_stock < item_in.quantity:
-            raise ValueError(f"Stok produk '{db_product.name}' tidak mencukupi (tersisa: {db_product.current_stock}, diminta: {item_in.quantity}).")
+
+        requested_qty[item_in.product_id] = requested_qty.get(item_in.product_id, 0) + item_in.quantity
+        if available_stock[item_in.product_id] < requested_qty[item_in.product_id]:
+            raise ValueError(f"Stok produk '{db_product.name}' tidak mencukupi (tersisa: {available_stock[item_in.product_id]}, diminta: {requested_qty[item_in.product_id]}).")
 
         price_at_transaction = db_product.selling_price
         subtotal = price_at_transaction * item_in.quantity
         total_amount += subtotal
 
-        db_order_item = models_db.OrderItem(
-            product_id=item_in.product_id,
-            quantity=item_in.quantity,
-            price_at_transaction=price_at_transaction,
-            subtotal=subtotal
-        )
-        db_order_items.append(db_order_item)
+        order_items.append({
+            "product_id": item_in.product_id,
+            "quantity": item_in.quantity,
+            "price_at_transaction": price_at_transaction,
+            "cost_at_transaction": db_product.purchase_price, # Harga beli saat transaksi (untuk laporan profit)
+            "category_id_at_transaction": db_product.category_id or 0, # Kunci rollup per kategori
+            "subtotal": subtotal,
+        })
 
-    # 2. Tentukan status order berdasarkan metode pembayaran
-    initial_order_status = "completed" # Default jika tidak ada kondisi lain
-    if order_in.payment_method and order_in.payment_method.lower() != "cash":
-        initial_order_status = "pending"
+    for product_id, quantity in requested_qty.items():
+        available_stock[product_id] -= quantity
+
+    return order_items, total_amount
+
+def _initial_order_status(payment_method: Optional[str]) -> str:
+    """Menentukan status awal order berdasarkan metode pembayaran."""
+    if payment_method and payment_method.lower() != "cash":
+        return "pending"
     # Anda bisa menambahkan logika lebih lanjut di sini jika perlu
     # misalnya, jika payment_method null, bisa dianggap 'pending' atau 'draft'
+    return "completed" # Default jika tidak ada kondisi lain
+
+def create_order(
+        db: Session, order_in: order_schemas.OrderCreate, current_user_id: Optional[int] = None
+    ) -> models_db.Order:
+    """
+    Membuat order baru, termasuk item order, memperbarui stok produk, 
+    dan mencatat log inventaris dengan status kondisional.
+    Semua produk di keranjang dimuat dengan satu query dan divalidasi di memori; stok dikurangi
+    dengan satu UPDATE bersyarat (current_stock + delta >= 0) sehingga penjualan bersamaan aman
+    tanpa mengunci baris sejak awal. Semuanya ditulis dengan satu commit.
+    """
+    # 1. Muat semua produk sekaligus, lalu validasi item dan hitung total di memori
+    products_by_id = get_products_by_ids(
+        db, product_ids=[item_in.product_id for item_in in order_in.items]
+    )
+    available_stock = {product_id: p.current_stock for product_id, p in products_by_id.items()}
+    order_items, total_amount = _price_order_items(order_in, products_by_id, available_stock)
+    db_order_items = [models_db.OrderItem(**item) for item in order_items]
+
+    # 2. Tentukan status order berdasarkan metode pembayaran
+    initial_order_status = _initial_order_status(order_in.payment_method)
 
     # 3. Buat objek Order utama
-    order_number = generate_order_number()
-    while get_order_by_order_number(db, order_number):
-        order_number = generate_order_number()
+    order_number = allocate_order_numbers(db, [None])[0]
 
     db_order = models_db.Order(
         order_number=order_number,
@@ -125,35 +248,203 @@ def create_order(
     db.add(db_order)
     db.flush() # Dapatkan order_id untuk db_order sebelum menambah items
 
-    # 4. Kaitkan OrderItems dengan Order, kurangi stok produk & catat log
+    # 4. Kaitkan OrderItems dengan Order, kurangi stok semua produk dengan satu UPDATE & catat log
     for db_item_to_add in db_order_items:
         db_item_to_add.order_id = db_order.order_id
         db.add(db_item_to_add)
-        try:
-            record_sale_stock_deduction(
-                db,
-                product_id=db_item_to_add.product_id,
-                quantity_sold=db_item_to_add.quantity,
-                order_id=db_order.order_id,
-                user_id=current_user_id
-            )
-        except ValueError as e:
-            db.rollback()
-            raise ValueError(f"Gagal memproses item '{get_product(db, db_item_to_add.product_id).name}': {str(e)}")
 
-    # 5. Commit semua perubahan jika berhasil
+    try:
+        record_sale_stock_deductions(
+            db,
+            items=[(db_item.product_id, db_item.quantity) for db_item in db_order_items],
+            order_id=db_order.order_id,
+            user_id=current_user_id
+        )
+    except ValueError as e:
+        db.rollback()
+        raise ValueError(f"Gagal memproses order: {str(e)}")
+
+    # 5. Order yang langsung 'completed' masuk ke rollup penjualan harian
+    if initial_order_status == "completed":
+        db.flush() # Item order harus ada di DB sebelum diagregasi
+        apply_orders_to_rollup(db, order_ids=[db_order.order_id])
+
+    # 6. Commit semua perubahan sekaligus (item, stok, log, rollup) jika berhasil
     db.commit()
+    invalidate_dashboard_cache()
     db.refresh(db_order)
-    # Opsional: refresh items jika diperlukan dalam respons langsung
-    for item in db_order.items:
-        db.refresh(item)
-        if item.product:
-            db.refresh(item.product)
 
     return db_order
 
+def _find_orders_by_client_reference(
+        db: Session, client_references: List[str], user_id: Optional[int]
+    ) -> Dict[str, models_db.Order]:
+    """Order yang sudah tersimpan untuk client_reference milik pengguna tersebut (satu query IN)."""
+    if not client_references:
+        return {}
+
+    user_filter = models_db.Order.user_id == user_id if user_id is not None else models_db.Order.user_id.is_(None)
+    existing = (
+        db.query(models_db.Order)
+        .filter(user_filter)
+        .filter(models_db.Order.client_reference.in_(client_references))
+        .all()
+    )
+    return {order.client_reference: order for order in existing}
+
+def create_orders_batch(
+        db: Session, orders_in: List[order_schemas.OrderBatchEntry], current_user_id: Optional[int] = None,
+        _retry_on_conflict: bool = True
+    ) -> List[Dict[str, Any]]:
+    """
+    Menyimpan banyak order sekaligus (sinkronisasi terminal POS yang sempat offline).
+    - Idempoten per client_reference (unik per pengguna): order yang sudah tersimpan tidak dibuat ulang dan
+      stok tidak dikurangi lagi; hasilnya berisi order yang sudah ada dengan replayed=True. client_reference
+      yang muncul dua kali dalam satu batch hanya diproses sekali.
+    - Semua produk dari semua order dimuat dan dikunci dengan satu query (SELECT ... FOR UPDATE),
+      sehingga validasi stok di memori berlaku sampai commit.
+    - Order divalidasi berurutan terhadap sisa stok; order yang tidak valid ditolak tanpa menggagalkan yang lain.
+    - Order, item, perubahan stok (diagregasi per produk) dan log inventaris ditulis dengan beberapa
+      statement set-based, lalu satu commit.
+    Return: list hasil per order (sesuai urutan input) dengan kunci sesuai skema OrderBatchResult.
+    """
+    existing_by_reference = _find_orders_by_client_reference(
+        db, list({order_in.client_reference for order_in in orders_in if order_in.client_reference}), current_user_id
+    )
+    products_by_id = get_products_by_ids(
+        db,
+        product_ids=[
+            item_in.product_id for order_in in orders_in
+            if order_in.client_reference not in existing_by_reference
+            for item_in in order_in.items
+        ],
+        for_update=True
+    )
+    available_stock = {product_id: p.current_stock for product_id, p in products_by_id.items()}
+
+    # 1. Validasi semua order di memori (kecuali yang sudah tersimpan sebelumnya)
+    results: List[Dict[str, Any]] = []
+    accepted = [] # (index hasil, order_in, order_items, total_amount, created_at)
+    first_index_by_reference: Dict[str, int] = {}
+    repeated = [] # (index hasil, index pertama dengan client_reference yang sama)
+    for index, order_in in enumerate(orders_in):
+        result = {"index": index, "client_reference": order_in.client_reference, "success": False}
+        results.append(result)
+        existing_order = existing_by_reference.get(order_in.client_reference)
+        if existing_order is not None:
+            result.update(_batch_result_fields(existing_order.order_id, existing_order.order_number,
+                                               existing_order.total_amount, existing_order.order_status))
+            result["replayed"] = True
+            continue
+        if order_in.client_reference:
+            if order_in.client_reference in first_index_by_reference:
+                repeated.append((index, first_index_by_reference[order_in.client_reference]))
+                continue
+            first_index_by_reference[order_in.client_reference] = index
+        try:
+            order_items, total_amount = _price_order_items(order_in, products_by_id, available_stock)
+        except ValueError as e:
+            result["error"] = str(e)
+            continue
+        created_at = order_in.client_created_at or datetime.now(timezone.utc)
+        accepted.append((index, order_in, order_items, total_amount, created_at))
+
+    if not accepted:
+        _copy_repeated_results(results, repeated)
+        return results
+
+    # 2. Sisipkan semua order dengan satu INSERT multi-baris
+    order_numbers = allocate_order_numbers(db, [created_at for *_, created_at in accepted])
+    order_rows = [
+        {
+            "order_number": order_number,
+            "user_id": current_user_id,
+            "total_amount": total_amount,
+            "payment_method": order_in.payment_method,
+            "order_status": _initial_order_status(order_in.payment_method),
+            "source": order_in.source,
+            "notes": order_in.notes,
+            "client_reference": order_in.client_reference,
+            "created_at": created_at,
+        }
+        for order_number, (_, order_in, _, total_amount, created_at) in zip(order_numbers, accepted)
+    ]
+    orders_table = models_db.Order.__table__
+    try:
+        inserted_orders = db.execute(
+            insert(orders_table).returning(orders_table.c.order_id, sort_by_parameter_order=True),
+            order_rows
+        ).all()
+    except IntegrityError:
+        # Batch yang sama sedang disimpan request lain (kirim ulang bersamaan): ulangi sekali,
+        # kali ini order tersebut ditemukan sebagai replay
+        db.rollback()
+        if not _retry_on_conflict:
+            raise
+        return create_orders_batch(db, orders_in, current_user_id, _retry_on_conflict=False)
+
+    # 3. Sisipkan semua item, kurangi stok per produk (agregat) dan catat log
+    item_rows = []
+    sold_items = [] # (order_id, product_id, quantity) sesuai urutan order
+    for inserted_order, (_, _, order_items, _, _) in zip(inserted_orders, accepted):
+        for item in order_items:
+            item_rows.append({**item, "order_id": inserted_order.order_id})
+            sold_items.append((inserted_order.order_id, item["product_id"], item["quantity"]))
+    db.execute(insert(models_db.OrderItem.__table__), item_rows)
+
+    try:
+        record_sales_stock_deductions(db, sold_items=sold_items, user_id=current_user_id)
+    except ValueError:
+        db.rollback()
+        raise
+
+    apply_orders_to_rollup(db, order_ids=[
+        inserted_order.order_id
+        for inserted_order, order_row in zip(inserted_orders, order_rows)
+        if order_row["order_status"] == "completed"
+    ])
+    # Order offline bisa bertanggal di periode yang laporannya sudah disimpan sebagai periode tutup
+    invalidate_report_jobs_for_dates(db, [_utc_date(order_row["created_at"]) for order_row in order_rows])
+
+    db.commit()
+    invalidate_dashboard_cache()
+
+    for inserted_order, order_row, (index, *_) in zip(inserted_orders, order_rows, accepted):
+        results[index].update(_batch_result_fields(
+            inserted_order.order_id, order_row["order_number"], order_row["total_amount"], order_row["order_status"]
+        ))
+    _copy_repeated_results(results, repeated)
+
+    return results
+
+def _utc_date(value: datetime) -> date:
+    """Tanggal UTC dari created_at (SQLite mengembalikan datetime naive yang sudah UTC)."""
+    return value.astimezone(timezone.utc).date() if value.tzinfo else value.date()
+
+def _batch_result_fields(order_id: int, order_number: str, total_amount, order_status: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "order_id": order_id,
+        "order_number": order_number,
+        "total_amount": float(total_amount),
+        "order_status": order_status,
+    }
+
+def _copy_repeated_results(results: List[Dict[str, Any]], repeated: List[Tuple[int, int]]) -> None:
+    """Entri dengan client_reference yang sudah muncul di batch yang sama memakai hasil entri pertamanya."""
+    for index, first_index in repeated:
+        first_result = results[first_index]
+        results[index].update({key: value for key, value in first_result.items() if key != "index"})
+        results[index]["replayed"] = first_result.get("success", False)
+
 def update_order_status(db: Session, order_id: int, new_status: str) -> Optional[models_db.Order]:
-    db_order = get_order(db, order_id=order_id, load_items=False) # Tidak perlu load item untuk hanya update status
+    # Baris order dikunci agar transisi status (dan penyesuaian rollup) tidak dihitung dua kali oleh request bersamaan
+    db_order = (
+        db.query(models_db.Order)
+        .filter(models_db.Order.order_id == order_id)
+        .with_for_update()
+        .first()
+    )
     if not db_order:
         return None # Router akan menangani ini dan mengubahnya menjadi 404
 
@@ -167,11 +458,21 @@ def update_order_status(db: Session, order_id: int, new_status: str) -> Optional
         print(f"PERINGATAN: Order {db_order.order_number} dibatalkan. Implementasikan logika pengembalian stok.")
         # Pastikan jika ada error di sini, transaksi di-rollback atau ditangani.
 
+    previous_status = db_order.order_status
     db_order.order_status = new_status
     db.add(db_order) # Tandai untuk disimpan
     
     try:
+        # Sesuaikan rollup penjualan jika order masuk ke / keluar dari status 'completed'
+        if previous_status != "completed" and new_status == "completed":
+            snapshot_order_items(db, order_ids=[order_id]) # Kunci & biaya yang ditambahkan sekarang dipakai lagi saat pembalikan
+            apply_orders_to_rollup(db, order_ids=[order_id])
+        elif previous_status == "completed" and new_status != "completed":
+            apply_orders_to_rollup(db, order_ids=[order_id], sign=-1)
+        if (previous_status == "completed") != (new_status == "completed") and db_order.created_at:
+            invalidate_report_jobs_for_dates(db, [_utc_date(db_order.created_at)])
         db.commit()
+        invalidate_dashboard_cache()
         db.refresh(db_order) # Muat ulang state dari DB setelah commit
         return db_order
     except Exception as e:
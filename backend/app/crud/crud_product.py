@@ -1,10 +1,17 @@
 # backend/app/crud/crud_product.py
+from sqlalchemy import update, case
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 
 from app.db import models_db
 from app.schemas import product_schemas
 from app.schemas.common_schemas import PaginatedResponse
+from app.utils.pagination import paginate_query
+from app.db.product_search import product_search_clauses
+from .crud_report import invalidate_dashboard_cache # Produk aktif & stok kritis ikut dihitung di dashboard
+from app.core.product_index import product_index # Indeks autocomplete in-process
+from app.core.catalog_version import mark_catalog_changed, mark_stock_changed # Versi katalog untuk ETag
 
 # Impor crud_stock untuk mencatat log inventaris awal jika diperlukan
 # from . import crud_stock # Akan menyebabkan circular import jika crud_stock juga impor crud_product
@@ -18,6 +25,24 @@ def get_product(db: Session, product_id: int, load_category: bool = False) -> Op
 
     return query.filter(models_db.Product.product_id == product_id).first()
 
+def get_products_by_ids(
+        db: Session, product_ids: List[int], for_update: bool = False
+    ) -> Dict[int, models_db.Product]:
+    """
+    Mengambil banyak produk sekaligus dalam satu query (WHERE product_id IN (...)).
+    Jika for_update=True, baris produk dikunci (SELECT ... FOR UPDATE) sampai transaksi selesai.
+    Return: dict {product_id: product}; ID yang tidak ditemukan tidak ada di dict.
+    """
+    unique_ids = sorted(set(product_ids)) # Urutan tetap agar penguncian baris konsisten (hindari deadlock)
+    if not unique_ids:
+        return {}
+
+    query = db.query(models_db.Product).filter(models_db.Product.product_id.in_(unique_ids))
+    if for_update:
+        query = query.order_by(models_db.Product.product_id).with_for_update()
+
+    return {product.product_id: product for product in query.all()}
+
 def get_product_by_sku(db: Session, sku: str) -> Optional[models_db.Product]:
     """Mengambil satu produk berdasarkan SKU."""
     if not sku: # SKU bisa None/kosong
@@ -25,6 +50,40 @@ def get_product_by_sku(db: Session, sku: str) -> Optional[models_db.Product]:
     
     return db.query(models_db.Product).filter(models_db.Product.sku == sku).first()
 
+def lookup_product_by_sku(db: Session, sku: str) -> Optional[product_schemas.Product]:
+    """
+    Lookup SKU untuk scan barcode: dilayani dari indeks produk in-process, dan baru ke database jika SKU
+    belum ada di indeks (misal produk baru dari worker lain), lalu hasilnya dimasukkan ke indeks (read-through).
+    """
+    if product_index.ready:
+        cached_product = product_index.get_by_sku(sku)
+        if cached_product is not None:
+            return cached_product
+
+    db_product = get_product_by_sku(db, sku)
+    if db_product is None:
+        return None
+    product_index.upsert(db_product)
+
+    return product_schemas.Product.model_validate(db_product)
+
+def lookup_products_by_skus(db: Session, skus: List[str]) -> Dict[str, product_schemas.Product]:
+    """
+    Versi batch lookup_product_by_sku untuk satu keranjang hasil scan: SKU -> produk (SKU yang tidak
+    ditemukan tidak ada di hasil). SKU yang tidak ada di indeks diambil dengan satu query IN.
+    """
+    unique_skus = list(dict.fromkeys(sku for sku in skus if sku))
+    found = product_index.get_many_by_sku(unique_skus) if product_index.ready else {}
+
+    missing_skus = [sku for sku in unique_skus if sku not in found]
+    if missing_skus:
+        db_products = db.query(models_db.Product).filter(models_db.Product.sku.in_(missing_skus)).all()
+        for db_product in db_products:
+            product_index.upsert(db_product)
+            found[db_product.sku] = product_schemas.Product.model_validate(db_product)
+
+    return found
+
 def get_products(
         db: Session,
         skip: int = 0,
@@ -32,9 +91,16 @@ def get_products(
         category_id: Optional[int] = None,
         search: Optional[str] = None,
         only_active: bool = True,
-        load_category: bool = False
+        load_category: bool = False,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None
     ) -> dict: # Ubah tipe kembalian ke dict atau skema PaginatedResponse jika Anda parsing di sini
-    """Mengambil daftar produk dengan filter, paginasi, dan total count."""
+    """
+    Mengambil daftar produk dengan filter, paginasi, dan total count.
+    Jika cursor diisi, paginasi memakai keyset (name, product_id) dan skip diabaikan.
+    Jika search diisi tanpa cursor, hasil diurutkan berdasarkan relevansi (lihat product_search_clauses)
+    dengan paginasi offset.
+    """
     query = db.query(models_db.Product)
 
     if load_category:
@@ -44,14 +110,22 @@ def get_products(
         query = query.filter(models_db.Product.is_active == True)
     if category_id is not None:
         query = query.filter(models_db.Product.category_id == category_id)
-    if search:
-        query = query.filter(models_db.Product.name.ilike(f"%{search}%"))
-
-    total = query.count() # Hitung total sebelum paginasi
-    
-    data = query.order_by(models_db.Product.name).offset(skip).limit(limit).all()
-    
-    return {"total": total, "data": data}
+    if search and search.strip():
+        search_clause, relevance_order = product_search_clauses(search, db.get_bind().dialect.name)
+        query = query.filter(search_clause)
+        if not cursor:
+            total = query.count() if include_total is not False else None
+            data = query.order_by(*relevance_order).offset(skip).limit(limit).all()
+            return {"total": total, "data": data, "next_cursor": None}
+
+    return paginate_query(
+        query,
+        order_columns=[models_db.Product.name, models_db.Product.product_id],
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total
+    )
 
 def create_product(db: Session, product: product_schemas.ProductCreate, user_id: Optional[int] = None) -> models_db.Product:
     """Membuat produk baru."""
@@ -73,8 +147,11 @@ def create_product(db: Session, product: product_schemas.ProductCreate, user_id:
         is_active=True
     )
     db.add(db_product)
+    mark_catalog_changed(db)
     db.commit()
+    invalidate_dashboard_cache()
     db.refresh(db_product)
+    product_index.upsert(db_product)
 
     # Jika ada stok awal, catat di inventory log
     if db_product.current_stock > 0:
@@ -129,56 +206,90 @@ def update_product(
         setattr(db_product, field, value)
 
     db.add(db_product)
+    mark_catalog_changed(db)
     db.commit()
+    invalidate_dashboard_cache()
     db.refresh(db_product)
+    product_index.upsert(db_product)
 
     return db_product
 
 def delete_product(db: Session, product_id: int, permanent_delete: bool = False) -> Optional[models_db.Product]:
     """
     Menghapus produk (soft delete dengan mengubah is_active=False, atau permanent delete).
+    Permanent delete ditolak (ValueError) jika produk masih dipakai di item order.
     """
     db_product = get_product(db, product_id=product_id)
     if db_product:
         if permanent_delete:
             db.delete(db_product)
+            mark_catalog_changed(db)
+            product_index.stage_removal(db, product_id) # Keluar dari indeks hanya setelah commit berhasil
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise ValueError(
+                    f"Produk '{db_product.name}' sudah dipakai di transaksi dan tidak bisa dihapus permanen; nonaktifkan saja."
+                )
+            invalidate_dashboard_cache()
         else:
             db_product.is_active = False
             db.add(db_product)
+            mark_catalog_changed(db)
             db.commit()
-
-        if not permanent_delete:
+            invalidate_dashboard_cache()
             db.refresh(db_product)
+            product_index.upsert(db_product)
 
     return db_product
 
-def update_product_stock_internal(db: Session, product_id: int, quantity_change: int) -> Optional[models_db.Product]:
+def apply_stock_deltas(db: Session, deltas: Dict[int, int]) -> Dict[int, Tuple[int, int]]:
     """
-    Fungsi internal untuk mengubah jumlah stok produk.
-    Harus dipanggil bersamaan dengan pembuatan InventoryLog.
-    Return: updated product object or None if product not found.
+    Fungsi internal untuk mengubah stok banyak produk sekaligus secara atomik.
+    Menjalankan satu statement:
+        UPDATE products SET current_stock = current_stock + <delta>
+        WHERE product_id IN (...) AND current_stock + <delta> >= 0
+        RETURNING product_id, current_stock
+    sehingga tidak ada read-modify-write di Python (tidak ada lost update) dan tidak ada commit di sini.
+    Harus dipanggil bersamaan dengan pembuatan InventoryLog; commit dilakukan oleh fungsi pemanggil.
+    Jika ada produk yang tidak ditemukan atau stoknya tidak mencukupi, ValueError dilempar dan
+    pemanggil WAJIB melakukan rollback (baris lain di statement yang sama mungkin sudah berubah).
+    Return: dict {product_id: (stock_before, stock_after)}.
     """
-    db_product = get_product(db, product_id=product_id)
-    if not db_product:
-        return None
-
-    if not db_product.is_active:
-        # Opsional: cegah perubahan stok pada produk tidak aktif
-        # raise ValueError("Tidak dapat mengubah stok produk yang tidak aktif.")
-        pass
-
-    new_stock = db_product.current_stock + quantity_change
-
-    if new_stock < 0:
-        raise ValueError(f"Stok produk '{db_product.name}' tidak mencukupi untuk pengurangan {abs(quantity_change)} unit.")
-
-    db_product.current_stock = new_stock
-    db.add(db_product)
-
-    db.commit() # Commit akan dilakukan oleh fungsi pemanggil (misal, add_stock, adjust_stock)
-    db.refresh(db_product)
-
-    return db_product
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta != 0}
+    if not deltas:
+        return {}
+
+    products_table = models_db.Product.__table__
+    delta_expr = case(deltas, value=products_table.c.product_id, else_=0)
+
+    stmt = (
+        update(products_table)
+        .where(products_table.c.product_id.in_(list(deltas.keys())))
+        .where(products_table.c.current_stock + delta_expr >= 0)
+        .values(current_stock=products_table.c.current_stock + delta_expr)
+        .returning(products_table.c.product_id, products_table.c.current_stock)
+    )
+    stock_after_by_id = {row.product_id: row.current_stock for row in db.execute(stmt)}
+
+    failed_ids = [product_id for product_id in deltas if product_id not in stock_after_by_id]
+    if failed_ids:
+        # Jalur gagal saja: cari tahu penyebabnya untuk pesan error yang jelas
+        for product_id in failed_ids:
+            db_product = get_product(db, product_id=product_id)
+            if not db_product:
+                raise ValueError(f"Produk dengan ID {product_id} tidak ditemukan.")
+            raise ValueError(f"Stok produk '{db_product.name}' tidak mencukupi untuk pengurangan {abs(deltas[product_id])} unit (tersisa: {db_product.current_stock}).")
+
+    # Stok baru masuk ke indeks autocomplete hanya jika transaksi pemanggil di-commit
+    product_index.stage_stock_changes(db, stock_after_by_id)
+    mark_stock_changed(db) # current_stock ikut di respons produk: hanya versi stok (ETag produk) yang berubah
+
+    return {
+        product_id: (stock_after - deltas[product_id], stock_after)
+        for product_id, stock_after in stock_after_by_id.items()
+    }
 
 def get_product_suggestions(
         db: Session,
@@ -187,7 +298,7 @@ def get_product_suggestions(
         only_active: bool = True,
         load_category: bool = False
     ) -> List[models_db.Product]: # Tipe kembalian adalah List[models_db.Product]
-    """Mengambil daftar saran produk berdasarkan nama atau SKU."""
+    """Mengambil daftar saran produk berdasarkan nama atau SKU, diurutkan berdasarkan relevansi."""
     db_query = db.query(models_db.Product)
 
     if load_category:
@@ -196,15 +307,9 @@ def get_product_suggestions(
     if only_active:
         db_query = db_query.filter(models_db.Product.is_active == True)
     
-    if query_str:
-        search_term = f"%{query_str}%"
-        # Anda bisa sesuaikan logika pencarian di sini (nama saja, atau nama dan SKU)
-        from sqlalchemy import or_ # Impor or_ jika belum
-        db_query = db_query.filter(
-            or_(
-                models_db.Product.name.ilike(search_term),
-                models_db.Product.sku.ilike(search_term) # Opsional: cari juga di SKU
-            )
-        )
+    if query_str and query_str.strip():
+        # Cari di nama dan SKU, urut berdasarkan relevansi (SKU persis, awalan, posisi, kemiripan)
+        search_clause, relevance_order = product_search_clauses(query_str, db.get_bind().dialect.name)
+        return db_query.filter(search_clause).order_by(*relevance_order).limit(limit).all()
     
     return db_query.order_by(models_db.Product.name).limit(limit).all() # Ini mengembalikan list
\ No newline at end of file
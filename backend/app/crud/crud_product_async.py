@@ -0,0 +1,30 @@
+# backend/app/crud/crud_product_async.py
+# Versi async (AsyncSession) dari fungsi-fungsi crud_product yang dipakai endpoint `async def`.
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, List
+
+from app.db import models_db
+from app.db.product_search import product_search_clauses
+
+async def get_product(db: AsyncSession, product_id: int) -> Optional[models_db.Product]:
+    """Mengambil satu produk berdasarkan ID."""
+    result = await db.execute(select(models_db.Product).where(models_db.Product.product_id == product_id))
+
+    return result.scalars().first()
+
+async def search_products(
+        db: AsyncSession,
+        search: str,
+        limit: int = 10,
+        only_active: bool = True
+    ) -> List[models_db.Product]:
+    """Mencari produk berdasarkan nama/SKU (tanpa total count), diurutkan berdasarkan relevansi."""
+    search_clause, relevance_order = product_search_clauses(search, db.bind.dialect.name)
+    stmt = select(models_db.Product).where(search_clause)
+    if only_active:
+        stmt = stmt.where(models_db.Product.is_active == True)
+
+    result = await db.execute(stmt.order_by(*relevance_order).limit(limit))
+
+    return list(result.scalars().all())
@@ -1,95 +1,492 @@
 # backend/app/crud/crud_report.py (atau crud_dashboard.py)
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc # Tambahkan desc
-from datetime import datetime, timedelta
+from sqlalchemy import func, case, and_, text, select, literal, union_all
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 
 from app.db import models_db # Pastikan semua model diimpor
+from app.core.config import settings
+from app.core.cache import SWRCache, CacheResult
+from app.db.database import SessionLocal
+from typing import List, Dict, Any, Optional, Tuple
+from app.db.time_buckets import (
+    time_bucket, bucket_label, get_timezone, local_date_range_to_utc,
+    has_whole_hour_offsets, weekday_and_hour, shift_date
+)
+from .crud_sales_rollup import get_daily_sales
+
+DASHBOARD_SUMMARY_CACHE_KEY = "dashboard-summary"
+dashboard_cache = SWRCache(
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    max_stale_seconds=settings.DASHBOARD_CACHE_MAX_STALE_SECONDS
+)
+
+# Thread pool untuk menjalankan potongan bulanan laporan panjang secara paralel (tiap potongan memakai koneksi pool sendiri)
+_report_chunk_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.REPORT_PARALLELISM), thread_name_prefix="report-chunk"
+)
+
+def invalidate_dashboard_cache() -> None:
+    """Dipanggil setelah commit penulisan order, stok, atau produk yang memengaruhi ringkasan dashboard."""
+    dashboard_cache.invalidate(DASHBOARD_SUMMARY_CACHE_KEY)
+
+# Nama kunci label bucket di hasil laporan penjualan (frontend memakai "date" untuk harian dan "month" untuk bulanan)
+SALES_REPORT_LABEL_KEYS = {"hour": "hour", "day": "date", "week": "week", "month": "month"}
+
+def _sales_bucket_query(db: Session, start_date: date, end_date: date, group_by: str, timezone_name: str):
+    """
+    Query agregat penjualan per bucket waktu, seluruhnya di SQL.
+    - day/week/month dalam UTC: dibaca dari rollup daily_product_sales (tanggal rollup = tanggal UTC).
+    - hour, atau zona waktu selain UTC: dari orders/order_items karena rollup harian tidak menyimpan jam.
+    Kolom hasil: bucket, total_items, total_sales, total_cost.
+    """
+    dialect_name = db.get_bind().dialect.name
+
+    if group_by != "hour" and timezone_name == "UTC":
+        rollup = models_db.DailyProductSales
+        bucket = time_bucket(rollup.sales_date, group_by, dialect_name).label("bucket")
+        return (
+            db.query(
+                bucket,
+                func.sum(rollup.quantity).label("total_items"),
+                func.sum(rollup.total_sales).label("total_sales"),
+                func.sum(rollup.total_cost).label("total_cost"),
+            )
+            .filter(rollup.sales_date >= start_date)
+            .filter(rollup.sales_date <= end_date)
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+
+    start_at, end_at = local_date_range_to_utc(start_date, end_date, timezone_name)
+    bucket = time_bucket(
+        models_db.Order.created_at, group_by, dialect_name,
+        timezone_name=timezone_name, reference_date=start_date, reference_end_date=end_date
+    ).label("bucket")
+    return (
+        db.query(
+            bucket,
+            func.sum(models_db.OrderItem.quantity).label("total_items"),
+            func.sum(models_db.OrderItem.subtotal).label("total_sales"),
+            # Hanya dari order_items; item lama harus di-backfill dulu (app.scripts.backfill_order_item_costs)
+            func.sum(
+                models_db.OrderItem.quantity * func.coalesce(models_db.OrderItem.cost_at_transaction, 0)
+            ).label("total_cost"),
+        )
+        .join(models_db.OrderItem, models_db.Order.order_id == models_db.OrderItem.order_id)
+        .filter(models_db.Order.order_status == "completed")
+        .filter(models_db.Order.created_at >= start_at)
+        .filter(models_db.Order.created_at < end_at)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+
+def uses_sales_rollup(group_by: str, timezone_name: str) -> bool:
+    """True jika laporan bisa dibaca dari rollup harian (bucket >= hari dalam UTC)."""
+    return group_by != "hour" and timezone_name == "UTC"
+
+def split_into_month_chunks(start_date: date, end_date: date) -> List[Tuple[date, date]]:
+    """Memecah rentang tanggal inklusif menjadi potongan per bulan kalender (potongan pertama/terakhir bisa parsial)."""
+    chunks = []
+    chunk_start = start_date
+    while chunk_start <= end_date:
+        next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(end_date, next_month - timedelta(days=1))
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = next_month
+    return chunks
+
+def _fetch_sales_buckets(
+        db: Session, start_date: date, end_date: date, group_by: str, timezone_name: str,
+        statement_timeout_ms: Optional[int] = None
+    ) -> List[Tuple[str, int, Any, Any]]:
+    """Menjalankan query bucket untuk satu rentang. Return: list (label, total_items, total_sales, total_cost)."""
+    if statement_timeout_ms and db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"SET LOCAL statement_timeout = {int(statement_timeout_ms)}")) # SET tidak menerima bind parameter
+    rows = _sales_bucket_query(db, start_date, end_date, group_by, timezone_name).all()
+    return [
+        (bucket_label(r.bucket, group_by), int(r.total_items or 0), r.total_sales or 0, r.total_cost or 0)
+        for r in rows
+    ]
+
+def _fetch_sales_buckets_in_new_session(*args, **kwargs) -> List[Tuple[str, int, Any, Any]]:
+    """_fetch_sales_buckets dengan sesi (dan koneksi pool) sendiri, untuk dijalankan di _report_chunk_executor."""
+    db = SessionLocal()
+    try:
+        return _fetch_sales_buckets(db, *args, **kwargs)
+    finally:
+        db.rollback() # Akhiri transaksi baca (dan statement_timeout-nya) sebelum koneksi kembali ke pool
+        db.close()
+
+def get_sales_report_data(
+        db: Session, start_date: date, end_date: date, group_by: str, timezone_name: str = "UTC",
+        statement_timeout_ms: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+    """
+    Laporan penjualan per jam/hari/minggu/bulan dengan batas bucket menurut timezone_name.
+    Pengelompokan dilakukan di database (lihat app.db.time_buckets); label minggu adalah tanggal hari Senin.
+    Rentang panjang yang dibaca dari orders (bukan rollup) dipecah per bulan dan dijalankan paralel di
+    koneksi terpisah (maksimal REPORT_PARALLELISM), lalu agregat parsial digabung per label bucket.
+    Melempar ValueError untuk bucket atau zona waktu yang tidak dikenal.
+    """
+    if group_by not in SALES_REPORT_LABEL_KEYS:
+        raise ValueError(f"Grouping by '{group_by}' tidak didukung.")
+    get_timezone(timezone_name) # Validasi lebih awal agar error jelas
+
+    chunks = split_into_month_chunks(start_date, end_date)
+    if uses_sales_rollup(group_by, timezone_name) or len(chunks) == 1 or settings.REPORT_PARALLELISM <= 1:
+        # Rollup paling banyak satu baris per hari; memecahnya hanya menambah koneksi tanpa mempercepat
+        partials = [_fetch_sales_buckets(db, start_date, end_date, group_by, timezone_name, statement_timeout_ms)]
+    else:
+        futures = [
+            _report_chunk_executor.submit(
+                _fetch_sales_buckets_in_new_session,
+                chunk_start, chunk_end, group_by, timezone_name, statement_timeout_ms
+            )
+            for chunk_start, chunk_end in chunks
+        ]
+        partials = [future.result() for future in futures]
+
+    # Gabungkan agregat parsial: bucket minggu (dan jam/hari di batas zona) bisa muncul di dua potongan
+    merged: Dict[str, List[Any]] = {}
+    for partial in partials:
+        for label, total_items, total_sales, total_cost in partial:
+            totals = merged.setdefault(label, [0, 0, 0])
+            totals[0] += total_items
+            totals[1] += total_sales
+            totals[2] += total_cost
+
+    label_key = SALES_REPORT_LABEL_KEYS[group_by]
+    return [
+        {
+            label_key: label,
+            "total_sales": float(total_sales),
+            "total_items": total_items,
+            "estimated_profit": float(total_sales - total_cost)
+        }
+        for label, (total_items, total_sales, total_cost) in sorted(merged.items()) # Label ISO urut secara leksikal
+    ]
+
+SALES_COMPARISON_MODES = ("previous_period", "previous_year")
+
+def get_comparison_period(start_date: date, end_date: date, compare: str) -> Tuple[date, date, int]:
+    """
+    Periode pembanding untuk [start_date, end_date].
+    Return: (awal, akhir, shift_days) dengan shift_days = jumlah hari untuk menggeser tanggal
+    periode pembanding ke posisi yang sejajar di periode berjalan.
+    """
+    if compare == "previous_period":
+        length = (end_date - start_date).days + 1
+        previous_end = start_date - timedelta(days=1)
+        return previous_end - timedelta(days=length - 1), previous_end, length
+    if compare == "previous_year":
+        def one_year_earlier(day: date) -> date:
+            try:
+                return day.replace(year=day.year - 1)
+            except ValueError: # 29 Februari
+                return day.replace(year=day.year - 1, day=28)
+        previous_start = one_year_earlier(start_date)
+        return previous_start, one_year_earlier(end_date), (start_date - previous_start).days
+
+    raise ValueError(f"Mode perbandingan '{compare}' tidak didukung. Pilihan: {', '.join(SALES_COMPARISON_MODES)}.")
+
+def _comparison_metrics(current_sales, previous_sales, current_items, previous_items) -> Dict[str, Any]:
+    def change_pct(current, previous):
+        return round((current - previous) / previous * 100, 2) if previous else None
+
+    current_sales, previous_sales = float(current_sales or 0), float(previous_sales or 0)
+    current_items, previous_items = int(current_items or 0), int(previous_items or 0)
+    return {
+        "current_sales": current_sales,
+        "previous_sales": previous_sales,
+        "sales_delta": current_sales - previous_sales,
+        "sales_change_pct": change_pct(current_sales, previous_sales),
+        "current_items": current_items,
+        "previous_items": previous_items,
+        "items_delta": current_items - previous_items,
+        "items_change_pct": change_pct(current_items, previous_items),
+    }
+
+def get_sales_comparison_report(
+        db: Session, start_date: date, end_date: date, group_by: str, compare: str
+    ) -> Dict[str, Any]:
+    """
+    Perbandingan periode berjalan vs periode sebelumnya / tahun lalu, per bucket dan per kategori,
+    dalam satu statement SQL atas rollup daily_product_sales:
+    - baris kedua periode digabung (UNION ALL); tanggal periode pembanding digeser agar sejajar;
+    - agregasi kondisional per (bucket, kategori) menghasilkan nilai berjalan & pembanding berdampingan;
+    - window SUM() OVER (PARTITION BY bucket / kategori / semua) memberi total per bucket, per kategori, dan total.
+    Hanya untuk bucket day/week/month dalam UTC (sumber rollup).
+    """
+    if group_by not in ("day", "week", "month"):
+        raise ValueError("Mode perbandingan hanya mendukung group_by day, week, atau month.")
+    previous_start, previous_end, shift_days = get_comparison_period(start_date, end_date, compare)
+    dialect_name = db.get_bind().dialect.name
+
+    rollup = models_db.DailyProductSales.__table__
+    categories = models_db.Category.__table__
+    current_rows = (
+        select(
+            literal("current").label("period"),
+            rollup.c.sales_date.label("aligned_date"),
+            rollup.c.category_id,
+            rollup.c.quantity,
+            rollup.c.total_sales,
+        )
+        .where(rollup.c.sales_date >= start_date)
+        .where(rollup.c.sales_date <= end_date)
+    )
+    previous_rows = (
+        select(
+            literal("previous").label("period"),
+            shift_date(rollup.c.sales_date, shift_days, dialect_name).label("aligned_date"),
+            rollup.c.category_id,
+            rollup.c.quantity,
+            rollup.c.total_sales,
+        )
+        .where(rollup.c.sales_date >= previous_start)
+        .where(rollup.c.sales_date <= previous_end)
+    )
+    tagged = union_all(current_rows, previous_rows).subquery("tagged")
+
+    is_current = tagged.c.period == "current"
+    bucket = time_bucket(tagged.c.aligned_date, group_by, dialect_name)
+    aggregated = (
+        select(
+            bucket.label("bucket"),
+            tagged.c.category_id,
+            func.sum(case((is_current, tagged.c.total_sales), else_=0)).label("current_sales"),
+            func.sum(case((is_current, 0), else_=tagged.c.total_sales)).label("previous_sales"),
+            func.sum(case((is_current, tagged.c.quantity), else_=0)).label("current_items"),
+            func.sum(case((is_current, 0), else_=tagged.c.quantity)).label("previous_items"),
+        )
+        .group_by(bucket, tagged.c.category_id)
+        .subquery("aggregated")
+    )
+
+    def window_sums(partition_by, prefix: str):
+        return [
+            func.sum(aggregated.c[column]).over(partition_by=partition_by).label(f"{prefix}_{column}")
+            for column in ("current_sales", "previous_sales", "current_items", "previous_items")
+        ]
+
+    stmt = (
+        select(
+            aggregated.c.bucket,
+            aggregated.c.category_id,
+            categories.c.name.label("category_name"),
+            aggregated.c.current_sales,
+            aggregated.c.previous_sales,
+            aggregated.c.current_items,
+            aggregated.c.previous_items,
+            *window_sums(aggregated.c.bucket, "bucket"),
+            *window_sums(aggregated.c.category_id, "category"),
+            *window_sums(None, "total"),
+        )
+        .select_from(aggregated.outerjoin(categories, categories.c.category_id == aggregated.c.category_id))
+        .order_by(aggregated.c.bucket, aggregated.c.category_id)
+    )
+    rows = db.execute(stmt).all()
+
+    def prefixed_metrics(row, prefix: str) -> Dict[str, Any]:
+        return _comparison_metrics(
+            getattr(row, f"{prefix}_current_sales"), getattr(row, f"{prefix}_previous_sales"),
+            getattr(row, f"{prefix}_current_items"), getattr(row, f"{prefix}_previous_items")
+        )
+
+    buckets: Dict[str, Dict[str, Any]] = {}
+    categories_by_id: Dict[int, Dict[str, Any]] = {}
+    breakdown = []
+    for r in rows:
+        label = bucket_label(r.bucket, group_by)
+        category_name = r.category_name if r.category_id else None # category_id 0 = tanpa kategori
+        if label not in buckets:
+            buckets[label] = {"label": label, **prefixed_metrics(r, "bucket")}
+        if r.category_id not in categories_by_id:
+            categories_by_id[r.category_id] = {
+                "category_id": r.category_id or None, "name": category_name, **prefixed_metrics(r, "category")
+            }
+        breakdown.append({
+            "label": label,
+            "category_id": r.category_id or None,
+            "name": category_name,
+            **_comparison_metrics(r.current_sales, r.previous_sales, r.current_items, r.previous_items)
+        })
+
+    return {
+        "group_by": group_by,
+        "compare": compare,
+        "current_period": {"start_date": start_date, "end_date": end_date},
+        "previous_period": {"start_date": previous_start, "end_date": previous_end},
+        "totals": prefixed_metrics(rows[0], "total") if rows else _comparison_metrics(0, 0, 0, 0),
+        "buckets": list(buckets.values()),
+        "categories": sorted(categories_by_id.values(), key=lambda c: c["current_sales"], reverse=True),
+        "breakdown": breakdown,
+    }
+
+HEATMAP_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+def get_sales_heatmap(db: Session, start_date: date, end_date: date, timezone_name: str = "UTC") -> Dict[str, Any]:
+    """
+    Matriks 7x24 (hari Senin..Minggu x jam 0..23, waktu lokal timezone_name) berisi pendapatan dan
+    jumlah transaksi order 'completed', dihitung dengan satu query GROUP BY.
+    Dibaca dari rollup hourly_sales (semua shard per jam dijumlahkan oleh GROUP BY) jika offset zona waktu
+    kelipatan satu jam (bucket jam UTC bisa dipetakan langsung ke jam lokal); selain itu dari tabel orders.
+    """
+    dialect_name = db.get_bind().dialect.name
+    start_at, end_at = local_date_range_to_utc(start_date, end_date, timezone_name)
+
+    if has_whole_hour_offsets(timezone_name, start_date, end_date):
+        hourly = models_db.HourlySales
+        weekday, hour = weekday_and_hour(
+            hourly.sales_hour, dialect_name, timezone_name=timezone_name,
+            reference_date=start_date, reference_end_date=end_date, column_is_utc_naive=True
+        )
+        query = (
+            db.query(
+                weekday.label("weekday"),
+                hour.label("hour"),
+                func.sum(hourly.total_sales).label("revenue"),
+                func.sum(hourly.order_count).label("transactions"),
+            )
+            .filter(hourly.sales_hour >= start_at.replace(tzinfo=None)) # sales_hour disimpan sebagai UTC tanpa zona
+            .filter(hourly.sales_hour < end_at.replace(tzinfo=None))
+        )
+        data_source = "rollup"
+    else:
+        weekday, hour = weekday_and_hour(
+            models_db.Order.created_at, dialect_name, timezone_name=timezone_name,
+            reference_date=start_date, reference_end_date=end_date
+        )
+        query = (
+            db.query(
+                weekday.label("weekday"),
+                hour.label("hour"),
+                func.sum(models_db.Order.total_amount).label("revenue"),
+                func.count(models_db.Order.order_id).label("transactions"),
+            )
+            .filter(models_db.Order.order_status == "completed")
+            .filter(models_db.Order.created_at >= start_at)
+            .filter(models_db.Order.created_at < end_at)
+        )
+        data_source = "orders"
+
+    revenue = [[0.0] * 24 for _ in range(7)]
+    transactions = [[0] * 24 for _ in range(7)]
+    for r in query.group_by(weekday, hour).all():
+        revenue[r.weekday][r.hour] = float(r.revenue or 0)
+        transactions[r.weekday][r.hour] = int(r.transactions or 0)
+
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "timezone": timezone_name,
+        "source": data_source,
+        "weekdays": HEATMAP_WEEKDAYS,
+        "hours": list(range(24)),
+        "revenue": revenue,
+        "transactions": transactions,
+    }
 
 def get_dashboard_summary(db: Session) -> dict:
+    """
+    Ringkasan dashboard dengan sedikit query berbasis set:
+    1. Penjualan harian dari rollup daily_product_sales sejak min(awal bulan, 7 hari lalu)
+       -> total penjualan bulan ini dan data chart 7 hari sekaligus.
+    2. Jumlah transaksi bulan ini (satu COUNT atas orders; rollup tidak menyimpan jumlah order).
+    3. Satu agregasi kondisional atas produk -> jumlah produk aktif dan stok kritis.
+    4. Satu breakdown produk/kategori bulan ini dari rollup -> top 5 produk dan penjualan per kategori.
+    """
     today = datetime.utcnow().date()
     # Periode "Bulan Ini" (dari tanggal 1 bulan ini hingga hari ini)
     start_of_current_month = today.replace(day=1)
     # Periode 7 hari terakhir untuk sales chart
     seven_days_ago = today - timedelta(days=6) # Termasuk hari ini, jadi 6 hari ke belakang
+    window_start = min(start_of_current_month, seven_days_ago)
 
-    # --- Data Statistik yang Sudah Ada ---
-    total_sales_month = (
-        db.query(func.sum(models_db.Order.total_amount))
-        .filter(models_db.Order.order_status == "completed")
-        .filter(models_db.Order.created_at >= start_of_current_month)
-        .scalar() or 0
+    # --- Query 1: penjualan harian atas seluruh jendela waktu (rollup) ---
+    daily_totals = {d["sales_date"]: d for d in get_daily_sales(db, window_start, today)}
+
+    total_sales_month = sum(
+        d["total_sales"] for day, d in daily_totals.items() if day >= start_of_current_month
     )
+
+    sales_last_7_days_data = []
+    for i in range(6, -1, -1):
+        day_to_query = today - timedelta(days=i)
+        daily = daily_totals.get(day_to_query)
+        sales_last_7_days_data.append({
+            "name": day_to_query.strftime("%a"),
+            "sales": daily["total_sales"] if daily else 0.0
+        })
+
+    # --- Query 2: jumlah transaksi bulan ini ---
     total_transactions_month = (
         db.query(func.count(models_db.Order.order_id))
         .filter(models_db.Order.order_status == "completed")
         .filter(models_db.Order.created_at >= start_of_current_month)
         .scalar() or 0
     )
-    active_products = db.query(func.count(models_db.Product.product_id)).filter(models_db.Product.is_active == True).scalar() or 0
-    critical_stock_products = (
-        db.query(func.count(models_db.Product.product_id))
-        .filter(models_db.Product.is_active == True)
-        .filter(models_db.Product.low_stock_threshold > 0)
-        .filter(models_db.Product.current_stock <= models_db.Product.low_stock_threshold)
-        .scalar() or 0
-    )
 
-    # --- Data untuk Sales Chart (7 Hari Terakhir) ---
-    sales_last_7_days_data = []
-    for i in range(6, -1, -1):
-        day_to_query = today - timedelta(days=i)
-        day_start = datetime.combine(day_to_query, datetime.min.time())
-        day_end = datetime.combine(day_to_query, datetime.max.time())
-        
-        daily_sales = db.query(func.sum(models_db.Order.total_amount))\
-            .filter(models_db.Order.order_status == "completed")\
-            .filter(models_db.Order.created_at >= day_start)\
-            .filter(models_db.Order.created_at <= day_end)\
-            .scalar() or 0
-        
-        sales_last_7_days_data.append({"name": day_to_query.strftime("%a"), "sales": float(daily_sales)})
-
-    # --- DATA BARU: Top 5 Selling Products (Bulan Ini berdasarkan Kuantitas) ---
-    top_products_query = (
+    # --- Query 3: jumlah produk aktif & stok kritis (agregasi kondisional) ---
+    is_critical = and_(
+        models_db.Product.low_stock_threshold > 0,
+        models_db.Product.current_stock <= models_db.Product.low_stock_threshold
+    )
+    product_counts = (
         db.query(
-            models_db.Product.name,
-            func.sum(models_db.OrderItem.quantity).label("total_quantity_sold")
+            func.count(models_db.Product.product_id).label("active_products"),
+            func.sum(case((is_critical, 1), else_=0)).label("critical_stock_products")
         )
-        .join(models_db.OrderItem, models_db.Product.product_id == models_db.OrderItem.product_id)
-        .join(models_db.Order, models_db.OrderItem.order_id == models_db.Order.order_id)
-        .filter(models_db.Order.order_status == "completed")
-        .filter(models_db.Order.created_at >= start_of_current_month)
-        .group_by(models_db.Product.name)
-        .order_by(desc("total_quantity_sold"))
-        .limit(5)
-        .all()
+        .filter(models_db.Product.is_active == True)
+        .one()
     )
-    top_selling_products_data = [{"name": p.name, "total_quantity_sold": int(p.total_quantity_sold)} for p in top_products_query]
 
-    # --- DATA BARU: Sales by Category (Bulan Ini) ---
-    sales_by_category_query = (
+    # --- Query 4: breakdown produk/kategori bulan ini (rollup) ---
+    rollup = models_db.DailyProductSales
+    breakdown_rows = (
         db.query(
-            models_db.Category.name,
-            func.sum(models_db.OrderItem.subtotal).label("category_total_sales")
+            rollup.product_id,
+            models_db.Product.name.label("product_name"),
+            models_db.Category.name.label("category_name"),
+            func.sum(rollup.quantity).label("total_quantity_sold"),
+            func.sum(rollup.total_sales).label("total_sales")
         )
-        .select_from(models_db.Order) # Mulai join dari Order
-        .join(models_db.OrderItem, models_db.Order.order_id == models_db.OrderItem.order_id)
-        .join(models_db.Product, models_db.OrderItem.product_id == models_db.Product.product_id)
-        .join(models_db.Category, models_db.Product.category_id == models_db.Category.category_id)
-        .filter(models_db.Order.order_status == "completed")
-        .filter(models_db.Order.created_at >= start_of_current_month)
-        .group_by(models_db.Category.name)
-        .order_by(desc("category_total_sales"))
+        .join(models_db.Product, rollup.product_id == models_db.Product.product_id)
+        .outerjoin(models_db.Category, rollup.category_id == models_db.Category.category_id)
+        .filter(rollup.sales_date >= start_of_current_month)
+        .filter(rollup.sales_date <= today)
+        .group_by(rollup.product_id, models_db.Product.name, models_db.Category.name)
         .all()
     )
-    sales_by_category_data = [{"name": c.name, "total_sales": float(c.category_total_sales)} for c in sales_by_category_query]
-    
+
+    quantity_by_product_name = defaultdict(int)
+    sales_by_category_name = defaultdict(float)
+    for r in breakdown_rows:
+        quantity_by_product_name[r.product_name] += int(r.total_quantity_sold or 0)
+        if r.category_name is not None: # Produk tanpa kategori tidak masuk breakdown kategori
+            sales_by_category_name[r.category_name] += float(r.total_sales or 0)
+
+    top_selling_products_data = [
+        {"name": name, "total_quantity_sold": quantity}
+        for name, quantity in sorted(quantity_by_product_name.items(), key=lambda item: item[1], reverse=True)[:5]
+    ]
+    sales_by_category_data = [
+        {"name": name, "total_sales": total}
+        for name, total in sorted(sales_by_category_name.items(), key=lambda item: item[1], reverse=True)
+    ]
+
     return {
         "total_sales_month": float(total_sales_month),
-        "total_transactions_month": total_transactions_month,
-        "active_products": active_products,
-        "critical_stock_products": critical_stock_products,
+        "total_transactions_month": int(total_transactions_month),
+        "active_products": product_counts.active_products or 0,
+        "critical_stock_products": int(product_counts.critical_stock_products or 0),
         "sales_chart_data": sales_last_7_days_data,
         "top_selling_products": top_selling_products_data,
         "sales_by_category": sales_by_category_data,
-    }
\ No newline at end of file
+    }
+
+def get_dashboard_summary_cached(db: Session) -> CacheResult:
+    """get_dashboard_summary lewat dashboard_cache; hanya satu request per worker yang menghitung ulang."""
+    return dashboard_cache.get_or_compute(DASHBOARD_SUMMARY_CACHE_KEY, lambda: get_dashboard_summary(db))
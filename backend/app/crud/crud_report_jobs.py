@@ -0,0 +1,204 @@
+# backend/app/crud/crud_report_jobs.py
+# Job laporan di background: submit parameter -> job_id -> poll hasil.
+import hashlib
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import text, update, or_, and_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models_db
+from app.db.database import SessionLocal
+from . import crud_report
+
+logger = logging.getLogger(__name__)
+
+# Thread pool terbatas per worker agar laporan berat tidak menghabiskan koneksi DB milik transaksi kasir
+_report_job_executor = ThreadPoolExecutor(
+    max_workers=settings.REPORT_JOB_WORKERS, thread_name_prefix="report-job"
+)
+
+# Job yang tidak selesai dalam batas ini dianggap ditinggalkan (misal worker restart) dan ditandai gagal
+_RUNNING_JOB_GRACE = timedelta(milliseconds=settings.REPORT_JOB_STATEMENT_TIMEOUT_MS) + timedelta(seconds=60)
+_QUEUED_JOB_GRACE = timedelta(minutes=15)
+
+def _run_sales_report(db: Session, params: Dict[str, Any]) -> Any:
+    return crud_report.get_sales_report_data(
+        db,
+        start_date=date.fromisoformat(params["start_date"]),
+        end_date=date.fromisoformat(params["end_date"]),
+        group_by=params["group_by"],
+        timezone_name=params.get("timezone", "UTC"),
+        statement_timeout_ms=settings.REPORT_JOB_STATEMENT_TIMEOUT_MS # Juga berlaku di koneksi potongan paralel
+    )
+
+# report_type -> fungsi (db, params) yang mengembalikan hasil yang bisa diserialisasi ke JSON
+REPORT_JOB_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any]], Any]] = {
+    "sales": _run_sales_report,
+}
+
+def compute_params_hash(report_type: str, params: Dict[str, Any]) -> str:
+    canonical = json.dumps({"report_type": report_type, "params": params}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def is_closed_period(end_date: date) -> bool:
+    """
+    Periode dianggap tutup jika berakhir sebelum bulan berjalan (UTC). Hasilnya dipakai ulang lebih lama
+    (REPORT_JOB_CLOSED_PERIOD_TTL_SECONDS), tetapi tetap diinvalidasi lewat invalidate_report_jobs_for_dates.
+    """
+    return end_date < datetime.now(timezone.utc).date().replace(day=1)
+
+def invalidate_report_jobs_for_dates(db: Session, order_dates: Iterable[date]) -> int:
+    """
+    Dipanggil (dalam transaksi penulisan, sebelum commit) saat order dengan tanggal order_dates (UTC) dibuat
+    atau berubah status. Hasil periode tutup yang mencakup tanggal tersebut tidak lagi dipakai ulang.
+    Batas diperlebar satu hari karena laporan memakai tanggal lokal zona waktunya. Return: jumlah job.
+    """
+    order_dates = list(order_dates)
+    if not order_dates or min(order_dates) >= datetime.now(timezone.utc).date().replace(day=1):
+        return 0 # Periode berjalan tidak pernah tutup; tidak ada yang perlu diinvalidasi
+
+    first_date, last_date = min(order_dates) - timedelta(days=1), max(order_dates) + timedelta(days=1)
+    jobs = models_db.ReportJob.__table__
+    result = db.execute(
+        update(jobs)
+        .where(jobs.c.is_closed_period == True)
+        .where(jobs.c.status == "completed")
+        .where(or_(
+            jobs.c.period_start.is_(None), # Job lama tanpa rentang: invalidasi saja
+            and_(jobs.c.period_start <= last_date, jobs.c.period_end >= first_date)
+        ))
+        .values(status="expired")
+    )
+    return result.rowcount
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None: # SQLite mengembalikan datetime naive
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def _mark_abandoned(db: Session, job: models_db.ReportJob) -> bool:
+    """Menandai job queued/running yang sudah melewati batas waktunya sebagai gagal. Return True jika ditandai."""
+    now = datetime.now(timezone.utc)
+    if job.status == "running":
+        deadline = _as_utc(job.started_at) + _RUNNING_JOB_GRACE if job.started_at else None
+    elif job.status == "queued":
+        deadline = _as_utc(job.created_at) + _QUEUED_JOB_GRACE if job.created_at else None
+    else:
+        deadline = None
+    if deadline is None or deadline >= now:
+        return False
+
+    job.status = "failed"
+    job.error = "Job tidak selesai (worker kemungkinan berhenti). Silakan kirim ulang."
+    job.finished_at = now
+    db.commit()
+    return True
+
+def get_report_job(db: Session, job_id: str) -> Optional[models_db.ReportJob]:
+    job = db.query(models_db.ReportJob).filter(models_db.ReportJob.job_id == job_id).first()
+    if job:
+        _mark_abandoned(db, job)
+    return job
+
+def _find_reusable_job(db: Session, params_hash: str) -> Optional[models_db.ReportJob]:
+    """
+    Mencari job dengan parameter sama yang bisa dipakai ulang:
+    - hasil yang masih dalam REPORT_JOB_RESULT_TTL_SECONDS (periode tutup: REPORT_JOB_CLOSED_PERIOD_TTL_SECONDS);
+      job berstatus 'expired' (periode tutup yang ordernya berubah) tidak dipakai ulang;
+    - job yang masih queued/running (request duplikat menunggu job yang sama).
+    """
+    now = datetime.now(timezone.utc)
+    candidates = (
+        db.query(models_db.ReportJob)
+        .filter(models_db.ReportJob.params_hash == params_hash)
+        .filter(models_db.ReportJob.status.in_(["queued", "running", "completed"]))
+        .order_by(models_db.ReportJob.created_at.desc())
+        .limit(5)
+        .all()
+    )
+    for job in candidates:
+        if job.status == "completed":
+            ttl_seconds = (
+                settings.REPORT_JOB_CLOSED_PERIOD_TTL_SECONDS if job.is_closed_period
+                else settings.REPORT_JOB_RESULT_TTL_SECONDS
+            )
+            if _as_utc(job.finished_at) and _as_utc(job.finished_at) >= now - timedelta(seconds=ttl_seconds):
+                return job
+        elif not _mark_abandoned(db, job):
+            return job
+
+    return None
+
+def submit_report_job(
+        db: Session, report_type: str, params: Dict[str, Any], end_date: date, user_id: Optional[int] = None,
+        start_date: Optional[date] = None
+    ) -> models_db.ReportJob:
+    """
+    Membuat job laporan (atau mengembalikan job yang bisa dipakai ulang) dan menjadwalkannya di thread pool.
+    params harus bisa diserialisasi ke JSON (tanggal sebagai string ISO).
+    """
+    if report_type not in REPORT_JOB_HANDLERS:
+        raise ValueError(f"Jenis laporan '{report_type}' tidak dikenal.")
+
+    params_hash = compute_params_hash(report_type, params)
+    existing_job = _find_reusable_job(db, params_hash)
+    if existing_job:
+        return existing_job
+
+    db_job = models_db.ReportJob(
+        job_id=str(uuid.uuid4()),
+        report_type=report_type,
+        params=params,
+        params_hash=params_hash,
+        status="queued",
+        is_closed_period=is_closed_period(end_date),
+        period_start=start_date,
+        period_end=end_date,
+        created_by=user_id
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+
+    _report_job_executor.submit(_run_report_job, db_job.job_id)
+
+    return db_job
+
+def _run_report_job(job_id: str) -> None:
+    """Dijalankan di thread pool dengan sesi DB sendiri; error dicatat di job, tidak dilempar."""
+    db = SessionLocal()
+    try:
+        job = db.query(models_db.ReportJob).filter(models_db.ReportJob.job_id == job_id).first()
+        if not job or job.status != "queued":
+            return
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                # Berlaku hanya untuk transaksi ini; SET tidak menerima bind parameter
+                db.execute(text(f"SET LOCAL statement_timeout = {int(settings.REPORT_JOB_STATEMENT_TIMEOUT_MS)}"))
+            result = REPORT_JOB_HANDLERS[job.report_type](db, job.params)
+            db.rollback() # Akhiri transaksi baca (dan statement_timeout-nya) sebelum menyimpan hasil
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Report job {job_id} gagal: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+        else:
+            job.status = "completed"
+            job.result = result
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Tidak dapat memperbarui status report job {job_id}: {e}", exc_info=True)
+    finally:
+        db.close()
@@ -0,0 +1,253 @@
+# backend/app/crud/crud_sales_rollup.py
+# Pemeliharaan tabel rollup daily_product_sales dan hourly_sales (lihat models_db).
+from sqlalchemy import select, delete, insert, update, func, and_, or_
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Dict, Any
+
+from app.db import models_db
+from app.db.time_buckets import time_bucket, utc_date
+
+_ROLLUP_KEY_COLUMNS = ["sales_date", "product_id", "category_id", "payment_method", "source"]
+_ROLLUP_VALUE_COLUMNS = ["quantity", "total_sales", "total_cost"]
+_HOURLY_KEY_COLUMNS = ["sales_hour", "shard"]
+_HOURLY_VALUE_COLUMNS = ["order_count", "total_sales"]
+
+# Jumlah shard per jam di hourly_sales. Boleh diubah kapan saja (pembaca menjumlahkan semua shard);
+# baris lama tetap valid, rebuild_rollup menyusunnya ulang dengan jumlah shard baru.
+HOURLY_SALES_SHARDS = 16
+
+def _sales_aggregate_select(dialect_name: str):
+    """
+    SELECT agregat order_items -> baris rollup (belum difilter).
+    Tanggal adalah tanggal UTC order; kategori dan biaya memakai snapshot di order_items
+    (category_id_at_transaction, cost_at_transaction), sehingga pembalikan (sign=-1) mengurangi baris
+    yang sama dengan saat ditambahkan. Kategori / harga beli produk saat ini hanya menjadi cadangan
+    untuk item lama yang belum punya snapshot.
+    """
+    orders = models_db.Order.__table__
+    items = models_db.OrderItem.__table__
+    products = models_db.Product.__table__
+
+    sales_date = utc_date(orders.c.created_at, dialect_name)
+    category_id = func.coalesce(items.c.category_id_at_transaction, products.c.category_id, 0)
+    payment_method = func.coalesce(orders.c.payment_method, "")
+
+    return (
+        select(
+            sales_date.label("sales_date"),
+            items.c.product_id,
+            category_id.label("category_id"),
+            payment_method.label("payment_method"),
+            orders.c.source,
+            func.sum(items.c.quantity).label("quantity"),
+            func.sum(items.c.subtotal).label("total_sales"),
+            func.sum(
+                items.c.quantity * func.coalesce(items.c.cost_at_transaction, products.c.purchase_price)
+            ).label("total_cost"),
+        )
+        .select_from(orders)
+        .join(items, items.c.order_id == orders.c.order_id)
+        .join(products, products.c.product_id == items.c.product_id)
+        .group_by(sales_date, items.c.product_id, category_id, payment_method, orders.c.source)
+    )
+
+def _hourly_aggregate_select(dialect_name: str):
+    """SELECT agregat orders per jam UTC dan shard -> baris hourly_sales (belum difilter)."""
+    orders = models_db.Order.__table__
+    sales_hour = time_bucket(orders.c.created_at, "hour", dialect_name, timezone_name="UTC")
+    shard = orders.c.order_id % HOURLY_SALES_SHARDS
+
+    return (
+        select(
+            sales_hour.label("sales_hour"),
+            shard.label("shard"),
+            func.count(orders.c.order_id).label("order_count"),
+            func.sum(orders.c.total_amount).label("total_sales"),
+        )
+        .group_by(sales_hour, shard)
+    )
+
+def _to_datetime(value) -> datetime:
+    """date_trunc mengembalikan datetime di PostgreSQL dan string di SQLite."""
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+def _to_date(value) -> date:
+    """func.date mengembalikan date di PostgreSQL dan string 'YYYY-MM-DD' di SQLite."""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+def _upsert_rollup_rows(
+        db: Session, table, rows: List[Dict[str, Any]], key_columns: List[str], value_columns: List[str]
+    ) -> None:
+    """INSERT ... ON CONFLICT (kunci rollup) DO UPDATE SET nilai = nilai + excluded.nilai."""
+    if not rows:
+        return
+
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Upsert rollup belum didukung untuk dialek '{dialect_name}'.")
+
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c[column] for column in key_columns],
+        set_={column: table.c[column] + stmt.excluded[column] for column in value_columns}
+    )
+    db.execute(stmt, rows)
+
+def snapshot_order_items(db: Session, order_ids: List[int]) -> None:
+    """
+    Mengisi snapshot kategori & harga beli yang masih NULL di item order (misal order pending yang dibuat
+    sebelum snapshot ada) dari produk saat ini. Dipanggil tepat sebelum order masuk rollup, sehingga
+    nilai yang ditambahkan dan yang nanti dibalikkan selalu sama. Tidak melakukan commit.
+    """
+    if not order_ids:
+        return
+
+    items = models_db.OrderItem.__table__
+    products = models_db.Product.__table__
+    product_category = (
+        select(func.coalesce(products.c.category_id, 0))
+        .where(products.c.product_id == items.c.product_id)
+        .scalar_subquery()
+    )
+    product_cost = (
+        select(products.c.purchase_price)
+        .where(products.c.product_id == items.c.product_id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(items)
+        .where(items.c.order_id.in_(order_ids))
+        .where(or_(items.c.category_id_at_transaction.is_(None), items.c.cost_at_transaction.is_(None)))
+        .values(
+            category_id_at_transaction=func.coalesce(items.c.category_id_at_transaction, product_category),
+            cost_at_transaction=func.coalesce(items.c.cost_at_transaction, product_cost),
+        )
+    )
+
+def apply_orders_to_rollup(db: Session, order_ids: List[int], sign: int = 1) -> None:
+    """
+    Menambahkan (sign=1) atau mengurangkan (sign=-1) kontribusi order ke rollup harian dan per jam.
+    Dipanggil saat order menjadi / berhenti menjadi 'completed'. Item order harus sudah di-flush.
+    Tidak melakukan commit; dijalankan dalam transaksi pemanggil agar rollup selalu konsisten.
+    """
+    if not order_ids:
+        return
+
+    stmt = _sales_aggregate_select(db.get_bind().dialect.name).where(models_db.Order.__table__.c.order_id.in_(order_ids))
+    rows = [
+        {
+            "sales_date": _to_date(r.sales_date),
+            "product_id": r.product_id,
+            "category_id": r.category_id,
+            "payment_method": r.payment_method,
+            "source": r.source,
+            "quantity": sign * int(r.quantity or 0),
+            "total_sales": sign * (r.total_sales or 0),
+            "total_cost": sign * (r.total_cost or 0),
+        }
+        for r in db.execute(stmt)
+    ]
+    _upsert_rollup_rows(
+        db, models_db.DailyProductSales.__table__, rows, _ROLLUP_KEY_COLUMNS, _ROLLUP_VALUE_COLUMNS
+    )
+
+    hourly_stmt = _hourly_aggregate_select(db.get_bind().dialect.name).where(
+        models_db.Order.__table__.c.order_id.in_(order_ids)
+    )
+    hourly_rows = [
+        {
+            "sales_hour": _to_datetime(r.sales_hour),
+            "shard": r.shard,
+            "order_count": sign * int(r.order_count or 0),
+            "total_sales": sign * (r.total_sales or 0),
+        }
+        for r in db.execute(hourly_stmt)
+    ]
+    _upsert_rollup_rows(
+        db, models_db.HourlySales.__table__, hourly_rows, _HOURLY_KEY_COLUMNS, _HOURLY_VALUE_COLUMNS
+    )
+
+def rebuild_rollup(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    Membangun ulang rollup harian dan per jam dari orders/order_items untuk rentang tanggal UTC
+    (inklusif; None = tanpa batas). Baris lama di rentang tersebut dihapus lalu diisi ulang, kemudian commit.
+    Return: jumlah baris rollup harian yang ditulis.
+    """
+    rollup = models_db.DailyProductSales.__table__
+    hourly = models_db.HourlySales.__table__
+    orders = models_db.Order.__table__
+
+    dialect_name = db.get_bind().dialect.name
+    order_date = utc_date(orders.c.created_at, dialect_name)
+
+    delete_stmt = delete(rollup)
+    delete_hourly_stmt = delete(hourly)
+    source_stmt = _sales_aggregate_select(dialect_name).where(orders.c.order_status == "completed")
+    hourly_source_stmt = _hourly_aggregate_select(dialect_name).where(orders.c.order_status == "completed")
+    if start_date:
+        delete_stmt = delete_stmt.where(rollup.c.sales_date >= start_date)
+        delete_hourly_stmt = delete_hourly_stmt.where(hourly.c.sales_hour >= datetime.combine(start_date, time.min))
+        source_stmt = source_stmt.where(order_date >= start_date)
+        hourly_source_stmt = hourly_source_stmt.where(order_date >= start_date)
+    if end_date:
+        delete_stmt = delete_stmt.where(rollup.c.sales_date <= end_date)
+        delete_hourly_stmt = delete_hourly_stmt.where(hourly.c.sales_hour < datetime.combine(end_date + timedelta(days=1), time.min))
+        source_stmt = source_stmt.where(order_date <= end_date)
+        hourly_source_stmt = hourly_source_stmt.where(order_date <= end_date)
+
+    try:
+        db.execute(delete_stmt)
+        result = db.execute(
+            insert(rollup).from_select(_ROLLUP_KEY_COLUMNS + _ROLLUP_VALUE_COLUMNS, source_stmt)
+        )
+
+        # Per jam: paling banyak 24 x HOURLY_SALES_SHARDS baris per hari, ditulis lewat Python agar format jam
+        # sama dengan jalur upsert
+        db.execute(delete_hourly_stmt)
+        hourly_rows = [
+            {
+                "sales_hour": _to_datetime(r.sales_hour), "shard": r.shard,
+                "order_count": r.order_count, "total_sales": r.total_sales
+            }
+            for r in db.execute(hourly_source_stmt)
+        ]
+        if hourly_rows:
+            db.execute(insert(hourly), hourly_rows)
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return result.rowcount
+
+def get_daily_sales(db: Session, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """Total penjualan, item, dan biaya per hari dari rollup (rentang tanggal inklusif), urut tanggal."""
+    rollup = models_db.DailyProductSales
+    rows = (
+        db.query(
+            rollup.sales_date,
+            func.sum(rollup.quantity).label("total_items"),
+            func.sum(rollup.total_sales).label("total_sales"),
+            func.sum(rollup.total_cost).label("total_cost"),
+        )
+        .filter(and_(rollup.sales_date >= start_date, rollup.sales_date <= end_date))
+        .group_by(rollup.sales_date)
+        .order_by(rollup.sales_date)
+        .all()
+    )
+
+    return [
+        {
+            "sales_date": _to_date(r.sales_date),
+            "total_items": int(r.total_items or 0),
+            "total_sales": float(r.total_sales or 0),
+            "total_cost": float(r.total_cost or 0),
+        }
+        for r in rows
+    ]
@@ -1,10 +1,15 @@
 # backend/app/crud/crud_stock.py
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from app.db import models_db
 from app.schemas import stock_schemas # Berisi StockIn, StockAdjustment, InventoryLogCreate, InventoryLog
-from .crud_product import update_product_stock_internal, get_product # Impor fungsi update stok produk
+from app.utils.pagination import paginate_query
+from .crud_product import apply_stock_deltas, get_product, get_products_by_ids # Impor fungsi update stok produk
+from .crud_report import invalidate_dashboard_cache # Stok memengaruhi jumlah produk stok kritis di dashboard
+
+_INVENTORY_LOG_OPTIONAL_COLUMNS = {"user_id": None, "transaction_id": None, "remarks": None}
 
 def create_inventory_log(db: Session, log_entry: stock_schemas.InventoryLogCreate) -> models_db.InventoryLog:
     """Membuat entri baru di inventory log."""
@@ -23,89 +28,133 @@ def create_inventory_log(db: Session, log_entry: stock_schemas.InventoryLogCreat
     # db.refresh(db_log_entry)
     return db_log_entry
 
+def create_inventory_logs_bulk(
+        db: Session, log_rows: List[Dict[str, Any]], return_rows: bool = False
+    ) -> List[Any]:
+    """
+    Membuat banyak entri inventory log sekaligus dengan satu INSERT multi-baris (executemany),
+    tanpa validasi Pydantic dan tanpa unit-of-work ORM per baris.
+    Setiap dict berisi kolom InventoryLog: product_id, change_type, quantity_change, stock_before,
+    stock_after, dan opsional user_id, transaction_id, remarks.
+    Jika return_rows=True, baris yang disisipkan dikembalikan (INSERT ... RETURNING) sesuai urutan input.
+    Commit dilakukan oleh fungsi pemanggil.
+    """
+    if not log_rows:
+        return []
+
+    # executemany membutuhkan set kolom yang sama di setiap baris
+    rows = [{**_INVENTORY_LOG_OPTIONAL_COLUMNS, **row} for row in log_rows]
+    inventory_log_table = models_db.InventoryLog.__table__
+
+    if return_rows:
+        stmt = insert(inventory_log_table).returning(*inventory_log_table.c, sort_by_parameter_order=True)
+        return db.execute(stmt, rows).all()
+
+    db.execute(insert(inventory_log_table), rows)
+    return []
+
 def get_inventory_logs_by_product_id(
-        db: Session, product_id: int, skip: int = 0, limit: int = 100
+        db: Session,
+        product_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None
     ) -> Dict[str, Any]:
-    """Mengambil daftar log inventaris untuk produk tertentu dengan paginasi dan total count."""
+    """
+    Mengambil daftar log inventaris untuk produk tertentu dengan paginasi dan total count.
+    Jika cursor diisi, paginasi memakai keyset (created_at, log_id) dan skip diabaikan.
+    """
     query = db.query(models_db.InventoryLog).filter(models_db.InventoryLog.product_id == product_id)
-    
-    total = query.count()
-    
-    logs_data = (
-        query
-        .order_by(models_db.InventoryLog.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
 
-    return {"total": total, "data": logs_data}
+    return paginate_query(
+        query,
+        order_columns=[models_db.InventoryLog.created_at, models_db.InventoryLog.log_id],
+        descending=True,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total
+    )
 
-def add_stock(db: Session, stock_in_data: stock_schemas.StockIn, user_id: Optional[int] = None) -> models_db.InventoryLog:
+def add_stock(db: Session, stock_in_data: stock_schemas.StockIn, user_id: Optional[int] = None) -> Any:
     """
     Menambah stok produk dan mencatatnya di inventory log.
     Ini adalah operasi transaksional (update produk & buat log).
     """
-    db_product = get_product(db, product_id=stock_in_data.product_id)
-    if not db_product:
-        raise ValueError(f"Produk dengan ID {stock_in_data.product_id} tidak ditemukan.")
-
-    stock_before = db_product.current_stock
+    return add_stock_batch(db, stock_in_items=[stock_in_data], user_id=user_id)[0]
 
-    # Update stok produk
-    updated_product = update_product_stock_internal(
-        db, product_id=stock_in_data.product_id, quantity_change=stock_in_data.quantity
-    )
-    if not updated_product: # Seharusnya tidak terjadi jika get_product berhasil
-        raise ValueError("Gagal memperbarui stok produk.")
-
-    stock_after = updated_product.current_stock
-
-    # Buat entri log
-    log_entry_schema = stock_schemas.InventoryLogCreate(
-        product_id=stock_in_data.product_id,
-        change_type="stock_in",
-        quantity_change=stock_in_data.quantity,
-        stock_before=stock_before,
-        stock_after=stock_after,
-        remarks=stock_in_data.remarks,
-        user_id=user_id
-    )
-
-    db_log = create_inventory_log(db, log_entry=log_entry_schema)
-
-    # Jika ada perubahan harga beli saat stock in
-    if stock_in_data.purchase_price is not None and stock_in_data.purchase_price != db_product.purchase_price:
-        db_product.purchase_price = stock_in_data.purchase_price
+def add_stock_batch(
+        db: Session, stock_in_items: List[stock_schemas.StockIn], user_id: Optional[int] = None
+    ) -> List[Any]:
+    """
+    Menambah stok banyak produk sekaligus (penerimaan barang / impor stok) dan mencatatnya di inventory log.
+    Produk dimuat dengan satu query, stok diubah dengan satu UPDATE, dan semua log disisipkan
+    dengan satu INSERT multi-baris. Ini adalah operasi transaksional dengan satu commit.
+    Return: baris inventory log yang dibuat, sesuai urutan input.
+    """
+    products_by_id = get_products_by_ids(db, product_ids=[item.product_id for item in stock_in_items])
+    deltas: Dict[int, int] = {}
+    for item in stock_in_items:
+        if item.product_id not in products_by_id:
+            raise ValueError(f"Produk dengan ID {item.product_id} tidak ditemukan.")
+        deltas[item.product_id] = deltas.get(item.product_id, 0) + item.quantity
+
+    # Update stok produk secara atomik (tanpa commit di tengah jalan)
+    try:
+        stock_changes = apply_stock_deltas(db, deltas=deltas)
+    except ValueError:
+        db.rollback()
+        raise
+
+    # Buat entri log (stok sebelum/sesudah dihitung berurutan jika produk muncul lebih dari sekali)
+    running_stock = {product_id: stock_before for product_id, (stock_before, _) in stock_changes.items()}
+    log_rows = []
+    for item in stock_in_items:
+        stock_before = running_stock[item.product_id]
+        running_stock[item.product_id] = stock_before + item.quantity
+        log_rows.append({
+            "product_id": item.product_id,
+            "change_type": "stock_in",
+            "quantity_change": item.quantity,
+            "stock_before": stock_before,
+            "stock_after": running_stock[item.product_id],
+            "remarks": item.remarks,
+            "user_id": user_id,
+        })
+
+        # Jika ada perubahan harga beli saat stock in
+        db_product = products_by_id[item.product_id]
+        if item.purchase_price is not None and item.purchase_price != db_product.purchase_price:
+            db_product.purchase_price = item.purchase_price
+            db.add(db_product)
+
+    db_logs = create_inventory_logs_bulk(db, log_rows=log_rows, return_rows=True)
 
-    db.add(db_product)
     db.commit() # Commit semua perubahan (stok produk, log, harga beli jika ada)
-    db.refresh(db_log)
-    db.refresh(db_product) # Refresh produk juga untuk mendapatkan harga beli terbaru jika diubah
+    invalidate_dashboard_cache()
 
-    return db_log
+    return db_logs
 
 def adjust_stock(db: Session, adjustment_data: stock_schemas.StockAdjustment, user_id: Optional[int] = None) -> models_db.InventoryLog:
     """
     Menyesuaikan stok produk ke jumlah baru dan mencatatnya.
     Ini adalah operasi transaksional.
     """
-    db_product = get_product(db, product_id=adjustment_data.product_id)
+    # Baris produk dikunci agar selisih yang dihitung tidak berubah oleh penjualan bersamaan
+    db_product = get_products_by_ids(db, product_ids=[adjustment_data.product_id], for_update=True).get(adjustment_data.product_id)
     if not db_product:
         raise ValueError(f"Produk dengan ID {adjustment_data.product_id} tidak ditemukan.")
 
     stock_before = db_product.current_stock
     quantity_change = adjustment_data.new_quantity - stock_before
 
-    # Update stok produk ke nilai baru
-    # Fungsi update_product_stock_internal menggunakan quantity_change, bukan new_quantity langsung
-    updated_product = update_product_stock_internal(
-        db, product_id=adjustment_data.product_id, quantity_change=quantity_change
-    )
-    if not updated_product:
-        raise ValueError("Gagal memperbarui stok produk untuk penyesuaian.")
-
-    stock_after = updated_product.current_stock # Seharusnya sama dengan adjustment_data.new_quantity
+    # Update stok produk ke nilai baru melalui selisihnya
+    stock_after = stock_before
+    if quantity_change != 0:
+        stock_before, stock_after = apply_stock_deltas(
+            db, deltas={adjustment_data.product_id: quantity_change}
+        )[adjustment_data.product_id]
 
     # Buat entri log
     log_entry_schema = stock_schemas.InventoryLogCreate(
@@ -121,50 +170,68 @@ def adjust_stock(db: Session, adjustment_data: stock_schemas.StockAdjustment, us
     db_log = create_inventory_log(db, log_entry=log_entry_schema)
 
     db.commit()
+    invalidate_dashboard_cache()
     db.refresh(db_log)
-    db.refresh(db_product)
 
     return db_log
 
-def record_sale_stock_deduction(
-        db: Session, product_id: int, quantity_sold: int, order_id: int, user_id: Optional[int] = None
-    ) -> models_db.InventoryLog:
+def record_sale_stock_deductions(
+        db: Session, items: List[Tuple[int, int]], order_id: int, user_id: Optional[int] = None
+    ) -> None:
     """
-    Mencatat pengurangan stok karena penjualan.
-    Fungsi ini biasanya dipanggil secara internal saat membuat order.
+    Mencatat pengurangan stok karena penjualan untuk banyak item dari satu order.
+    items: list (product_id, quantity_sold) sesuai urutan baris order; produk yang sama boleh muncul lebih dari sekali.
+    Fungsi ini dipanggil secara internal saat membuat order; commit dilakukan oleh pemanggil.
     """
-    if quantity_sold <= 0:
-        raise ValueError("Jumlah terjual harus lebih dari nol.")
-
-    db_product = get_product(db, product_id=product_id)
-
-    if not db_product:
-        raise ValueError(f"Produk dengan ID {product_id} tidak ditemukan untuk pengurangan stok penjualan.")
-
-    stock_before = db_product.current_stock
-    quantity_change = -abs(quantity_sold) # Pengurangan stok
-
-    updated_product = update_product_stock_internal(
-        db, product_id=product_id, quantity_change=quantity_change
+    record_sales_stock_deductions(
+        db, sold_items=[(order_id, product_id, quantity_sold) for product_id, quantity_sold in items], user_id=user_id
     )
 
-    if not updated_product:
-        raise ValueError("Gagal memperbarui stok produk untuk penjualan.")
+def record_sales_stock_deductions(
+        db: Session, sold_items: List[Tuple[int, int, int]], user_id: Optional[int] = None
+    ) -> None:
+    """
+    Mencatat pengurangan stok karena penjualan untuk item dari satu atau banyak order.
+    sold_items: list (order_id, product_id, quantity_sold) sesuai urutan order dan barisnya.
+    Stok semua produk dikurangi (diagregasi per produk) dengan satu statement UPDATE, lalu satu log
+    per baris disisipkan dengan satu INSERT multi-baris. Commit dilakukan oleh pemanggil.
+    """
+    deltas: Dict[int, int] = {}
+    for _, product_id, quantity_sold in sold_items:
+        if quantity_sold <= 0:
+            raise ValueError("Jumlah terjual harus lebih dari nol.")
+        deltas[product_id] = deltas.get(product_id, 0) - quantity_sold
+
+    stock_changes = apply_stock_deltas(db, deltas=deltas)
+
+    # Hitung stok sebelum/sesudah per baris secara berurutan dari nilai yang dikembalikan UPDATE
+    running_stock = {product_id: stock_before for product_id, (stock_before, _) in stock_changes.items()}
+    log_rows = []
+    for order_id, product_id, quantity_sold in sold_items:
+        stock_before = running_stock[product_id]
+        running_stock[product_id] = stock_before - quantity_sold
+        log_rows.append({
+            "product_id": product_id,
+            "change_type": "sale",
+            "quantity_change": -quantity_sold,
+            "stock_before": stock_before,
+            "stock_after": running_stock[product_id],
+            "remarks": f"Penjualan untuk Order ID: {order_id}",
+            "user_id": user_id,
+            "transaction_id": order_id,
+        })
+
+    create_inventory_logs_bulk(db, log_rows=log_rows)
 
-    stock_after = updated_product.current_stock
+    #Commit akan dilakukan oleh fungsi create_order yang memanggil ini.
 
-    log_entry_schema = stock_schemas.InventoryLogCreate(
-        product_id=product_id,
-        change_type="sale",
-        quantity_change=quantity_change,
-        stock_before=stock_before,
-        stock_after=stock_after,
-        remarks=f"Penjualan untuk Order ID: {order_id}",
-        user_id=user_id,
-        transaction_id=order_id
+def record_sale_stock_deduction(
+        db: Session, product_id: int, quantity_sold: int, order_id: int, user_id: Optional[int] = None
+    ) -> None:
+    """
+    Mencatat pengurangan stok karena penjualan untuk satu produk.
+    Lihat record_sale_stock_deductions untuk versi multi-item.
+    """
+    record_sale_stock_deductions(
+        db, items=[(product_id, quantity_sold)], order_id=order_id, user_id=user_id
     )
-
-    db_log = create_inventory_log(db, log_entry=log_entry_schema)
-
-    #Commit akan dilakukan oleh fungsi create_order yang memanggil ini.
-    return db_log
\ No newline at end of file
@@ -4,7 +4,7 @@ from typing import Optional, List, Dict, Any
 
 from app.db import models_db
 from app.schemas import user_schemas
-from app.core.security import get_password_hash # Untuk hashing password saat membuat user
+from app.core.security import get_password_hash, principal_cache # Untuk hashing password & invalidasi cache user
 
 def get_user(db: Session, user_id: int) -> Optional[models_db.User]:
     """Mengambil satu user berdasarkan ID."""
@@ -62,6 +62,8 @@ def update_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate_user(user_id) # Role/status aktif bisa berubah: paksa muat ulang di request berikutnya
+
     return db_user
 
 def delete_user(db: Session, user_id: int) -> Optional[models_db.User]:
@@ -70,6 +72,7 @@ def delete_user(db: Session, user_id: int) -> Optional[models_db.User]:
     if db_user:
         db.delete(db_user)
         db.commit()
+        principal_cache.invalidate_user(user_id)
 
     return db_user
 
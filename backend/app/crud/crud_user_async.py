@@ -0,0 +1,45 @@
+# backend/app/crud/crud_user_async.py
+# Versi async (AsyncSession) dari fungsi-fungsi crud_user yang dipakai endpoint `async def`.
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.db import models_db
+from app.schemas import user_schemas
+from app.core.security import get_password_hash_async # Untuk hashing password saat membuat user
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models_db.User]:
+    """Mengambil satu user berdasarkan ID."""
+    result = await db.execute(select(models_db.User).where(models_db.User.user_id == user_id))
+
+    return result.scalars().first()
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models_db.User]:
+    """Mengambil satu user berdasarkan username."""
+    result = await db.execute(select(models_db.User).where(models_db.User.username == username))
+
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: user_schemas.UserCreate) -> models_db.User:
+    """Membuat user baru."""
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = models_db.User(
+        username=user.username,
+        hashed_password=hashed_password,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=True # Default user aktif saat dibuat
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+
+    return db_user
+
+async def update_password_hash(db: AsyncSession, db_user: models_db.User, hashed_password: str) -> models_db.User:
+    """Menyimpan hash password baru (misal rehash saat cost bcrypt berubah)."""
+    db_user.hashed_password = hashed_password
+    db.add(db_user)
+    await db.commit()
+
+    return db_user
@@ -1,8 +1,9 @@
 # backend/app/db/models_db.py
 from sqlalchemy import (
     Column, Integer, String, ForeignKey, Numeric, TIMESTAMP, Boolean, Text,
-    CheckConstraint
+    CheckConstraint, Sequence, Index, Date, UniqueConstraint, JSON, SmallInteger, BigInteger
 )
+from sqlalchemy import event, DDL
 from sqlalchemy.orm import relationship, declarative_base # Mengganti declarative_base dari sqlalchemy.ext.declarative
 from sqlalchemy.sql import func # Untuk default timestamp
 
@@ -63,8 +64,41 @@ class Product(Base):
         CheckConstraint('purchase_price >= 0', name='check_purchase_price_non_negative'),
         CheckConstraint('selling_price >= 0', name='check_selling_price_non_negative'),
         CheckConstraint('current_stock >= 0', name='check_current_stock_non_negative'),
+        Index('ix_products_name_product_id', 'name', 'product_id'), # Keyset pagination daftar produk
+        # Pencarian ILIKE '%term%' / similarity (pg_trgm) pada nama & SKU; hanya dibuat di PostgreSQL
+        Index(
+            'ix_products_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        Index(
+            'ix_products_sku_trgm', 'sku',
+            postgresql_using='gin', postgresql_ops={'sku': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
     )
 
+# Ekstensi pg_trgm harus ada sebelum indeks trigram dibuat
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
+class CatalogVersion(Base):
+    """
+    Versi katalog untuk ETag (lihat app.core.catalog_version). Dinaikkan di transaksi yang sama dengan perubahan
+    datanya, sehingga versi baru hanya terlihat bersama data tersebut.
+    scope 'catalog' (produk & kategori) memakai shard 0; scope 'stock' dipecah ke beberapa shard agar penjualan
+    bersamaan tidak berebut satu baris. Versi sebuah scope = SUM(version) semua shard-nya.
+    """
+    __tablename__ = "catalog_versions"
+
+    scope = Column(String(20), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    version = Column(BigInteger, nullable=False, default=0)
+
+# Sequence sumber nomor order (INV-YYYYMMDD-XXXXXX); dialokasikan per blok oleh crud_order
+order_number_seq = Sequence("order_number_seq", metadata=Base.metadata)
 
 class Order(Base):
     __tablename__ = "orders"
@@ -77,6 +111,7 @@ class Order(Base):
     order_status = Column(String(20), default='pending', nullable=False) # completed, pending, cancelled
     source = Column(String(20), default='dashboard', nullable=False) # 'dashboard', 'whatsapp_bot'
     notes = Column(Text, nullable=True)
+    client_reference = Column(String(100), nullable=True) # ID order di terminal (sinkronisasi batch), unik per pengguna
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -84,6 +119,12 @@ class Order(Base):
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
     inventory_logs_related = relationship("InventoryLog", back_populates="related_order")
 
+    __table_args__ = (
+        Index('ix_orders_created_at_order_id', 'created_at', 'order_id'), # Keyset pagination daftar order
+        # Batch yang dikirim ulang terminal tidak boleh membuat order kedua
+        UniqueConstraint('user_id', 'client_reference', name='uq_orders_user_client_reference'),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -93,6 +134,9 @@ class OrderItem(Base):
     product_id = Column(Integer, ForeignKey("products.product_id", ondelete="RESTRICT"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price_at_transaction = Column(Numeric(10, 2), nullable=False) # Harga produk saat transaksi
+    cost_at_transaction = Column(Numeric(10, 2), nullable=True) # Harga beli produk saat transaksi (NULL = data lama belum di-backfill)
+    # Kategori produk saat transaksi (0 = tanpa kategori, NULL = data lama); kunci rollup tetap sama walau produk pindah kategori
+    category_id_at_transaction = Column(Integer, nullable=True)
     subtotal = Column(Numeric(12, 2), nullable=False) # quantity * price_at_transaction
 
     order = relationship("Order", back_populates="items")
@@ -121,3 +165,71 @@ class InventoryLog(Base):
     created_by_user = relationship("User", back_populates="inventory_logs_created")
     related_order = relationship("Order", back_populates="inventory_logs_related")
 
+    __table_args__ = (
+        Index('ix_inventory_log_product_id_created_at_log_id', 'product_id', 'created_at', 'log_id'), # Keyset pagination log per produk
+    )
+
+
+class DailyProductSales(Base):
+    """
+    Rollup penjualan harian per (tanggal, produk, kategori, metode pembayaran, sumber).
+    Hanya berisi order berstatus 'completed'; dipelihara dalam transaksi yang sama dengan
+    pembuatan order / perubahan status (lihat crud_sales_rollup) dan bisa dibangun ulang
+    dengan `python -m app.scripts.rebuild_sales_rollup`.
+    """
+    __tablename__ = "daily_product_sales"
+
+    rollup_id = Column(Integer, primary_key=True, index=True)
+    sales_date = Column(Date, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.product_id", ondelete="CASCADE"), nullable=False)
+    category_id = Column(Integer, nullable=False, default=0) # 0 = tanpa kategori (bukan NULL agar unique key berlaku)
+    payment_method = Column(String(50), nullable=False, default='') # '' = tidak diisi
+    source = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    total_sales = Column(Numeric(14, 2), nullable=False, default=0)
+    total_cost = Column(Numeric(14, 2), nullable=False, default=0) # quantity * harga beli saat dicatat
+
+    __table_args__ = (
+        UniqueConstraint(
+            'sales_date', 'product_id', 'category_id', 'payment_method', 'source',
+            name='uq_daily_product_sales_key'
+        ),
+        Index('ix_daily_product_sales_product_id', 'product_id'),
+    )
+
+
+class HourlySales(Base):
+    """
+    Rollup order 'completed' per jam (UTC): jumlah transaksi dan total penjualan.
+    Dipelihara bersama DailyProductSales oleh crud_sales_rollup; dipakai laporan heatmap.
+    Tiap jam dipecah ke beberapa shard (order_id % HOURLY_SALES_SHARDS) agar checkout bersamaan tidak
+    berebut satu baris; pembaca selalu menjumlahkan semua shard.
+    """
+    __tablename__ = "hourly_sales"
+
+    sales_hour = Column(TIMESTAMP(timezone=False), primary_key=True) # Awal jam dalam UTC (tanpa zona)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    total_sales = Column(Numeric(14, 2), nullable=False, default=0)
+
+class ReportJob(Base):
+    """
+    Job laporan yang dijalankan di background (lihat crud_report_jobs).
+    Hasil disimpan sebagai JSON dan dipakai ulang untuk parameter yang sama (params_hash).
+    """
+    __tablename__ = "report_jobs"
+
+    job_id = Column(String(36), primary_key=True) # UUID4
+    report_type = Column(String(50), nullable=False)
+    params = Column(JSON, nullable=False)
+    params_hash = Column(String(64), nullable=False, index=True) # sha256 dari report_type + params
+    status = Column(String(20), nullable=False, default='queued') # queued, running, completed, failed, expired
+    is_closed_period = Column(Boolean, nullable=False, default=False) # Periode sudah tutup: hasil dipakai ulang lebih lama
+    period_start = Column(Date, nullable=True) # Rentang laporan, untuk invalidasi saat order di periode ini berubah
+    period_end = Column(Date, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.user_id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
@@ -0,0 +1,121 @@
+# backend/app/db/pool_metrics.py
+# Instrumentasi connection pool SQLAlchemy: waktu tunggu checkout, latensi connect, dan timeout.
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Batas atas bucket histogram waktu tunggu checkout (milidetik); bucket terakhir = "lebih dari itu"
+WAIT_BUCKETS_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class PoolMetrics:
+    """Penampung statistik pool yang thread-safe (satu instance per engine)."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.checkout_timeouts = 0
+        self.connect_count = 0
+        self.connect_total_ms = 0.0
+        self.connect_max_ms = 0.0
+
+    def observe_wait(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.wait_histogram[bisect_left(WAIT_BUCKETS_MS, elapsed_ms)] += 1
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+
+    def observe_connect(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self.connect_count += 1
+            self.connect_total_ms += elapsed_ms
+            self.connect_max_ms = max(self.connect_max_ms, elapsed_ms)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.checkout_timeouts += 1
+
+    def snapshot(self, pool: Any) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound:g}ms" for bound in WAIT_BUCKETS_MS] + [f"gt_{WAIT_BUCKETS_MS[-1]:g}ms"]
+            stats = {
+                "checkout_wait": {
+                    "count": self.wait_count,
+                    "avg_ms": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else None,
+                    "max_ms": round(self.wait_max_ms, 3),
+                    "timeouts": self.checkout_timeouts,
+                    "histogram": dict(zip(labels, self.wait_histogram)),
+                },
+                "connect": {
+                    "count": self.connect_count,
+                    "avg_ms": round(self.connect_total_ms / self.connect_count, 3) if self.connect_count else None,
+                    "max_ms": round(self.connect_max_ms, 3),
+                },
+            }
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+            })
+        stats["status"] = pool.status()
+
+        return stats
+
+class _InstrumentedPoolMixin:
+    """Mengukur waktu checkout (termasuk menunggu slot kosong dan membuka koneksi baru)."""
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+
+    def recreate(self):
+        # engine.dispose() membuat pool baru; bawa metrics agar statistik tidak hilang
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        return new_pool
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(engine: Engine) -> PoolMetrics:
+    """
+    Memasang metrics ke engine (sinkron, atau `async_engine.sync_engine`).
+    Latensi connect diukur dengan membuka koneksi DBAPI sendiri di event `do_connect`.
+    """
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, _InstrumentedPoolMixin):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "do_connect")
+    def _timed_connect(dialect, conn_rec, cargs, cparams):
+        start = time.perf_counter()
+        try:
+            return dialect.connect(*cargs, **cparams)
+        finally:
+            metrics.observe_connect((time.perf_counter() - start) * 1000)
+
+    return metrics
@@ -0,0 +1,55 @@
+# backend/app/db/product_search.py
+# Klausa pencarian produk (nama & SKU) dengan peringkat relevansi, untuk PostgreSQL (pg_trgm) dan SQLite.
+from typing import Any, List, Tuple
+
+from sqlalchemy import case, func, or_
+
+from app.db import models_db
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def product_search_clauses(search: str, dialect_name: str) -> Tuple[Any, List[Any]]:
+    """
+    Return: (klausa WHERE, daftar ORDER BY) untuk mencari `search` di nama dan SKU produk.
+    Urutan peringkat: SKU persis, nama diawali term, nama mengandung term (posisi lebih awal lebih baik),
+    lalu kemiripan trigram (PostgreSQL) / nama terpendek (SQLite), kemudian nama dan ID.
+    Di PostgreSQL, ILIKE '%term%' dan operator % (similarity >= pg_trgm.similarity_threshold, default 0.3,
+    sehingga salah ketik tetap ditemukan) dilayani indeks GIN gin_trgm_ops (lihat models_db.Product).
+    """
+    term = search.strip()
+    name = models_db.Product.name
+    sku = models_db.Product.sku
+    contains_pattern = f"%{_escape_like(term)}%"
+    prefix_pattern = f"{_escape_like(term)}%"
+
+    name_contains = name.ilike(contains_pattern, escape="\\")
+    match_tier = case(
+        (func.lower(sku) == term.lower(), 0),
+        (name.ilike(prefix_pattern, escape="\\"), 1),
+        (name_contains, 2),
+        else_=3
+    )
+
+    if dialect_name == "postgresql":
+        where_clause = or_(name_contains, sku.ilike(contains_pattern, escape="\\"), name.op("%")(term))
+        match_position = func.nullif(func.strpos(func.lower(name), term.lower()), 0)
+        order_by = [
+            match_tier,
+            match_position.asc().nulls_last(),
+            func.similarity(name, term).desc(),
+            name,
+            models_db.Product.product_id,
+        ]
+    else:
+        where_clause = or_(name_contains, sku.ilike(contains_pattern, escape="\\"))
+        match_position = func.nullif(func.instr(func.lower(name), term.lower()), 0)
+        order_by = [
+            match_tier,
+            match_position.asc().nulls_last(),
+            func.length(name),
+            name,
+            models_db.Product.product_id,
+        ]
+
+    return where_clause, order_by
@@ -0,0 +1,180 @@
+# backend/app/db/time_buckets.py
+# Pengelompokan waktu (hour/day/week/month) di sisi database, untuk PostgreSQL dan SQLite.
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import func, cast, case, Integer
+
+TIME_BUCKETS = ("hour", "day", "week", "month")
+
+def get_timezone(timezone_name: str) -> ZoneInfo:
+    """ZoneInfo dari nama IANA (misal 'Asia/Jakarta'). Melempar ValueError jika tidak dikenal."""
+    try:
+        return ZoneInfo(timezone_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Zona waktu '{timezone_name}' tidak dikenal.")
+
+def local_date_range_to_utc(start_date: date, end_date: date, timezone_name: str) -> Tuple[datetime, datetime]:
+    """Batas [awal start_date, awal hari setelah end_date) dalam zona lokal, dikonversi ke UTC-aware datetime."""
+    tz = get_timezone(timezone_name)
+    start_at = datetime.combine(start_date, time.min, tzinfo=tz)
+    end_at = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=tz)
+    return start_at.astimezone(timezone.utc), end_at.astimezone(timezone.utc)
+
+def utc_date(column, dialect_name: str):
+    """
+    Tanggal UTC dari kolom TIMESTAMP WITH TIME ZONE. Di PostgreSQL date(timestamptz) bergantung pada
+    setting TimeZone sesi, jadi dikonversi eksplisit ke UTC dulu; SQLite menyimpan waktu UTC apa adanya.
+    """
+    if dialect_name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+def _utc_offset_segments(timezone_name: str, start_date: date, end_date: date) -> List[Tuple[Optional[datetime], int]]:
+    """
+    Offset UTC (menit) zona tersebut sepanjang [start_date, end_date] (dengan margin satu hari di kedua sisi).
+    Return: list (mulai_berlaku UTC tanpa zona atau None untuk segmen pertama, offset_menit), urut waktu.
+    Pergantian DST dicari per hari lalu dipersempit per jam (pergantian zona selalu di batas jam/menit bulat).
+    """
+    tz = get_timezone(timezone_name)
+
+    def offset_minutes(at: datetime) -> int:
+        return int(at.replace(tzinfo=timezone.utc).astimezone(tz).utcoffset().total_seconds() // 60)
+
+    cursor = datetime.combine(start_date - timedelta(days=1), time.min)
+    until = datetime.combine(end_date + timedelta(days=2), time.min)
+    segments: List[Tuple[Optional[datetime], int]] = [(None, offset_minutes(cursor))]
+    while cursor < until:
+        next_day = cursor + timedelta(days=1)
+        if offset_minutes(next_day) != segments[-1][1]:
+            moment = cursor
+            while moment < next_day:
+                moment += timedelta(minutes=15)
+                if offset_minutes(moment) != segments[-1][1]:
+                    segments.append((moment, offset_minutes(moment)))
+        cursor = next_day
+    return segments
+
+def _sqlite_local_datetime(column, timezone_name: str, start_date: date, end_date: Optional[date] = None):
+    """
+    Waktu lokal `column` (UTC) di SQLite, yang tidak mengenal zona IANA: offset dihitung di Python untuk rentang
+    [start_date, end_date], dan pergantian DST di dalamnya menjadi CASE atas batas waktu UTC-nya.
+    """
+    segments = _utc_offset_segments(timezone_name, start_date, end_date or start_date)
+    if len(segments) == 1:
+        return func.datetime(column, f"{segments[0][1]:+d} minutes")
+
+    # datetime() menormalkan format tersimpan ('... HH:MM:SS[.ffffff][+00:00]') agar bisa dibandingkan sebagai teks
+    normalized = func.datetime(column)
+    whens = [
+        (normalized < next_start.strftime("%Y-%m-%d %H:%M:%S"), func.datetime(column, f"{minutes:+d} minutes"))
+        for (_, minutes), (next_start, _) in zip(segments, segments[1:])
+    ]
+    return case(*whens, else_=func.datetime(column, f"{segments[-1][1]:+d} minutes"))
+
+def time_bucket(
+        column,
+        bucket: str,
+        dialect_name: str,
+        timezone_name: Optional[str] = None,
+        reference_date: Optional[date] = None,
+        reference_end_date: Optional[date] = None
+    ):
+    """
+    Ekspresi SQL awal bucket untuk `column`.
+    - timezone_name diisi: column adalah TIMESTAMP WITH TIME ZONE dan dikonversi ke waktu lokal sebelum dipotong
+      (PostgreSQL: date_trunc(bucket, timezone(tz, column)); SQLite: offset dihitung untuk rentang
+      reference_date..reference_end_date, termasuk pergantian DST di dalamnya).
+    - timezone_name None: column sudah berupa tanggal/waktu lokal (misal daily_product_sales.sales_date).
+    Minggu dimulai hari Senin (ISO). Gunakan bucket_label() untuk menormalkan hasilnya.
+    """
+    if bucket not in TIME_BUCKETS:
+        raise ValueError(f"Bucket waktu '{bucket}' tidak didukung. Pilihan: {', '.join(TIME_BUCKETS)}.")
+
+    if dialect_name == "postgresql":
+        local_column = func.timezone(timezone_name, column) if timezone_name else column
+        return func.date_trunc(bucket, local_column)
+
+    if dialect_name == "sqlite":
+        if timezone_name:
+            local_column = _sqlite_local_datetime(
+                column, timezone_name, reference_date or date.today(), reference_end_date
+            )
+        else:
+            local_column = column
+        if bucket == "hour":
+            return func.strftime("%Y-%m-%d %H:00:00", local_column)
+        if bucket == "day":
+            return func.date(local_column)
+        if bucket == "week":
+            # 'weekday 0' maju ke hari Minggu (atau tetap jika sudah Minggu); mundur 6 hari = Senin minggu itu
+            return func.date(local_column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", local_column)
+
+    raise NotImplementedError(f"Bucket waktu belum didukung untuk dialek '{dialect_name}'.")
+
+def bucket_label(value: Any, bucket: str) -> str:
+    """Menormalkan nilai bucket (datetime di PostgreSQL, string di SQLite) menjadi label string."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time.min)
+
+    if bucket == "hour":
+        return value.strftime("%Y-%m-%d %H:00")
+    if bucket == "month":
+        return value.strftime("%Y-%m")
+    return value.strftime("%Y-%m-%d") # day, atau hari Senin untuk week
+
+def has_whole_hour_offsets(timezone_name: str, start_date: date, end_date: date) -> bool:
+    """True jika offset UTC zona tersebut kelipatan satu jam di awal dan akhir rentang (bucket jam UTC bisa dipetakan langsung)."""
+    tz = get_timezone(timezone_name)
+    return all(
+        tz.utcoffset(datetime.combine(day, time(12))).total_seconds() % 3600 == 0
+        for day in (start_date, end_date)
+    )
+
+def weekday_and_hour(
+        column,
+        dialect_name: str,
+        timezone_name: Optional[str] = None,
+        reference_date: Optional[date] = None,
+        reference_end_date: Optional[date] = None,
+        column_is_utc_naive: bool = False
+    ) -> Tuple[Any, Any]:
+    """
+    Ekspresi (hari dalam minggu 0=Senin..6=Minggu, jam 0..23) dari `column` dalam waktu lokal timezone_name.
+    column_is_utc_naive=True untuk kolom TIMESTAMP tanpa zona yang menyimpan waktu UTC (misal hourly_sales.sales_hour).
+    """
+    if dialect_name == "postgresql":
+        if timezone_name:
+            aware_column = func.timezone("UTC", column) if column_is_utc_naive else column
+            local_column = func.timezone(timezone_name, aware_column)
+        else:
+            local_column = column
+        return (
+            cast(func.extract("isodow", local_column), Integer) - 1,
+            cast(func.extract("hour", local_column), Integer),
+        )
+
+    if dialect_name == "sqlite":
+        if timezone_name:
+            local_column = _sqlite_local_datetime(column, timezone_name, reference_date or date.today(), reference_end_date)
+        else:
+            local_column = column
+        return (
+            (cast(func.strftime("%w", local_column), Integer) + 6) % 7, # %w: 0=Minggu
+            cast(func.strftime("%H", local_column), Integer),
+        )
+
+    raise NotImplementedError(f"Ekstraksi hari/jam belum didukung untuk dialek '{dialect_name}'.")
+
+def shift_date(column, days: int, dialect_name: str):
+    """Ekspresi tanggal `column` digeser `days` hari (bisa negatif)."""
+    if dialect_name == "postgresql":
+        return column + days # date + integer -> date
+    if dialect_name == "sqlite":
+        return func.date(column, f"{days:+d} days")
+
+    raise NotImplementedError(f"Pergeseran tanggal belum didukung untuk dialek '{dialect_name}'.")
@@ -7,12 +7,16 @@ from sqlalchemy import text
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 from app.core.config import settings
-from app.db.database import get_db # Untuk health check, engine bisa diakses dari sini jika perlu
+from app.core.security import principal_cache
+from app.crud.crud_report import dashboard_cache
+from app.core.product_index import product_index
+from app.core.catalog_version import ensure_catalog_version_table
+from app.db.database import SessionLocal, get_async_db, get_pool_stats # Untuk health check, engine bisa diakses dari sini jika perlu
 # from app.db.database import create_db_and_tables # Dikomentari, Alembic lebih direkomendasikan
 
 # Impor semua router Anda
@@ -86,6 +90,33 @@ app.include_router(reports.router, prefix=f"{API_V1_PREFIX}/reports", tags=["7.
 app.include_router(bot_interface.router, prefix=f"{API_V1_PREFIX}/bot", tags=["8. Bot Interface"])
 
 
+@app.on_event("startup")
+def create_catalog_version_table():
+    """Tabel versi katalog (ETag) dibuat jika belum ada, agar database lama tidak memberi 500."""
+    try:
+        ensure_catalog_version_table()
+    except Exception as e:
+        logger.error(f"Gagal membuat tabel versi katalog, ETag katalog dinonaktifkan: {e}")
+
+@app.on_event("startup")
+def build_product_index():
+    """Membangun indeks produk in-process; jika gagal, /products/suggest tetap memakai query database."""
+    if not settings.PRODUCT_INDEX_ENABLED:
+        return
+    db = SessionLocal()
+    try:
+        product_index.build(db)
+    except Exception as e:
+        logger.error(f"Gagal membangun indeks produk, autocomplete memakai database: {e}")
+    finally:
+        db.close()
+    product_index.start_background_sync(SessionLocal, settings.PRODUCT_INDEX_SYNC_SECONDS)
+
+@app.on_event("shutdown")
+def stop_product_index_sync():
+    product_index.stop_background_sync()
+
+
 # -- Global Exception Handler (Contoh) --
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc: RequestValidationError):
@@ -141,14 +172,14 @@ async def read_root():
     }
 
 @app.get("/health", tags=["0. Root & Health"])
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint untuk memeriksa kesehatan aplikasi dan koneksi database.
     """
     db_status = "unknown"
     try:
         # Coba lakukan query sederhana ke database
-        result = db.execute(text("SELECT 1")).scalar_one_or_none()
+        result = (await db.execute(text("SELECT 1"))).scalar_one_or_none()
         if result == 1:
             db_status = "connected"
         else:
@@ -170,6 +201,35 @@ async def health_check(db: Session = Depends(get_db)):
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
 
+@app.get("/health/db-pool", tags=["0. Root & Health"])
+async def db_pool_stats():
+    """
+    Statistik connection pool (koneksi terpakai, overflow, histogram waktu tunggu, latensi connect)
+    di worker yang menangani request ini.
+    """
+    return get_pool_stats()
+
+@app.get("/health/principal-cache", tags=["0. Root & Health"])
+async def principal_cache_stats():
+    """
+    Statistik cache user terautentikasi (hit/miss) di worker yang menangani request ini.
+    """
+    return principal_cache.stats()
+
+@app.get("/health/product-index", tags=["0. Root & Health"])
+async def product_index_stats():
+    """
+    Status dan perkiraan memori indeks autocomplete produk di worker yang menangani request ini.
+    """
+    return product_index.stats()
+
+@app.get("/health/dashboard-cache", tags=["0. Root & Health"])
+async def dashboard_cache_stats():
+    """
+    Statistik cache ringkasan dashboard (hit/stale/miss) di worker yang menangani request ini.
+    """
+    return dashboard_cache.stats()
+
 # Untuk menjalankan dengan `python main.py` (biasanya Uvicorn dijalankan dari terminal)
 # if __name__ == "__main__":
 #     import uvicorn
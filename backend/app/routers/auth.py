@@ -1,12 +1,12 @@
 # backend/app/routers/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.schemas import user_schemas, token_schemas
-from app.crud import crud_user
+from app.crud import crud_user_async
 from app.core import security
 from app.core.config import settings
 
@@ -14,20 +14,27 @@ router = APIRouter()
 
 @router.post("/login", response_model=token_schemas.Token, tags=["Authentication"])
 async def login_for_access_token(
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         form_data: OAuth2PasswordRequestForm = Depends()
     ):
     """
     Login user dan dapatkan access token.
     Username dan password dikirim sebagai form data.
     """
-    user = crud_user.get_user_by_username(db, username=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    user = await crud_user_async.get_user_by_username(db, username=form_data.username)
+    is_valid, new_password_hash = (False, None)
+    if user:
+        # bcrypt dijalankan di pool thread terpisah agar tidak memblokir event loop
+        is_valid, new_password_hash = await security.verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_password_hash:
+        # Cost bcrypt berubah sejak password ini di-hash: simpan ulang dengan cost yang baru
+        await crud_user_async.update_password_hash(db, db_user=user, hashed_password=new_password_hash)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -44,19 +51,19 @@ async def login_for_access_token(
 @router.post("/register", response_model=user_schemas.User, status_code=status.HTTP_201_CREATED, tags=["Authentication"])
 async def register_new_user(
         user_in: user_schemas.UserCreate,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
     ):
     """
     Registrasi pengguna baru. (Endpoint ini bisa diatur hanya untuk admin jika diperlukan)
     """
-    db_user = crud_user.get_user_by_username(db, username=user_in.username)
+    db_user = await crud_user_async.get_user_by_username(db, username=user_in.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     # Anda bisa menambahkan validasi email atau role di sini jika perlu
-    created_user = crud_user.create_user(db=db, user=user_in)
+    created_user = await crud_user_async.create_user(db=db, user=user_in)
 
     return created_user
 
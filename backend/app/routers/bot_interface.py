@@ -1,13 +1,15 @@
 # backend/app/routers/bot_interface.py
 from fastapi import APIRouter, Depends, HTTPException, status, Header, Security
 from fastapi.security.api_key import APIKeyHeader
-from sqlalchemy.orm import Session
-from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
-from app.db.database import get_db
+from app.db.database import SessionLocal, get_async_db
 from app.core.config import settings
-from app.crud import crud_product, crud_order, crud_stock # Impor CRUD yang relevan
+from app.core.product_index import ProductMatch, ProductResolution, normalize_text, product_index
+from app.crud import crud_product_async, crud_order # Impor CRUD yang relevan
 from app.schemas import product_schemas, order_schemas, stock_schemas # Impor skema yang relevan
 
 router = APIRouter()
@@ -36,10 +38,59 @@ class BotCommandPayload(BaseModel):
     user_identifier: Optional[str] = Field(None, description="Identifier pengguna bot (misal: nomor telepon)")
     # Tambahkan parameter lain yang mungkin dikirim bot
 
+async def resolve_product(db: AsyncSession, product_name: str) -> ProductResolution:
+    """
+    Menentukan produk dari teks bebas pesan bot. Memakai pencocokan fuzzy di indeks produk in-process
+    (tanpa query DB); sebelum indeks siap, memakai pencarian DB dengan aturan yang lebih ketat:
+    lebih dari satu hasil dianggap ambigu kecuali hasil teratas namanya sama persis.
+    """
+    if product_index.ready:
+        return product_index.resolve(
+            product_name,
+            min_score=settings.PRODUCT_MATCH_MIN_SCORE,
+            confident_score=settings.PRODUCT_MATCH_CONFIDENT_SCORE,
+            margin=settings.PRODUCT_MATCH_MARGIN,
+            limit=5,
+            only_active=True
+        )
+
+    products = await crud_product_async.search_products(db, search=product_name, limit=5, only_active=True)
+    candidates = [ProductMatch(product, 0.0, "search") for product in products] # Tanpa skor di jalur DB
+    if not products:
+        return ProductResolution("not_found", None, [])
+    if len(products) == 1 or normalize_text(products[0].name) == normalize_text(product_name):
+        return ProductResolution("matched", products[0], candidates)
+    return ProductResolution("ambiguous", None, candidates)
+
+def _candidates_data(candidates: List[ProductMatch]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "product_id": match.product.product_id,
+            "product_name": match.product.name,
+            "sku": match.product.sku,
+            "stock": match.product.current_stock,
+            "score": match.score,
+        }
+        for match in candidates
+    ]
+
+def _ambiguous_message(product_name: str, candidates: List[ProductMatch]) -> str:
+    choices = ", ".join(f"{match.product.name} (Stok: {match.product.current_stock})" for match in candidates[:3])
+    return f"Produk '{product_name}' ambigu. Maksud Anda: {choices}? Mohon lebih spesifik."
+
+def _create_bot_order(order_in: order_schemas.OrderCreate) -> Dict[str, Any]:
+    """
+    Membuat order dengan sesi sinkron sendiri. Dipanggil lewat run_in_threadpool: create_order (dan hook
+    after_commit-nya) melakukan I/O blocking, jadi tidak boleh berjalan di thread event loop.
+    """
+    with SessionLocal() as sync_db:
+        created_order = crud_order.create_order(db=sync_db, order_in=order_in, current_user_id=None) # Ganti None dengan ID user bot jika ada
+        return {"order_number": created_order.order_number, "total_amount": created_order.total_amount}
+
 @router.post("/process_command", response_model=Dict[str, Any], tags=["Bot Interface"])
 async def process_bot_command(
         payload: BotCommandPayload,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         api_key: str = Depends(get_api_key) # Menggunakan API Key untuk autentikasi bot
     ):
     """
@@ -56,28 +107,34 @@ async def process_bot_command(
         if command == "check_stock":
             if not product_name:
                 raise ValueError("Nama produk diperlukan untuk cek stok.")
-            # Cari produk. Mungkin perlu pencarian yang lebih fuzzy atau by SKU.
-            # Untuk simple, kita cari berdasarkan nama persis (case-insensitive).
-            products = crud_product.get_products(db, search=product_name, limit=5, only_active=True)
-            if not products:
+            resolution = await resolve_product(db, product_name)
+            if resolution.status == "not_found":
                 response_message = f"Produk '{product_name}' tidak ditemukan."
-            elif len(products) == 1:
-                product = products[0]
+            elif resolution.status == "matched":
+                # Stok dibaca ulang dari DB: indeks di worker ini bisa tertinggal perubahan dari worker lain
+                product = await crud_product_async.get_product(db, resolution.product.product_id) or resolution.product
                 response_message = f"Stok {product.name}: {product.current_stock} {product.unit_of_measurement}."
                 success = True
                 data = {"product_name": product.name, "stock": product.current_stock, "unit": product.unit_of_measurement}
             else:
-                suggestions = [f"{p.name} (Stok: {p.current_stock})" for p in products]
-                response_message = f"Produk '{product_name}' ambigu. Ditemukan: {', '.join(suggestions[:3])}. Mohon lebih spesifik."
+                response_message = _ambiguous_message(product_name, resolution.candidates)
+                data = {"candidates": _candidates_data(resolution.candidates)}
 
         elif command == "sell":
             if not product_name or quantity is None or quantity <= 0:
                 raise ValueError("Nama produk dan jumlah (lebih dari 0) diperlukan untuk penjualan.")
 
-            products = crud_product.get_products(db, search=product_name, limit=1, only_active=True)
-            if not products:
+            resolution = await resolve_product(db, product_name)
+            if resolution.status == "not_found":
                 raise ValueError(f"Produk '{product_name}' tidak ditemukan untuk dijual.")
-            product_to_sell = products[0]
+            if resolution.status == "ambiguous":
+                # Jangan menebak produk saat menjual; minta bot mengirim ulang dengan nama yang dipilih
+                return {
+                    "success": False,
+                    "message": _ambiguous_message(product_name, resolution.candidates),
+                    "data": {"candidates": _candidates_data(resolution.candidates)},
+                }
+            product_to_sell = resolution.product
 
             # Buat OrderCreate schema
             order_item_in = order_schemas.OrderItemCreate(product_id=product_to_sell.product_id, quantity=quantity)
@@ -88,10 +145,11 @@ async def process_bot_command(
                 notes=f"Penjualan via Bot oleh {payload.user_identifier or 'Unknown User'}"
             )
             # User ID untuk order bisa null atau ID user bot khusus jika ada
-            created_order = crud_order.create_order(db=db, order_in=order_in, current_user_id=None) # Ganti None dengan ID user bot jika ada
-            response_message = f"Penjualan {quantity} {product_to_sell.unit_of_measurement} '{product_to_sell.name}' berhasil dicatat. Order No: {created_order.order_number}."
+            # create_order adalah fungsi sinkron; dijalankan di threadpool dengan sesi sinkron agar event loop tidak terblokir
+            created_order = await run_in_threadpool(_create_bot_order, order_in)
+            response_message = f"Penjualan {quantity} {product_to_sell.unit_of_measurement} '{product_to_sell.name}' berhasil dicatat. Order No: {created_order['order_number']}."
             success = True
-            data = {"order_number": created_order.order_number, "total_amount": created_order.total_amount}
+            data = created_order
 
     # elif command == "add_stock_manual":
     #     # Implementasi untuk bot menambah stok (PERLU OTORISASI KETAT)
@@ -1,5 +1,5 @@
 # backend/app/routers/categories.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -7,6 +7,7 @@ from app.db.database import get_db
 from app.schemas.common_schemas import PaginatedResponse
 from app.schemas import category_schemas
 from app.crud import crud_category
+from app.core.catalog_version import check_not_modified
 from app.core.security import get_current_active_user # Proteksi endpoint jika perlu
 from app.schemas.user_schemas import User # Untuk type hint current_user
 
@@ -33,13 +34,20 @@ def create_new_category(
 
 @router.get("/", response_model=PaginatedResponse[category_schemas.Category], tags=["Categories"]) # Update response_model
 def read_all_categories(
+        request: Request,
+        response: Response,
         skip: int = 0,
         limit: int = Query(default=100, ge=1, le=200),
         db: Session = Depends(get_db)
     ):
     """
     Mendapatkan daftar semua kategori dengan pagination.
+    Mendukung If-None-Match: 304 tanpa menjalankan query jika katalog belum berubah.
     """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
     categories_result = crud_category.get_categories(db, skip=skip, limit=limit)
 
     return PaginatedResponse[category_schemas.Category](
@@ -50,11 +58,17 @@ def read_all_categories(
 @router.get("/{category_id}", response_model=category_schemas.Category, tags=["Categories"])
 def read_category_by_id(
         category_id: int,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db)
     ):
     """
     Mendapatkan detail kategori berdasarkan ID.
     """
+    not_modified = check_not_modified(request, response, db)
+    if not_modified:
+        return not_modified
+
     db_category = crud_category.get_category(db, category_id=category_id)
     if db_category is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
@@ -34,10 +34,38 @@ def create_new_order(
         # Log error e
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while creating the order.")
 
+@router.post("/batch", response_model=order_schemas.OrderBatchResponse, tags=["Orders"])
+def create_orders_batch(
+        batch_in: order_schemas.OrderBatchCreate,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Menyimpan banyak pesanan sekaligus (sinkronisasi antrean terminal POS setelah offline).
+    Setiap pesanan divalidasi sendiri-sendiri; hasil dikembalikan per pesanan sesuai urutan input.
+    """
+    try:
+        results = crud_order.create_orders_batch(db=db, orders_in=batch_in.orders, current_user_id=current_user.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while creating the orders.")
+
+    succeeded = sum(1 for result in results if result["success"])
+    replayed = sum(1 for result in results if result.get("replayed"))
+    return order_schemas.OrderBatchResponse(
+        created=succeeded - replayed,
+        replayed=replayed,
+        failed=len(results) - succeeded,
+        results=[order_schemas.OrderBatchResult(**result) for result in results]
+    )
+
 @router.get("/", response_model=PaginatedResponse[order_schemas.Order], tags=["Orders"]) # Update response_model
 def read_all_orders(
         skip: int = 0,
         limit: int = Query(default=50, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor (keyset pagination; skip is ignored)"),
+        include_total: Optional[bool] = Query(None, alias="includeTotal", description="Force or skip the total count (default: only without cursor)"),
         user_id_filter: Optional[int] = Query(None, alias="userId", description="Filter by user ID (admin only)"),
         start_date_filter: Optional[date] = Query(None, alias="startDate", description="Filter by start date (YYYY-MM-DD)"),
         end_date_filter: Optional[date] = Query(None, alias="endDate", description="Filter by end date (YYYY-MM-DD)"),
@@ -57,20 +85,26 @@ def read_all_orders(
     elif user_id_filter is None and current_user.role != "admin":
         effective_user_id = current_user.user_id
 
-    orders_result = crud_order.get_orders(
-        db,
-        skip=skip,
-        limit=limit,
-        user_id=effective_user_id,
-        start_date=start_date_filter, # start_date_filter adalah nama parameter query
-        end_date=end_date_filter,     # end_date_filter adalah nama parameter query
-        status=status_filter,         # status_filter adalah nama parameter query
-        load_items=True
-    )
+    try:
+        orders_result = crud_order.get_orders(
+            db,
+            skip=skip,
+            limit=limit,
+            user_id=effective_user_id,
+            start_date=start_date_filter, # start_date_filter adalah nama parameter query
+            end_date=end_date_filter,     # end_date_filter adalah nama parameter query
+            status=status_filter,         # status_filter adalah nama parameter query
+            load_items=True,
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e: # Cursor tidak valid
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return PaginatedResponse[order_schemas.Order](
         total=orders_result["total"],
-        data=orders_result["data"]
+        data=orders_result["data"],
+        next_cursor=orders_result["next_cursor"]
     )
 
 @router.get("/{order_id}", response_model=order_schemas.Order, tags=["Orders"])
@@ -1,10 +1,12 @@
 # backend/app/routers/products.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from app.db.database import get_db
 from app.schemas.common_schemas import PaginatedResponse
+from app.core.product_index import normalize_text, product_index
+from app.core.catalog_version import check_not_modified
 from app.schemas import product_schemas # Menggunakan ProductWithCategory untuk detail
 from app.crud import crud_product, crud_category # Untuk validasi category_id
 from app.core.security import get_current_active_user
@@ -34,25 +36,40 @@ def create_new_product(
 
 @router.get("/", response_model=PaginatedResponse[product_schemas.ProductWithCategory], tags=["Products"])
 def read_all_products(
+        request: Request,
+        response: Response,
         skip: int = 0,
         limit: int = Query(default=50, ge=1, le=200), # Default limit di OpenAPI Anda 50, saya pakai 50
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor (keyset pagination; skip is ignored)"),
+        include_total: Optional[bool] = Query(None, alias="includeTotal", description="Force or skip the total count (default: only without cursor)"),
         search: Optional[str] = None,
         category_id: Optional[int] = None,
         only_active: bool = True,
         db: Session = Depends(get_db)
     ):
-    result = crud_product.get_products( # crud_product.get_products mengembalikan dict {"total": N, "data": [...]}
-        db,
-        skip=skip,
-        limit=limit,
-        search=search,
-        category_id=category_id,
-        only_active=only_active,
-        load_category=True # Penting agar sesuai dengan ProductWithCategory
-    )
+    not_modified = check_not_modified(request, response, db, include_stock=True) # 304 tanpa menjalankan query jika katalog belum berubah
+    if not_modified:
+        return not_modified
+
+    try:
+        result = crud_product.get_products( # crud_product.get_products mengembalikan dict {"total": N, "data": [...], "next_cursor": ...}
+            db,
+            skip=skip,
+            limit=limit,
+            search=search,
+            category_id=category_id,
+            only_active=only_active,
+            load_category=True, # Penting agar sesuai dengan ProductWithCategory
+            cursor=cursor,
+            include_total=include_total
+        )
+    except ValueError as e: # Cursor tidak valid
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     return PaginatedResponse[product_schemas.ProductWithCategory]( # Buat instance PaginatedResponse
         total=result["total"],
-        data=result["data"]
+        data=result["data"],
+        next_cursor=result["next_cursor"]
     )
 
 @router.get("/suggest", response_model=List[product_schemas.Product], tags=["Products"])
@@ -69,6 +86,10 @@ def suggest_products_for_bot( # Anda bisa pakai nama fungsi ini
     Endpoint untuk saran produk (digunakan oleh bot atau autocomplete frontend).
     Mengembalikan daftar produk dasar (bukan PaginatedResponse).
     """
+    # Jawab dari indeks in-process (tanpa round trip DB) jika sudah siap; query tanpa huruf/angka tetap ke DB
+    if product_index.ready and normalize_text(query):
+        return product_index.suggest(query, limit=limit, only_active=True)
+
     # Panggil fungsi CRUD yang mengembalikan list produk, yaitu get_product_suggestions
     suggested_products_db = crud_product.get_product_suggestions(
         db, 
@@ -83,14 +104,48 @@ def suggest_products_for_bot( # Anda bisa pakai nama fungsi ini
     # karena product_schemas.Product memiliki model_config = ConfigDict(from_attributes=True).
     return suggested_products_db
 
+@router.get("/by-sku/{sku}", response_model=product_schemas.Product, tags=["Products"])
+def read_product_by_sku(
+        sku: str,
+        db: Session = Depends(get_db)
+    ):
+    """
+    Mendapatkan produk berdasarkan SKU/barcode (untuk scanner di kasir), dilayani dari indeks in-process.
+    """
+    product = crud_product.lookup_product_by_sku(db, sku=sku.strip())
+    if product is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
+    return product
+
+@router.post("/by-sku:batch", response_model=product_schemas.ProductSkuBatchResponse, tags=["Products"])
+def read_products_by_skus(
+        batch_in: product_schemas.ProductSkuBatchRequest,
+        db: Session = Depends(get_db)
+    ):
+    """
+    Resolusi banyak SKU sekaligus (satu keranjang hasil scan) dalam satu request.
+    """
+    skus = [sku.strip() for sku in batch_in.skus]
+    found = crud_product.lookup_products_by_skus(db, skus=skus)
+    not_found = list(dict.fromkeys(sku for sku in skus if sku not in found))
+
+    return product_schemas.ProductSkuBatchResponse(found=found, not_found=not_found)
+
 @router.get("/{product_id}", response_model=product_schemas.ProductWithCategory, tags=["Products"])
 def read_product_by_id(
         product_id: int,
+        request: Request,
+        response: Response,
         db: Session = Depends(get_db)
     ):
     """
     Mendapatkan detail produk berdasarkan ID, termasuk detail kategori.
     """
+    not_modified = check_not_modified(request, response, db, include_stock=True)
+    if not_modified:
+        return not_modified
+
     db_product = crud_product.get_product(db, product_id=product_id, load_category=True)
     if db_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
@@ -134,6 +189,9 @@ def delete_existing_product(
     db_product = crud_product.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    crud_product.delete_product(db=db, product_id=product_id, permanent_delete=permanent_delete)
+    try:
+        crud_product.delete_product(db=db, product_id=product_id, permanent_delete=permanent_delete)
+    except ValueError as e: # Produk sudah dipakai di transaksi
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     return None
\ No newline at end of file
@@ -1,7 +1,8 @@
 # backend/app/routers/reports.py
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Response, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 from datetime import date, datetime, timedelta
 
 from app.db.database import get_db
@@ -10,55 +11,11 @@ from app.schemas.user_schemas import User
 
 from app.schemas import report_schemas
 from app.crud import crud_report # atau app.services import report_service
+from app.crud import crud_export
+from app.crud import crud_report_jobs
 
 router = APIRouter()
 
-# Placeholder untuk fungsi yang mengambil data laporan dari DB
-# Ini harus diimplementasikan di folder crud atau service layer.
-def get_sales_report_data(db: Session, start_date: date, end_date: date, group_by: str) -> List[Dict[str, Any]]:
-# Contoh implementasi SANGAT SEDERHANA (PERLU DISESUAIKAN & DIOPTIMALKAN)
-    from app.db.models_db import Order, OrderItem, Product
-    from sqlalchemy import func, case
-
-    # Pastikan end_date mencakup seluruh hari
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-
-    query = (
-        db.query(
-            Order.created_at, # atau func.date(Order.created_at) jika group_by 'day'
-            func.sum(OrderItem.subtotal).label("total_sales"),
-            func.sum(OrderItem.quantity).label("total_items_sold"),
-            func.sum(
-                OrderItem.quantity * (OrderItem.price_at_transaction - Product.purchase_price)
-                ).label("estimated_profit") # Perlu join dengan Product untuk harga beli
-            )
-        .join(OrderItem, Order.order_id == OrderItem.order_id)
-        .join(Product, OrderItem.product_id == Product.product_id)
-        .filter(Order.created_at >= start_date)
-        .filter(Order.created_at <= end_datetime)
-        .filter(Order.order_status == "completed") # Hanya penjualan yang selesai
-    )
-
-    if group_by == "day":
-        query = query.group_by(func.date(Order.created_at)).order_by(func.date(Order.created_at))
-        results = query.all()
-
-        return [
-            {"date": r[0].strftime("%Y-%m-%d"), "total_sales": float(r.total_sales or 0), "total_items": int(r.total_items_sold or 0), "estimated_profit": float(r.estimated_profit or 0)}
-            for r in results
-        ]
-    elif group_by == "month":
-        # Implementasi pengelompokan per bulan
-        query = query.group_by(func.strftime('%Y-%m', Order.created_at)).order_by(func.strftime('%Y-%m', Order.created_at)) # SQLite syntax, beda untuk PG
-        # Untuk PostgreSQL: query = query.group_by(func.to_char(Order.created_at, 'YYYY-MM')).order_by(func.to_char(Order.created_at, 'YYYY-MM'))
-        results = query.all()
-
-        # Sesuaikan format output untuk bulan
-        return [{"month": r[0], "total_sales": float(r.total_sales or 0), "total_items": int(r.total_items_sold or 0), "estimated_profit": float(r.estimated_profit or 0)} for r in results]
-
-    # Tambahkan pengelompokan lain jika perlu (week, year)
-    raise NotImplementedError(f"Grouping by '{group_by}' not implemented yet.")
-
 def get_low_stock_products_data(db: Session, threshold_multiplier: float = 1.0) -> List[Dict[str, Any]]:
     from app.db.models_db import Product, Category
     # Produk dimana current_stock <= low_stock_threshold
@@ -84,29 +41,58 @@ def get_low_stock_products_data(db: Session, threshold_multiplier: float = 1.0)
         for p in low_stock_products
     ]
 
-@router.get("/sales", response_model=List[Dict[str, Any]], tags=["Reports"])
+@router.get("/sales", response_model=Union[report_schemas.SalesComparisonReport, List[Dict[str, Any]]], tags=["Reports"])
 def get_sales_report(
         start_date: date = Query(..., description="Tanggal mulai (YYYY-MM-DD)"),
         end_date: date = Query(..., description="Tanggal selesai (YYYY-MM-DD)"),
-        group_by: str = Query("day", enum=["day", "month", "week"], description="Kelompokkan berdasarkan (day, month, week)"),
+        group_by: str = Query("day", enum=["hour", "day", "week", "month"], description="Kelompokkan berdasarkan (hour, day, week, month)"),
+        timezone_name: str = Query("UTC", alias="timezone", description="Zona waktu IANA untuk batas bucket (misal Asia/Jakarta)"),
+        compare: Optional[str] = Query(None, enum=list(crud_report.SALES_COMPARISON_MODES), description="Bandingkan dengan periode sebelumnya / tahun lalu (hanya day, week, month dalam UTC)"),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user)
     ):
     """
     Laporan penjualan berdasarkan rentang tanggal dan pengelompokan.
+    Dengan `compare`, mengembalikan periode berjalan dan pembanding berdampingan (selisih & persen perubahan)
+    per bucket dan per kategori.
     """
     if start_date > end_date:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
     
     try:
-        report_data = get_sales_report_data(db, start_date, end_date, group_by)
+        if compare:
+            if timezone_name != "UTC":
+                raise ValueError("Mode perbandingan hanya mendukung zona waktu UTC.")
+            return crud_report.get_sales_comparison_report(db, start_date, end_date, group_by, compare)
+        report_data = crud_report.get_sales_report_data(db, start_date, end_date, group_by, timezone_name=timezone_name)
         return report_data
+    except ValueError as e: # Bucket / zona waktu tidak valid
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except NotImplementedError as e:
         raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
     except Exception as e:
         # Log error
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to generate sales report: {e}")
 
+@router.get("/sales-heatmap", response_model=report_schemas.SalesHeatmap, tags=["Reports"])
+def get_sales_heatmap_report(
+        start_date: date = Query(..., description="Tanggal mulai (YYYY-MM-DD)"),
+        end_date: date = Query(..., description="Tanggal selesai (YYYY-MM-DD)"),
+        timezone_name: str = Query("UTC", alias="timezone", description="Zona waktu IANA (misal Asia/Jakarta)"),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Heatmap penjualan hari x jam (7x24): pendapatan dan jumlah transaksi untuk penjadwalan staf.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+
+    try:
+        return crud_report.get_sales_heatmap(db, start_date, end_date, timezone_name=timezone_name)
+    except ValueError as e: # Zona waktu tidak valid
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.get("/stock-summary/low-stock", response_model=List[Dict[str, Any]], tags=["Reports"])
 def get_low_stock_report(
         db: Session = Depends(get_db),
@@ -122,17 +108,116 @@ def get_low_stock_report(
         # Log error
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to generate low stock report: {e}")
 
+_EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _export_response(request: Request, stmt, export_format: str, filename_prefix: str, start_date: date, end_date: date) -> StreamingResponse:
+    """Membungkus generator ekspor menjadi StreamingResponse; gzip dipakai jika client mengirim Accept-Encoding: gzip."""
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename_prefix}_{start_date.isoformat()}_{end_date.isoformat()}.{export_format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        crud_export.stream_export(stmt, export_format=export_format, gzip=use_gzip),
+        media_type=_EXPORT_MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+@router.get("/export/orders", tags=["Reports"])
+def export_orders(
+        request: Request,
+        start_date: date = Query(..., description="Tanggal mulai (YYYY-MM-DD)"),
+        end_date: date = Query(..., description="Tanggal selesai (YYYY-MM-DD)"),
+        export_format: str = Query("csv", alias="format", enum=list(crud_export.EXPORT_FORMATS), description="Format file (csv, ndjson)"),
+        status_filter: Optional[str] = Query(None, alias="status", description="Filter by order status"),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Ekspor order (satu baris per order) secara streaming untuk rentang tanggal.
+    Memori server tetap datar berapapun rentangnya; gunakan Accept-Encoding: gzip untuk output terkompresi.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+
+    stmt = crud_export.build_orders_export_query(start_date, end_date, status=status_filter)
+    return _export_response(request, stmt, export_format, "orders", start_date, end_date)
+
+@router.get("/export/order-items", tags=["Reports"])
+def export_order_items(
+        request: Request,
+        start_date: date = Query(..., description="Tanggal mulai (YYYY-MM-DD)"),
+        end_date: date = Query(..., description="Tanggal selesai (YYYY-MM-DD)"),
+        export_format: str = Query("csv", alias="format", enum=list(crud_export.EXPORT_FORMATS), description="Format file (csv, ndjson)"),
+        status_filter: Optional[str] = Query(None, alias="status", description="Filter by order status"),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Ekspor item order (satu baris per item, dengan nomor order dan nama/SKU produk) secara streaming.
+    """
+    if start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Start date cannot be after end date.")
+
+    stmt = crud_export.build_order_items_export_query(start_date, end_date, status=status_filter)
+    return _export_response(request, stmt, export_format, "order_items", start_date, end_date)
+
+@router.post("/jobs", response_model=report_schemas.ReportJob, status_code=status.HTTP_202_ACCEPTED, tags=["Reports"])
+def submit_report_job(
+        job_in: report_schemas.ReportJobCreate,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Menjadwalkan laporan untuk dihitung di background dan mengembalikan job_id untuk di-poll.
+    Parameter yang sama memakai ulang job/hasil yang ada; hasil periode yang sudah tutup dipakai ulang sampai
+    ada order yang berubah di periode tersebut.
+    """
+    params = {
+        "start_date": job_in.start_date.isoformat(),
+        "end_date": job_in.end_date.isoformat(),
+        "group_by": job_in.group_by,
+        "timezone": job_in.timezone,
+    }
+    try:
+        return crud_report_jobs.submit_report_job(
+            db, report_type=job_in.report_type, params=params, end_date=job_in.end_date, user_id=current_user.user_id,
+            start_date=job_in.start_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/jobs/{job_id}", response_model=report_schemas.ReportJob, tags=["Reports"])
+def read_report_job(
+        job_id: str,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Status job laporan; `result` terisi setelah status menjadi completed.
+    """
+    db_job = crud_report_jobs.get_report_job(db, job_id=job_id)
+    if not db_job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Report job {job_id} not found")
+    return db_job
+
 @router.get("/dashboard-summary", response_model=report_schemas.DashboardSummary, tags=["Reports"])
 def get_main_dashboard_summary(
+        response: Response,
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user) # Pastikan user terautentikasi
     ):
     """
     Mengambil data ringkasan untuk dashboard utama.
+    Disajikan dari cache per worker (stale-while-revalidate); header Age berisi umur data dalam detik
+    dan X-Cache berisi HIT, STALE, atau MISS.
     """
     try:
-        summary = crud_report.get_dashboard_summary(db) # Panggil fungsi CRUD yang baru dibuat
-        return summary
+        cached = crud_report.get_dashboard_summary_cached(db)
+        response.headers["Age"] = str(int(cached.age_seconds))
+        response.headers["X-Cache"] = cached.status
+        return cached.value
     except Exception as e:
         # logger.error(f"Error getting dashboard summary: {e}", exc_info=True)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve dashboard summary")
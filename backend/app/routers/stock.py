@@ -31,6 +31,23 @@ def add_new_stock(
         # Log error e di sini jika perlu
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while adding stock.")
 
+@router.post("/in/batch", response_model=List[stock_schemas.InventoryLog], status_code=status.HTTP_201_CREATED, tags=["Stock Management"])
+def add_new_stock_batch(
+        stock_in_batch: stock_schemas.StockInBatch,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_active_user)
+    ):
+    """
+    Menambah stok masuk untuk banyak produk sekaligus (penerimaan barang / impor stok).
+    Semua baris diproses dalam satu transaksi.
+    """
+    try:
+        return crud_stock.add_stock_batch(db=db, stock_in_items=stock_in_batch.items, user_id=current_user.user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="An unexpected error occurred while adding stock.")
+
 @router.post("/adjustment", response_model=stock_schemas.InventoryLog, status_code=status.HTTP_201_CREATED, tags=["Stock Management"])
 def adjust_product_stock(
         adjustment_data: stock_schemas.StockAdjustment,
@@ -53,6 +70,8 @@ def read_inventory_logs_for_product(
         product_id: int,
         skip: int = 0,
         limit: int = Query(default=100, ge=1, le=200),
+        cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's next_cursor (keyset pagination; skip is ignored)"),
+        include_total: Optional[bool] = Query(None, alias="includeTotal", description="Force or skip the total count (default: only without cursor)"),
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_active_user)
     ):
@@ -63,11 +82,15 @@ def read_inventory_logs_for_product(
     if not db_product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {product_id} not found")
 
-    logs_result = crud_stock.get_inventory_logs_by_product_id(
-        db, product_id=product_id, skip=skip, limit=limit
-    )
+    try:
+        logs_result = crud_stock.get_inventory_logs_by_product_id(
+            db, product_id=product_id, skip=skip, limit=limit, cursor=cursor, include_total=include_total
+        )
+    except ValueError as e: # Cursor tidak valid
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     return PaginatedResponse[stock_schemas.InventoryLog](
         total=logs_result["total"],
-        data=logs_result["data"]
+        data=logs_result["data"],
+        next_cursor=logs_result["next_cursor"]
     )
\ No newline at end of file
@@ -5,8 +5,9 @@ from typing import List, Generic, TypeVar, Optional
 DataT = TypeVar('DataT')
 
 class PaginatedResponse(BaseModel, Generic[DataT]):
-    total: int = Field(..., description="Total number of items available.")
+    total: Optional[int] = Field(None, description="Total number of items available (omitted in cursor mode unless include_total=true).")
     data: List[DataT] = Field(..., description="List of items for the current page.")
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page; null on the last page.")
     # Opsional: Anda bisa menambahkan info halaman saat ini dan ukuran halaman jika diperlukan
     page: Optional[int] = None
     size: Optional[int] = None
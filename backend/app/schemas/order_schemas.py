@@ -39,6 +39,30 @@ class OrderCreate(OrderBase):
     # user_id bisa diambil dari token JWT di backend, jadi tidak perlu di-pass dari client
     # total_amount akan dihitung di backend
 
+class OrderBatchEntry(OrderCreate): # Satu order yang diantrekan terminal POS saat offline
+    client_reference: Optional[str] = Field(None, max_length=100, description="ID order di terminal (unik per pengguna); batch yang dikirim ulang tidak membuat order kedua")
+    client_created_at: Optional[datetime] = Field(None, description="Waktu transaksi di terminal (dipakai sebagai created_at)")
+
+class OrderBatchCreate(BaseModel):
+    orders: List[OrderBatchEntry] = Field(..., min_length=1, max_length=1000, description="Daftar order yang disinkronkan")
+
+class OrderBatchResult(BaseModel):
+    index: int = Field(..., description="Posisi order di array input")
+    client_reference: Optional[str] = None
+    success: bool
+    order_id: Optional[int] = None
+    order_number: Optional[str] = None
+    total_amount: Optional[float] = None
+    order_status: Optional[str] = None
+    replayed: bool = Field(False, description="True jika client_reference sudah pernah disimpan; hasil berisi order yang sudah ada")
+    error: Optional[str] = Field(None, description="Alasan order ditolak (jika success=False)")
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    replayed: int = Field(0, description="Order yang sudah tersimpan dari kiriman sebelumnya (tidak dibuat ulang)")
+    failed: int
+    results: List[OrderBatchResult]
+
 class OrderUpdate(BaseModel): # Skema untuk memperbarui order (misal status)
     payment_method: Optional[str] = Field(None, max_length=50)
     order_status: Optional[str] = Field(None, max_length=20, description="Status pesanan (completed, pending, cancelled)")
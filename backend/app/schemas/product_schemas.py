@@ -1,6 +1,6 @@
 # backend/app/schemas/product_schemas.py
 from pydantic import BaseModel, Field, ConfigDict # Pastikan ConfigDict diimpor
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from .category_schemas import Category # Impor Category schema
 
@@ -41,6 +41,13 @@ class Product(ProductBase): # Skema dasar produk untuk respons
 
     model_config = ConfigDict(from_attributes=True) # <--- PENTING
 
+class ProductSkuBatchRequest(BaseModel):
+    skus: List[str] = Field(..., min_length=1, max_length=500, description="Daftar SKU hasil scan (boleh berulang)")
+
+class ProductSkuBatchResponse(BaseModel):
+    found: Dict[str, Product] = Field(..., description="SKU -> produk untuk SKU yang ditemukan")
+    not_found: List[str] = Field(..., description="SKU yang tidak ditemukan, sesuai urutan request")
+
 class ProductWithCategory(Product): # Mewarisi Product, jadi juga mewarisi model_config
     category: Optional[Category] = None
 
@@ -1,6 +1,7 @@
 # backend/app/schemas/report_schemas.py
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from typing import List, Dict, Any, Optional, Literal
+from datetime import date, datetime
 
 class SalesChartDataPoint(BaseModel):
     name: str # e.g., "Sen", "Sel", "Rab" or date string
@@ -27,4 +28,76 @@ class DashboardSummary(BaseModel):
 
     model_config = { # Jika Anda menggunakan Pydantic v2 dan ingin membuat instance dari objek
         "from_attributes": True 
-    }
\ No newline at end of file
+    }
+
+class SalesComparisonMetrics(BaseModel):
+    current_sales: float
+    previous_sales: float
+    sales_delta: float
+    sales_change_pct: Optional[float] = Field(None, description="Persen perubahan; null jika periode pembanding 0")
+    current_items: int
+    previous_items: int
+    items_delta: int
+    items_change_pct: Optional[float] = None
+
+class SalesComparisonPeriod(BaseModel):
+    start_date: date
+    end_date: date
+
+class SalesComparisonBucket(SalesComparisonMetrics):
+    label: str = Field(..., description="Label bucket periode berjalan")
+
+class SalesComparisonCategory(SalesComparisonMetrics):
+    category_id: Optional[int] = None
+    name: Optional[str] = Field(None, description="Nama kategori; null untuk produk tanpa kategori")
+
+class SalesComparisonBreakdown(SalesComparisonCategory):
+    label: str
+
+class SalesComparisonReport(BaseModel):
+    group_by: str
+    compare: str
+    current_period: SalesComparisonPeriod
+    previous_period: SalesComparisonPeriod
+    totals: SalesComparisonMetrics
+    buckets: List[SalesComparisonBucket]
+    categories: List[SalesComparisonCategory]
+    breakdown: List[SalesComparisonBreakdown] = Field(..., description="Per (bucket, kategori)")
+
+class SalesHeatmap(BaseModel):
+    start_date: date
+    end_date: date
+    timezone: str
+    source: str = Field(..., description="Sumber data: 'rollup' (hourly_sales) atau 'orders'")
+    weekdays: List[str] = Field(..., description="Label baris: Senin..Minggu")
+    hours: List[int] = Field(..., description="Label kolom: jam 0..23 (waktu lokal)")
+    revenue: List[List[float]] = Field(..., description="Matriks 7x24 pendapatan")
+    transactions: List[List[int]] = Field(..., description="Matriks 7x24 jumlah transaksi")
+
+# --- Report Job Schemas ---
+class ReportJobCreate(BaseModel):
+    report_type: Literal["sales"] = Field("sales", description="Jenis laporan")
+    start_date: date = Field(..., description="Tanggal mulai (YYYY-MM-DD)")
+    end_date: date = Field(..., description="Tanggal selesai (YYYY-MM-DD)")
+    group_by: Literal["hour", "day", "week", "month"] = Field("day", description="Kelompokkan berdasarkan (hour, day, week, month)")
+    timezone: str = Field("UTC", description="Zona waktu IANA untuk batas bucket (misal Asia/Jakarta)")
+
+    @model_validator(mode="after")
+    def check_date_range(self):
+        if self.start_date > self.end_date:
+            raise ValueError("Start date cannot be after end date.")
+        return self
+
+class ReportJob(BaseModel):
+    job_id: str
+    report_type: str
+    params: Dict[str, Any]
+    status: str = Field(..., description="queued, running, completed, failed, expired (order di periode ini berubah; kirim ulang job)")
+    is_closed_period: bool = Field(..., description="Periode sudah tutup; hasil dipakai ulang sampai ada order yang berubah di periode ini")
+    result: Optional[Any] = Field(None, description="Hasil laporan jika status completed")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,6 +1,6 @@
 # backend/app/schemas/stock_schemas.py
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 # Skema untuk input penambahan stok (Stock In)
@@ -12,6 +12,10 @@ class StockIn(BaseModel):
     # atau bisa wajib jika ingin mencatat perubahan harga beli.
     purchase_price: Optional[float] = Field(None, ge=0, description="Harga beli baru (jika ada perubahan)")
 
+# Skema untuk input penerimaan barang / impor stok banyak produk sekaligus
+class StockInBatch(BaseModel):
+    items: List[StockIn] = Field(..., min_length=1, max_length=1000, description="Daftar produk yang stoknya ditambah")
+
 # Skema untuk input penyesuaian stok (Stock Adjustment)
 class StockAdjustment(BaseModel):
     product_id: int = Field(..., description="ID Produk yang stoknya disesuaikan")
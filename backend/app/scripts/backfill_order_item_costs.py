@@ -0,0 +1,84 @@
+# backend/app/scripts/backfill_order_item_costs.py
+# Mengisi snapshot order_items.cost_at_transaction dan category_id_at_transaction untuk item lama (sebelum kolom ini ada).
+# Contoh:
+#   python -m app.scripts.backfill_order_item_costs --batch-size 5000 --rebuild-rollup
+import argparse
+import logging
+
+from sqlalchemy import select, update, func, or_
+
+from app.db import models_db
+from app.db.database import SessionLocal
+from app.crud.crud_sales_rollup import rebuild_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill_costs(db, batch_size: int) -> int:
+    """
+    Mengisi cost_at_transaction / category_id_at_transaction yang masih NULL dengan harga beli dan
+    kategori produk saat ini, per batch order_item_id agar tiap transaksi singkat. inventory_log tidak
+    menyimpan harga beli historis, sehingga nilai ini adalah pendekatan terbaik untuk data lama.
+    Jalankan dengan --rebuild-rollup agar rollup memakai snapshot yang sama dengan pembalikan status order.
+    Return: jumlah item yang diisi.
+    """
+    items = models_db.OrderItem.__table__
+    products = models_db.Product.__table__
+
+    total_updated = 0
+    last_id = 0
+    while True:
+        batch_ids = db.execute(
+            select(items.c.order_item_id)
+            .where(items.c.order_item_id > last_id)
+            .where(or_(items.c.cost_at_transaction.is_(None), items.c.category_id_at_transaction.is_(None)))
+            .order_by(items.c.order_item_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not batch_ids:
+            break
+
+        purchase_price = (
+            select(products.c.purchase_price)
+            .where(products.c.product_id == items.c.product_id)
+            .scalar_subquery()
+        )
+        category_id = (
+            select(func.coalesce(products.c.category_id, 0))
+            .where(products.c.product_id == items.c.product_id)
+            .scalar_subquery()
+        )
+        result = db.execute(
+            update(items)
+            .where(items.c.order_item_id.in_(batch_ids))
+            .values(
+                cost_at_transaction=func.coalesce(items.c.cost_at_transaction, purchase_price, 0),
+                category_id_at_transaction=func.coalesce(items.c.category_id_at_transaction, category_id, 0),
+            )
+        )
+        db.commit()
+
+        total_updated += result.rowcount
+        last_id = batch_ids[-1]
+        logger.info(f"Backfill snapshot item order: {total_updated} item diisi (sampai order_item_id {last_id}).")
+
+    return total_updated
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill snapshot harga beli & kategori order_items untuk item lama.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Jumlah item per transaksi")
+    parser.add_argument("--rebuild-rollup", action="store_true", help="Bangun ulang rollup daily_product_sales setelah backfill")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        updated = backfill_costs(db, batch_size=args.batch_size)
+        logger.info(f"Backfill selesai: {updated} item diisi.")
+        if args.rebuild_rollup:
+            written = rebuild_rollup(db)
+            logger.info(f"Rollup daily_product_sales dibangun ulang: {written} baris ditulis.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
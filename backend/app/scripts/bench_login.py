@@ -0,0 +1,110 @@
+# backend/app/scripts/bench_login.py
+# Benchmark throughput login saat banyak kasir login bersamaan (pergantian shift):
+# - hash: verifikasi bcrypt langsung di event loop (perilaku lama handler async) vs pool thread hashing;
+# - http: POST /api/v1/auth/login end-to-end lewat ASGI (tanpa server) terhadap database benchmark.
+# Selama pengukuran, sebuah task "heartbeat" mengukur keterlambatan event loop, yaitu berapa lama
+# request lain di worker yang sama harus menunggu.
+# Contoh:
+#   python -m app.scripts.bench_login --logins 40 --rounds 12
+#   PASSWORD_HASH_WORKERS=8 python -m app.scripts.bench_login --mode hash
+import argparse
+import asyncio
+import os
+import time
+
+from app.scripts.bench_utils import add_database_argument, print_table, use_bench_database
+
+HEARTBEAT_INTERVAL = 0.005
+
+async def _heartbeat(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        expected = time.perf_counter() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+async def _run_with_heartbeat(name: str, make_tasks, logins: int) -> dict:
+    stop, lags = asyncio.Event(), []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    await asyncio.sleep(0) # Pastikan heartbeat sudah berjalan
+    started = time.perf_counter()
+    await asyncio.gather(*make_tasks())
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await heartbeat
+
+    return {
+        "method": name,
+        "logins": logins,
+        "logins_per_s": round(logins / elapsed, 1),
+        "wall_s": round(elapsed, 2),
+        "max_loop_lag_ms": round(max(lags, default=0) * 1000, 1),
+    }
+
+async def bench_hash(logins: int) -> list:
+    from app.core import security
+
+    password = "rahasia-kasir"
+    hashed = security.get_password_hash(password)
+
+    async def inline_login():
+        security.verify_password(password, hashed) # Perilaku lama: bcrypt di thread event loop
+
+    async def pooled_login():
+        await security.verify_and_update_password_async(password, hashed)
+
+    return [
+        await _run_with_heartbeat("inline_bcrypt", lambda: [inline_login() for _ in range(logins)], logins),
+        await _run_with_heartbeat("hash_pool", lambda: [pooled_login() for _ in range(logins)], logins),
+    ]
+
+async def bench_http(logins: int) -> list:
+    import httpx
+    from app.scripts.bench_utils import reset_schema
+    from app.db.database import SessionLocal
+    from app.crud import crud_user
+    from app.schemas import user_schemas
+    from app.main import app
+
+    reset_schema()
+    db = SessionLocal()
+    try:
+        for i in range(logins):
+            crud_user.create_user(db, user_schemas.UserCreate(username=f"kasir{i}", password="rahasia-kasir", full_name=f"Kasir {i}"))
+    finally:
+        db.close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login(i: int):
+            response = await client.post("/api/v1/auth/login", data={"username": f"kasir{i}", "password": "rahasia-kasir"})
+            response.raise_for_status()
+
+        return [await _run_with_heartbeat("http_login", lambda: [login(i) for i in range(logins)], logins)]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark throughput login (bcrypt di event loop vs pool hashing).")
+    add_database_argument(parser)
+    parser.add_argument("--mode", choices=("hash", "http", "all"), default="all")
+    parser.add_argument("--logins", type=int, default=40, help="Jumlah login bersamaan")
+    parser.add_argument("--rounds", type=int, default=None, help="Cost bcrypt (default: BCRYPT_ROUNDS dari konfigurasi)")
+    args = parser.parse_args()
+
+    use_bench_database(args.database_url)
+    if args.rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from app.core.config import settings
+
+    async def run():
+        results = []
+        if args.mode in ("hash", "all"):
+            results += await bench_hash(args.logins)
+        if args.mode in ("http", "all"):
+            results += await bench_http(args.logins)
+        return results
+
+    results = asyncio.run(run())
+    print(f"bcrypt rounds={settings.BCRYPT_ROUNDS}, PASSWORD_HASH_WORKERS={settings.PASSWORD_HASH_WORKERS}")
+    print_table(results)
+
+if __name__ == "__main__":
+    main()
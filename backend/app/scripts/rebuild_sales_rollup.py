@@ -0,0 +1,33 @@
+# backend/app/scripts/rebuild_sales_rollup.py
+# Backfill / rebuild rollup daily_product_sales dan hourly_sales dari orders & order_items.
+# Contoh:
+#   python -m app.scripts.rebuild_sales_rollup                      # seluruh histori
+#   python -m app.scripts.rebuild_sales_rollup --start 2024-01-01 --end 2024-12-31
+import argparse
+import logging
+from datetime import date
+
+from app.db.database import SessionLocal
+from app.crud.crud_sales_rollup import rebuild_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bangun ulang rollup penjualan (daily_product_sales & hourly_sales).")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="Tanggal mulai (YYYY-MM-DD), inklusif")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Tanggal selesai (YYYY-MM-DD), inklusif")
+    args = parser.parse_args()
+
+    if args.start and args.end and args.start > args.end:
+        parser.error("--start tidak boleh setelah --end")
+
+    db = SessionLocal()
+    try:
+        written = rebuild_rollup(db, start_date=args.start, end_date=args.end)
+        logger.info(f"Rollup daily_product_sales dibangun ulang: {written} baris ditulis.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# backend/app/utils/pagination.py
+# Helper untuk keyset (cursor) pagination: cursor opaque berisi nilai kolom urutan dari baris terakhir.
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import DateTime, and_, func, literal, or_
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Mengubah nilai kunci urutan baris terakhir menjadi cursor opaque (base64 URL-safe)."""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, expected_length: int) -> List[Any]:
+    """Kebalikan encode_cursor. Melempar ValueError jika cursor tidak valid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor tidak valid.")
+    if not isinstance(payload, list) or len(payload) != expected_length:
+        raise ValueError("Cursor tidak valid.")
+
+    try:
+        return [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Cursor tidak valid.")
+
+# SQLite menyimpan DATETIME sebagai teks dengan format campuran: server_default CURRENT_TIMESTAMP menulis
+# 'YYYY-MM-DD HH:MM:SS', nilai dari aplikasi ditulis dengan mikrodetik ('...:SS.ffffff'). Perbandingan teks
+# mentah membuat baris batas cursor lolos lagi (loop tanpa akhir), jadi di SQLite kolom waktu diurutkan
+# dan dibandingkan dalam satu format kanonik (presisi milidetik; indeks tidak terpakai, SQLite hanya untuk dev).
+_SQLITE_CANONICAL_DATETIME = "%Y-%m-%d %H:%M:%f"
+
+def _is_datetime_column(column) -> bool:
+    return isinstance(getattr(column, "type", None), DateTime)
+
+def _sort_key(column, dialect_name: str):
+    """Ekspresi yang dipakai untuk ORDER BY dan kondisi keyset (sama persis agar konsisten)."""
+    if dialect_name == "sqlite" and _is_datetime_column(column):
+        return func.strftime(_SQLITE_CANONICAL_DATETIME, column)
+    return column
+
+def _sort_value(column, value: Any, dialect_name: str) -> Any:
+    """Nilai cursor dalam bentuk yang sebanding dengan _sort_key (dinormalkan oleh strftime yang sama di SQLite)."""
+    if dialect_name == "sqlite" and _is_datetime_column(column) and isinstance(value, datetime):
+        return func.strftime(_SQLITE_CANONICAL_DATETIME, literal(value, column.type))
+    return value
+
+def keyset_condition(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """
+    Kondisi WHERE untuk baris setelah `values` pada urutan (col1, col2, ...):
+    col1 > v1 OR (col1 = v1 AND col2 > v2) ... (atau '<' jika descending).
+    Ditulis sebagai OR/AND agar portabel dan tetap bisa memakai indeks komposit.
+    """
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        comparison = column < value if descending else column > value
+        equal_prefix = [prev_column == prev_value for prev_column, prev_value in zip(columns[:i], values[:i])]
+        conditions.append(and_(*equal_prefix, comparison) if equal_prefix else comparison)
+
+    return or_(*conditions)
+
+def paginate_query(
+        query,
+        order_columns: Sequence[Any],
+        descending: bool = False,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_total: Optional[bool] = None
+    ) -> Dict[str, Any]:
+    """
+    Menjalankan query ORM dengan paginasi offset (tanpa cursor) atau keyset (dengan cursor).
+    order_columns harus unik bersama-sama (misal (created_at, id)) agar urutan stabil.
+    include_total=None berarti total hanya dihitung di mode offset; di mode cursor count() dilewati
+    kecuali diminta eksplisit, sehingga biaya per halaman tetap konstan.
+    Return: {"total": int | None, "data": [...], "next_cursor": str | None}.
+    """
+    if include_total is None:
+        include_total = cursor is None
+    total = query.count() if include_total else None
+
+    dialect_name = query.session.get_bind().dialect.name
+    sort_keys = [_sort_key(column, dialect_name) for column in order_columns]
+    if cursor:
+        values = [
+            _sort_value(column, value, dialect_name)
+            for column, value in zip(order_columns, decode_cursor(cursor, len(order_columns)))
+        ]
+        query = query.filter(keyset_condition(sort_keys, values, descending))
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in sort_keys])
+    if not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all() # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in order_columns])
+
+    return {"total": total, "data": rows, "next_cursor": next_cursor}
@@ -0,0 +1,26 @@
+# backend/tests/conftest.py
+# Test memakai database SQLite sementara; DATABASE_URL harus diset sebelum modul app.* diimpor.
+import os
+import tempfile
+
+_test_db_dir = tempfile.mkdtemp(prefix="pos_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_db_dir, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("PRODUCT_INDEX_SYNC_SECONDS", "0")
+
+import pytest
+
+from app.db.database import SessionLocal, engine
+from app.db.models_db import Base
+
+@pytest.fixture
+def db():
+    """Sesi database dengan skema baru untuk setiap test."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
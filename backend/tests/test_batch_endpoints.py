@@ -0,0 +1,54 @@
+# backend/tests/test_batch_endpoints.py
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.product_index import product_index
+from app.core.security import get_current_active_user
+from app.db import models_db
+from app.main import app
+from app.schemas import user_schemas
+
+@pytest.fixture
+def client(db):
+    db.add(models_db.User(user_id=1, username="kasir1", hashed_password="x", full_name="Kasir 1"))
+    db.add_all([
+        models_db.Product(product_id=1, name="Kopi Hitam", sku="KH-01", purchase_price=Decimal("3000"),
+                          selling_price=Decimal("5000"), current_stock=10),
+        models_db.Product(product_id=2, name="Teh Tarik", sku="TT-01", purchase_price=Decimal("4000"),
+                          selling_price=Decimal("7000"), current_stock=1),
+    ])
+    db.commit()
+    product_index.build(db)
+    app.dependency_overrides[get_current_active_user] = lambda: user_schemas.User(
+        user_id=1, username="kasir1", full_name="Kasir 1", role="staff", is_active=True
+    )
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+def test_orders_batch_reports_per_order_results_and_replays(client, db):
+    payload = {"orders": [
+        {"client_reference": "T1-1", "payment_method": "Cash", "items": [{"product_id": 1, "quantity": 2}]},
+        {"client_reference": "T1-2", "payment_method": "Cash", "items": [{"product_id": 2, "quantity": 5}]},
+    ]}
+
+    first = client.post("/api/v1/orders/batch", json=payload).json()
+    replay = client.post("/api/v1/orders/batch", json=payload).json()
+
+    assert (first["created"], first["replayed"], first["failed"]) == (1, 0, 1)
+    assert "tidak mencukupi" in first["results"][1]["error"]
+    assert (replay["created"], replay["replayed"], replay["failed"]) == (0, 1, 1)
+    assert replay["results"][0]["order_id"] == first["results"][0]["order_id"]
+    db.expire_all()
+    assert db.get(models_db.Product, 1).current_stock == 8
+
+def test_sku_batch_lookup(client):
+    response = client.post("/api/v1/products/by-sku:batch", json={"skus": ["KH-01", " TT-01 ", "XX-99", "KH-01"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert sorted(body["found"]) == ["KH-01", "TT-01"]
+    assert body["not_found"] == ["XX-99"]
@@ -0,0 +1,72 @@
+# backend/tests/test_cache.py
+import time
+
+from app.core.cache import SWRCache
+from app.core.security import PrincipalCache
+from app.schemas import user_schemas
+
+def test_swr_cache_hit_then_stale_after_invalidate():
+    cache = SWRCache(ttl_seconds=60, max_stale_seconds=60)
+    assert cache.get_or_compute("k", lambda: 1).status == "MISS"
+    hit = cache.get_or_compute("k", lambda: 2)
+    assert (hit.value, hit.status) == (1, "HIT")
+
+    cache.invalidate("k")
+    recomputed = cache.get_or_compute("k", lambda: 3)
+    assert (recomputed.value, recomputed.status) == (3, "MISS")
+    assert cache.get_or_compute("k", lambda: 4).status == "HIT"
+
+def test_swr_cache_invalidate_during_compute_is_not_lost():
+    cache = SWRCache(ttl_seconds=60, max_stale_seconds=60)
+
+    def compute_then_write_happens():
+        cache.invalidate("k") # Penulisan yang terjadi saat ringkasan sedang dihitung
+        return "sebelum-penulisan"
+
+    cache.get_or_compute("k", compute_then_write_happens)
+    result = cache.get_or_compute("k", lambda: "sesudah-penulisan")
+
+    assert result.status != "HIT"
+    assert result.value == "sesudah-penulisan"
+
+def test_swr_cache_invalidate_all_during_compute_is_not_lost():
+    cache = SWRCache(ttl_seconds=60, max_stale_seconds=60)
+
+    def compute():
+        cache.invalidate()
+        return "lama"
+
+    cache.get_or_compute("k", compute)
+    assert cache.get_or_compute("k", lambda: "baru").status != "HIT"
+
+def test_swr_cache_serves_stale_while_another_thread_recomputes():
+    cache = SWRCache(ttl_seconds=0, max_stale_seconds=60)
+    cache.get_or_compute("k", lambda: "lama")
+    seen = []
+
+    def compute():
+        seen.append(cache.get_or_compute("k", lambda: "tidak dipakai")) # Thread lain selama perhitungan ulang
+        return "baru"
+
+    assert cache.get_or_compute("k", compute).value == "baru"
+    assert (seen[0].value, seen[0].status) == ("lama", "STALE")
+
+def _user(user_id: int) -> user_schemas.User:
+    return user_schemas.User(user_id=user_id, username=f"kasir{user_id}", full_name=None, role="staff", is_active=True)
+
+def test_principal_cache_ttl_lru_and_invalidation():
+    cache = PrincipalCache(ttl_seconds=60, max_size=2)
+    cache.set("u1", "token-1", _user(1))
+    cache.set("u2", "token-2", _user(2))
+    assert cache.get("u1", "token-1").user_id == 1 # u1 jadi yang terakhir dipakai
+    cache.set("u3", "token-3", _user(3))
+    assert cache.get("u2", "token-2") is None # LRU dibuang
+
+    cache.invalidate_user(1)
+    assert cache.get("u1", "token-1") is None
+    assert cache.get("u3", "token-3").user_id == 3
+
+def test_principal_cache_entry_does_not_outlive_token():
+    cache = PrincipalCache(ttl_seconds=60, max_size=10)
+    cache.set("u1", "token-1", _user(1), token_expires_at=time.time() - 1)
+    assert cache.get("u1", "token-1") is None
@@ -0,0 +1,72 @@
+# backend/tests/test_catalog_version.py
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.core.catalog_version import get_catalog_version
+from app.crud import crud_order, crud_product
+from app.db.database import SessionLocal, engine
+from app.db import models_db
+from app.schemas import order_schemas, product_schemas
+
+def _create_product(db):
+    return crud_product.create_product(db, product_schemas.ProductCreate(
+        name="Es Jeruk", sku="EJ-01", purchase_price=Decimal("3000"), selling_price=Decimal("6000"), current_stock=20
+    ))
+
+def test_stock_change_bumps_only_stock_version(db):
+    product = _create_product(db)
+    catalog_before = get_catalog_version(db)
+    products_before = get_catalog_version(db, include_stock=True)
+
+    crud_order.create_order(db, order_schemas.OrderCreate(
+        payment_method="Cash", items=[order_schemas.OrderItemCreate(product_id=product.product_id, quantity=2)]
+    ))
+
+    assert get_catalog_version(db) == catalog_before # ETag kategori tetap
+    assert get_catalog_version(db, include_stock=True) != products_before # ETag produk berubah
+
+def test_catalog_change_bumps_version_only_on_commit(db):
+    product = _create_product(db)
+    version_before = get_catalog_version(db)
+
+    db_product = db.get(models_db.Product, product.product_id)
+    db_product.name = "Es Jeruk Peras"
+    crud_product.mark_catalog_changed(db)
+    db.rollback()
+    assert get_catalog_version(db) == version_before
+
+    crud_product.update_product(db, product.product_id, product_schemas.ProductUpdate(name="Es Jeruk Peras", sku="EJ-01"))
+    assert get_catalog_version(db) != version_before
+
+def test_new_version_is_invisible_to_other_connections_until_commit(db):
+    product = _create_product(db)
+    version_before = get_catalog_version(db)
+    db.commit() # Akhiri transaksi baca sesi ini
+    seen_before_commit = []
+
+    def read_from_second_connection(connection):
+        # Dipanggil tepat sebelum COMMIT DBAPI: flush dan kenaikan versi sudah dijalankan di transaksi ini
+        other = SessionLocal()
+        try:
+            seen_before_commit.append(get_catalog_version(other))
+        finally:
+            other.close()
+
+    event.listen(engine, "commit", read_from_second_connection)
+    try:
+        crud_product.update_product(db, product.product_id, product_schemas.ProductUpdate(name="Es Jeruk Nipis", sku="EJ-01"))
+    finally:
+        event.remove(engine, "commit", read_from_second_connection)
+
+    assert seen_before_commit and all(version == version_before for version in seen_before_commit)
+    assert get_catalog_version(db) != version_before
+
+def test_missing_version_table_disables_etag_instead_of_failing(db):
+    models_db.CatalogVersion.__table__.drop(bind=engine)
+    try:
+        assert get_catalog_version(db) is None
+        _create_product(db) # Commit data tetap berhasil walau versi tidak bisa dinaikkan
+        assert db.query(models_db.Product).count() == 1
+    finally:
+        models_db.CatalogVersion.__table__.create(bind=engine)
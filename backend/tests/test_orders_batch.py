@@ -0,0 +1,44 @@
+# backend/tests/test_orders_batch.py
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.crud import crud_order
+from app.db import models_db
+from app.schemas import order_schemas
+
+def _seed(db):
+    db.add(models_db.User(user_id=1, username="kasir1", hashed_password="x", full_name="Kasir 1"))
+    db.add(models_db.Product(
+        product_id=1, name="Air Mineral", sku="AM-01",
+        purchase_price=Decimal("2000"), selling_price=Decimal("4000"), current_stock=10
+    ))
+    db.commit()
+
+def _batch(*references):
+    return [
+        order_schemas.OrderBatchEntry(
+            payment_method="Cash", client_reference=reference,
+            client_created_at=datetime(2024, 5, 1, 9, 0, tzinfo=timezone.utc),
+            items=[order_schemas.OrderItemCreate(product_id=1, quantity=2)]
+        )
+        for reference in references
+    ]
+
+def test_replayed_batch_does_not_create_orders_twice(db):
+    _seed(db)
+    first = crud_order.create_orders_batch(db, _batch("T1-0001", "T1-0002"), current_user_id=1)
+    replay = crud_order.create_orders_batch(db, _batch("T1-0001", "T1-0002", "T1-0003"), current_user_id=1)
+
+    assert [r["replayed"] for r in replay[:2]] == [True, True]
+    assert [r["order_id"] for r in replay[:2]] == [r["order_id"] for r in first]
+    assert replay[2]["success"] and not replay[2].get("replayed")
+    assert db.query(models_db.Order).count() == 3
+    assert db.get(models_db.Product, 1).current_stock == 4 # 10 - 3 order x 2
+
+def test_repeated_reference_within_one_batch_is_created_once(db):
+    _seed(db)
+    results = crud_order.create_orders_batch(db, _batch("T1-0001", "T1-0001"), current_user_id=1)
+
+    assert results[0]["success"] and results[1]["replayed"]
+    assert results[0]["order_id"] == results[1]["order_id"]
+    assert db.query(models_db.Order).count() == 1
@@ -0,0 +1,55 @@
+# backend/tests/test_pagination.py
+from datetime import datetime
+
+from app.crud import crud_order
+from app.db import models_db
+
+def _add_orders(db, count, created_at=None):
+    for _ in range(count):
+        order = models_db.Order(
+            order_number=f"INV-TEST-{db.query(models_db.Order).count():06d}",
+            total_amount=0,
+            order_status="completed",
+            source="dashboard",
+        )
+        if created_at is not None:
+            order.created_at = created_at
+        db.add(order)
+        db.flush()
+    db.commit()
+
+def _walk_orders(db, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        result = crud_order.get_orders(db, limit=limit, cursor=cursor)
+        seen.extend(order.order_id for order in result["data"])
+        pages += 1
+        cursor = result["next_cursor"]
+        if cursor is None or pages > 20:
+            return seen, pages
+
+def test_cursor_pagination_walks_server_default_timestamps(db):
+    # created_at dari server_default CURRENT_TIMESTAMP: disimpan SQLite tanpa pecahan detik
+    _add_orders(db, 5)
+
+    first_page = crud_order.get_orders(db, limit=2)
+    second_page = crud_order.get_orders(db, limit=2, cursor=first_page["next_cursor"])
+
+    first_ids = [order.order_id for order in first_page["data"]]
+    second_ids = [order.order_id for order in second_page["data"]]
+    assert not set(first_ids) & set(second_ids)
+    assert second_page["next_cursor"] != first_page["next_cursor"]
+
+    all_ids, _ = _walk_orders(db, limit=2)
+    assert all_ids == sorted(all_ids, reverse=True)
+    assert len(all_ids) == 5
+
+def test_cursor_pagination_mixed_timestamp_formats(db):
+    # Campuran baris server_default dan baris dengan created_at eksplisit (disimpan dengan mikrodetik)
+    _add_orders(db, 3)
+    _add_orders(db, 3, created_at=datetime(2024, 1, 1, 12, 0, 0))
+    _add_orders(db, 2, created_at=datetime(2024, 1, 1, 12, 0, 0, 250000))
+
+    all_ids, _ = _walk_orders(db, limit=3)
+    assert sorted(all_ids) == list(range(1, 9))
+    assert len(all_ids) == len(set(all_ids))
@@ -0,0 +1,59 @@
+# backend/tests/test_products.py
+from decimal import Decimal
+
+import pytest
+
+from app.core.product_index import product_index
+from app.crud import crud_order, crud_product
+from app.db import models_db
+from app.schemas import order_schemas
+
+@pytest.fixture
+def indexed_product(db):
+    db.add(models_db.Product(
+        product_id=1, name="Roti Bakar", sku="RB-01",
+        purchase_price=Decimal("7000"), selling_price=Decimal("12000"), current_stock=10
+    ))
+    db.commit()
+    product_index.build(db)
+    assert product_index.get(1) is not None
+    return 1
+
+def test_permanent_delete_commits_and_updates_index(db, indexed_product):
+    crud_product.delete_product(db, indexed_product, permanent_delete=True)
+    db.rollback() # Rollback setelahnya tidak boleh membatalkan penghapusan
+
+    assert db.get(models_db.Product, indexed_product) is None
+    assert product_index.get(indexed_product) is None
+    assert product_index.get_by_sku("RB-01") is None
+
+def test_permanent_delete_of_sold_product_keeps_index(db, indexed_product):
+    crud_order.create_order(db, order_schemas.OrderCreate(
+        payment_method="Cash", items=[order_schemas.OrderItemCreate(product_id=indexed_product, quantity=1)]
+    ))
+
+    with pytest.raises(ValueError):
+        crud_product.delete_product(db, indexed_product, permanent_delete=True)
+
+    assert db.get(models_db.Product, indexed_product) is not None
+    assert product_index.get(indexed_product) is not None
+
+def test_sync_drops_products_deleted_by_another_worker(db, indexed_product):
+    db.add(models_db.Product(
+        product_id=2, name="Roti Tawar", sku="RT-01",
+        purchase_price=Decimal("9000"), selling_price=Decimal("15000"), current_stock=5
+    ))
+    db.commit()
+    product_index.sync_changes(db)
+    assert product_index.get(2) is not None
+
+    # Hapus langsung di tabel (seperti worker lain): indeks worker ini tidak ikut diberi tahu
+    db.query(models_db.Product).filter(models_db.Product.product_id == indexed_product).delete()
+    db.commit()
+    assert product_index.get(indexed_product) is not None
+
+    product_index.sync_changes(db)
+
+    assert product_index.get(indexed_product) is None
+    assert product_index.get_by_sku("RB-01") is None
+    assert product_index.get(2) is not None
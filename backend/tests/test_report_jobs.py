@@ -0,0 +1,48 @@
+# backend/tests/test_report_jobs.py
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.crud import crud_order, crud_report_jobs
+from app.db import models_db
+from app.schemas import order_schemas
+
+def _completed_closed_job(db, start_date: date, end_date: date) -> models_db.ReportJob:
+    params = {"start_date": start_date.isoformat(), "end_date": end_date.isoformat(), "group_by": "day", "timezone": "UTC"}
+    job = models_db.ReportJob(
+        job_id=f"job-{start_date.isoformat()}", report_type="sales", params=params,
+        params_hash=crud_report_jobs.compute_params_hash("sales", params), status="completed",
+        is_closed_period=True, period_start=start_date, period_end=end_date,
+        result=[], finished_at=datetime.now(timezone.utc)
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+def test_backdated_batch_expires_cached_closed_period(db):
+    db.add(models_db.Product(
+        product_id=1, name="Gula Aren", sku="GA-01",
+        purchase_price=Decimal("8000"), selling_price=Decimal("12000"), current_stock=10
+    ))
+    db.commit()
+    affected = _completed_closed_job(db, date(2024, 3, 1), date(2024, 3, 31))
+    unaffected = _completed_closed_job(db, date(2024, 1, 1), date(2024, 1, 31))
+    assert crud_report_jobs._find_reusable_job(db, affected.params_hash) is not None
+
+    crud_order.create_orders_batch(db, [order_schemas.OrderBatchEntry(
+        payment_method="Cash", client_reference="T1-1",
+        client_created_at=datetime(2024, 3, 15, 10, 0, tzinfo=timezone.utc),
+        items=[order_schemas.OrderItemCreate(product_id=1, quantity=1)]
+    )])
+
+    db.expire_all()
+    assert affected.status == "expired"
+    assert crud_report_jobs._find_reusable_job(db, affected.params_hash) is None
+    assert unaffected.status == "completed"
+
+def test_closed_period_result_has_ttl(db, monkeypatch):
+    job = _completed_closed_job(db, date(2024, 1, 1), date(2024, 1, 31))
+    job.finished_at = datetime.now(timezone.utc) - timedelta(hours=2)
+    db.commit()
+
+    monkeypatch.setattr(crud_report_jobs.settings, "REPORT_JOB_CLOSED_PERIOD_TTL_SECONDS", 3600)
+    assert crud_report_jobs._find_reusable_job(db, job.params_hash) is None
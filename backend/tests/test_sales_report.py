@@ -0,0 +1,149 @@
+# backend/tests/test_sales_report.py
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.crud import crud_report
+from app.crud.crud_sales_rollup import rebuild_rollup
+from app.db import models_db
+from app.db.time_buckets import time_bucket, utc_date, weekday_and_hour
+
+def _seed_orders(db, created_ats, quantity=1):
+    """Satu order completed (1 produk @ 10000, modal 6000) per waktu UTC di created_ats."""
+    db.add(models_db.Category(category_id=1, name="Minuman"))
+    db.add(models_db.Product(
+        product_id=1, name="Teh Manis", sku="TM-01", category_id=1,
+        purchase_price=Decimal("6000"), selling_price=Decimal("10000"), current_stock=100
+    ))
+    for i, created_at in enumerate(created_ats, start=1):
+        db.add(models_db.Order(
+            order_id=i, order_number=f"TEST-{i:04d}", total_amount=Decimal("10000") * quantity,
+            payment_method="Cash", order_status="completed", source="dashboard", created_at=created_at,
+            items=[models_db.OrderItem(
+                product_id=1, quantity=quantity, price_at_transaction=Decimal("10000"),
+                cost_at_transaction=Decimal("6000"), category_id_at_transaction=1,
+                subtotal=Decimal("10000") * quantity
+            )]
+        ))
+    db.commit()
+    rebuild_rollup(db)
+
+def _utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+def _totals(report, label_key):
+    return {row[label_key]: row["total_items"] for row in report}
+
+@pytest.mark.parametrize("group_by, label_key, expected", [
+    ("day", "date", {"2024-01-07": 1, "2024-01-08": 2, "2024-02-01": 1}),
+    ("week", "week", {"2024-01-01": 1, "2024-01-08": 2, "2024-01-29": 1}), # Minggu 7 Jan masuk minggu Senin 1 Jan
+    ("month", "month", {"2024-01": 3, "2024-02": 1}),
+])
+def test_utc_report_reads_rollup(db, group_by, label_key, expected):
+    _seed_orders(db, [
+        _utc(2024, 1, 7, 23, 30), _utc(2024, 1, 8, 0, 15), _utc(2024, 1, 8, 12, 0), _utc(2024, 2, 1, 8, 0)
+    ])
+    assert crud_report.uses_sales_rollup(group_by, "UTC")
+
+    report = crud_report.get_sales_report_data(db, date(2024, 1, 1), date(2024, 2, 29), group_by)
+
+    assert _totals(report, label_key) == expected
+    assert sum(row["total_sales"] for row in report) == 40000
+    assert sum(row["estimated_profit"] for row in report) == 16000
+    # Zona yang setara UTC tetapi dibaca dari orders harus memberi hasil yang sama
+    assert not crud_report.uses_sales_rollup(group_by, "Etc/UTC")
+    assert crud_report.get_sales_report_data(db, date(2024, 1, 1), date(2024, 2, 29), group_by, "Etc/UTC") == report
+
+def test_non_utc_report_buckets_by_local_day(db):
+    # Asia/Jakarta = UTC+7: 7 Jan 18:00 UTC sudah 8 Jan waktu lokal
+    _seed_orders(db, [_utc(2024, 1, 7, 16, 0), _utc(2024, 1, 7, 18, 0), _utc(2024, 1, 8, 17, 30)])
+
+    report = crud_report.get_sales_report_data(db, date(2024, 1, 7), date(2024, 1, 8), "day", "Asia/Jakarta")
+
+    assert not crud_report.uses_sales_rollup("day", "Asia/Jakarta")
+    assert _totals(report, "date") == {"2024-01-07": 1, "2024-01-08": 1} # 8 Jan 17:30 UTC = 9 Jan 00:30 lokal (di luar rentang)
+
+def test_report_range_straddling_dst(db):
+    # America/New_York maju dari EST (-5) ke EDT (-4) pada 10 Mar 2024 pukul 02:00 lokal
+    _seed_orders(db, [
+        _utc(2024, 3, 10, 4, 30),  # 9 Mar 23:30 EST
+        _utc(2024, 3, 10, 6, 30),  # 10 Mar 01:30 EST
+        _utc(2024, 3, 10, 7, 30),  # 10 Mar 03:30 EDT (jam 02 tidak ada)
+        _utc(2024, 3, 11, 3, 30),  # 10 Mar 23:30 EDT
+        _utc(2024, 3, 11, 4, 30),  # 11 Mar 00:30 EDT (dengan offset EST tetap akan jatuh ke 10 Mar)
+    ])
+
+    daily = crud_report.get_sales_report_data(db, date(2024, 3, 9), date(2024, 3, 11), "day", "America/New_York")
+    hourly = crud_report.get_sales_report_data(db, date(2024, 3, 10), date(2024, 3, 10), "hour", "America/New_York")
+
+    assert _totals(daily, "date") == {"2024-03-09": 1, "2024-03-10": 3, "2024-03-11": 1}
+    assert _totals(hourly, "hour") == {"2024-03-10 01:00": 1, "2024-03-10 03:00": 1, "2024-03-10 23:00": 1}
+
+def test_heatmap_sums_hourly_shards(db):
+    # Order 1 dan 2 di jam yang sama jatuh ke shard berbeda (order_id % HOURLY_SALES_SHARDS)
+    _seed_orders(db, [_utc(2024, 1, 8, 9, 5), _utc(2024, 1, 8, 9, 40), _utc(2024, 1, 8, 10, 0)])
+    assert db.query(models_db.HourlySales).count() == 3
+
+    heatmap = crud_report.get_sales_heatmap(db, date(2024, 1, 8), date(2024, 1, 8))
+
+    assert heatmap["source"] == "rollup"
+    assert heatmap["transactions"][0][9] == 2 # Senin jam 09
+    assert heatmap["revenue"][0][9] == 20000
+    assert heatmap["transactions"][0][10] == 1
+
+# --- PostgreSQL: tidak ada server PostgreSQL saat test, jadi ekspresinya diperiksa di tingkat kompilasi ---
+
+def _compile_pg(expression) -> str:
+    return str(expression.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+@pytest.mark.parametrize("bucket", ["hour", "day", "week", "month"])
+@pytest.mark.parametrize("timezone_name", ["UTC", "Asia/Jakarta", "America/New_York"])
+def test_postgresql_time_bucket_converts_to_local_time(bucket, timezone_name):
+    created_at = models_db.Order.__table__.c.created_at
+
+    sql = _compile_pg(time_bucket(created_at, bucket, "postgresql", timezone_name=timezone_name))
+
+    # timezone(zona, timestamptz) -> waktu lokal (termasuk DST) sebelum dipotong
+    assert sql == f"date_trunc('{bucket}', timezone('{timezone_name}', orders.created_at))"
+
+@pytest.mark.parametrize("bucket", ["day", "week", "month"])
+def test_postgresql_time_bucket_on_rollup_date_has_no_conversion(bucket):
+    sales_date = models_db.DailyProductSales.__table__.c.sales_date
+
+    assert _compile_pg(time_bucket(sales_date, bucket, "postgresql")) == f"date_trunc('{bucket}', daily_product_sales.sales_date)"
+
+def test_postgresql_utc_date_and_heatmap_expressions():
+    created_at = models_db.Order.__table__.c.created_at
+    sales_hour = models_db.HourlySales.__table__.c.sales_hour
+
+    assert _compile_pg(utc_date(created_at, "postgresql")) == "date(timezone('UTC', orders.created_at))"
+    weekday, hour = weekday_and_hour(sales_hour, "postgresql", "Asia/Jakarta", column_is_utc_naive=True)
+    local = "timezone('Asia/Jakarta', timezone('UTC', hourly_sales.sales_hour))"
+    assert _compile_pg(weekday) == f"CAST(EXTRACT(isodow FROM {local}) AS INTEGER) - 1"
+    assert _compile_pg(hour) == f"CAST(EXTRACT(hour FROM {local}) AS INTEGER)"
+
+@pytest.mark.parametrize("group_by, timezone_name, source_table", [
+    ("day", "UTC", "daily_product_sales"),
+    ("week", "UTC", "daily_product_sales"),
+    ("month", "UTC", "daily_product_sales"),
+    ("hour", "UTC", "orders"),
+    ("day", "Asia/Jakarta", "orders"),
+    ("week", "America/New_York", "orders"),
+])
+def test_postgresql_sales_bucket_query_compiles(group_by, timezone_name, source_table):
+    session = Session()
+    session.get_bind = lambda *args, **kwargs: SimpleNamespace(dialect=postgresql.dialect())
+
+    query = crud_report._sales_bucket_query(session, date(2024, 3, 1), date(2024, 3, 31), group_by, timezone_name)
+    sql = _compile_pg(query.statement)
+
+    assert f"FROM {source_table}" in sql
+    if source_table == "orders":
+        assert f"date_trunc('{group_by}', timezone('{timezone_name}', orders.created_at))" in sql
+    else:
+        assert f"date_trunc('{group_by}', daily_product_sales.sales_date)" in sql
@@ -0,0 +1,65 @@
+# backend/tests/test_sales_rollup.py
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app.crud import crud_order
+from app.db import models_db
+from app.schemas import order_schemas
+
+def _seed_product(db):
+    db.add_all([models_db.Category(category_id=1, name="Minuman"), models_db.Category(category_id=2, name="Makanan")])
+    db.add(models_db.Product(
+        product_id=1, name="Kopi Susu", sku="KS-01", category_id=1,
+        purchase_price=Decimal("5000"), selling_price=Decimal("8000"), current_stock=100
+    ))
+    db.commit()
+
+def _rollup_totals(db):
+    rollup = models_db.DailyProductSales
+    return {
+        row.category_id: (int(row.quantity), Decimal(row.total_sales), Decimal(row.total_cost))
+        for row in db.query(
+            rollup.category_id,
+            func.sum(rollup.quantity).label("quantity"),
+            func.sum(rollup.total_sales).label("total_sales"),
+            func.sum(rollup.total_cost).label("total_cost"),
+        ).group_by(rollup.category_id)
+    }
+
+def test_reversal_uses_snapshot_after_product_changes_category(db):
+    _seed_product(db)
+    order = crud_order.create_order(db, order_schemas.OrderCreate(
+        payment_method="Cash", items=[order_schemas.OrderItemCreate(product_id=1, quantity=2)]
+    ))
+    assert order.order_status == "completed"
+    assert _rollup_totals(db) == {1: (2, Decimal("16000"), Decimal("10000"))}
+
+    # Produk pindah kategori dan harga belinya berubah setelah penjualan
+    product = db.get(models_db.Product, 1)
+    product.category_id = 2
+    product.purchase_price = Decimal("6000")
+    db.commit()
+
+    crud_order.update_order_status(db, order.order_id, "cancelled")
+
+    assert _rollup_totals(db) == {1: (0, Decimal("0"), Decimal("0"))}
+
+def test_pending_order_snapshots_category_when_completed(db):
+    _seed_product(db)
+    order = crud_order.create_order(db, order_schemas.OrderCreate(
+        payment_method="Transfer", items=[order_schemas.OrderItemCreate(product_id=1, quantity=1)]
+    ))
+    if order.order_status == "completed": # Status awal bergantung pada metode pembayaran
+        crud_order.update_order_status(db, order.order_id, "pending")
+    # Simulasikan item lama tanpa snapshot
+    db.query(models_db.OrderItem).update({"category_id_at_transaction": None, "cost_at_transaction": None})
+    db.commit()
+
+    crud_order.update_order_status(db, order.order_id, "completed")
+    product = db.get(models_db.Product, 1)
+    product.category_id = 2
+    db.commit()
+    crud_order.update_order_status(db, order.order_id, "cancelled")
+
+    assert _rollup_totals(db) == {1: (0, Decimal("0"), Decimal("0"))}